@@ -2,6 +2,8 @@ from magicbot.state_machine import state, timed_state, AutonomousStateMachine
 
 from components import swervedrive
 
+from . import paths
+
 class BaseAuto(AutonomousStateMachine):
     """
     This class is used to end each autonomous mode.
@@ -11,6 +13,25 @@ class BaseAuto(AutonomousStateMachine):
 
     drive: swervedrive.SwerveDrive
 
+    escape_distance = paths.ESCAPE_DISTANCE # Distance to drive away after the auto in feet (measured by the odometry's open loop estimate)
+    preload = 3 # Balls in the robot at the start of the auto
+
+    def follow(self, path, time):
+        """
+        Send the drive the commands of a path. The input threshold is skipped,
+        so the slow start and end of the profile are driven instead of zeroed.
+
+        :param path: common.trajectory.Trajectory
+        :param time: Seconds since the start of the path (the state_tm of the state)
+        :returns: True once the end of the path is reached
+        """
+        fwd, strafe, rcw = path.sample(time)
+        self.drive.set_raw_fwd(fwd)
+        self.drive.set_raw_strafe(strafe)
+        self.drive.set_raw_rcw(rcw)
+        self.drive.bypass_input_threshold = True
+        return time >= path.duration
+
     @state
     def failed(self):
         """
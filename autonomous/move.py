@@ -1,8 +1,9 @@
 from .base_auto import BaseAuto
+from . import paths
 
 from magicbot.state_machine import state, timed_state, AutonomousStateMachine
 
-from components import swervedrive, shooter
+from components import swervedrive, shooter, odometry, aligner
 from common import vision
 
 """
@@ -24,36 +25,39 @@ class Default(BaseAuto):
     drive: swervedrive.SwerveDrive
     shooter: shooter.Shooter
     vision: vision.Vision
+    odometry: odometry.Odometry
+    aligner: aligner.Aligner
 
     # For 7 seconds try to align.
     # If aligned or 7 seconds past shoot.
     @timed_state(duration=7, first=True, next_state="shoot")
     def vision_align(self):
-        drive = self.vision.verticalAdjust()
-        rotate = self.vision.horizontalAdjust()
-
-        if not drive == 0:
-            self.drive.set_raw_fwd(drive * 0.35)
-        else:
-            self.drive.set_raw_fwd(0)
-            if not rotate == 0:
-                self.drive.set_raw_rcw(rotate * 0.35)
-            else:
-                self.drive.set_raw_rcw(0)
-                self.next_state('shoot')
-
-        self.drive.update_smartdash()
-
-    # Shoot
+        self.aligner.align()
+
+        if self.aligner.aligned:
+            self.next_state('shoot')
+
+    # Shoot the preloaded balls, escape as soon as the hopper is empty.
+    # If it takes more than 4 seconds, escape anyway.
     @timed_state(duration=4, next_state="escape")
     def shoot(self):
-        self.shooter.shoot()
+        self.shooter.shoot(self.preload)
+
+        if self.shooter.isEmpty:
+            self.next_state('escape')
+
+    # Follow the escape path until its end or until the escape distance is travelled.
+    # If it takes more than 3.5 seconds, stop anyway.
+    @timed_state(duration=3.5, next_state="finish")
+    def escape(self, initial_call, state_tm):
+        if initial_call:
+            self.start_distance = self.odometry.distance
 
-    # Drive backwards.
-    @timed_state(duration=2.5, next_state="finish")
-    def escape(self):
         self.shooter.stop()
-        self.drive.set_raw_fwd(0.5)
+        finished = self.follow(paths.ESCAPE, state_tm)
+
+        if finished or self.odometry.distance_since(self.start_distance) >= self.escape_distance:
+            self.next_state('finish')
 
 class OnlyShoot(BaseAuto):
     MODE_NAME = "Only Shoot"
@@ -61,26 +65,48 @@ class OnlyShoot(BaseAuto):
 
     # Injection
     drive: swervedrive.SwerveDrive
+    shooter: shooter.Shooter
+    odometry: odometry.Odometry
 
-    # Shoot
+    # Shoot the preloaded balls, escape as soon as the hopper is empty.
+    # If it takes more than 4 seconds, escape anyway.
     @timed_state(duration=4, first=True, next_state="escape")
     def shoot(self):
-        self.shooter.shoot()
+        self.shooter.shoot(self.preload)
+
+        if self.shooter.isEmpty:
+            self.next_state('escape')
     
-    # Drive backwards.
-    @timed_state(duration=2.5, next_state="finish")
-    def escape(self):
+    # Follow the escape path until its end or until the escape distance is travelled.
+    # If it takes more than 3.5 seconds, stop anyway.
+    @timed_state(duration=3.5, next_state="finish")
+    def escape(self, initial_call, state_tm):
+        if initial_call:
+            self.start_distance = self.odometry.distance
+
         self.shooter.stop()
-        self.drive.set_raw_fwd(0.5)
+        finished = self.follow(paths.ESCAPE, state_tm)
+
+        if finished or self.odometry.distance_since(self.start_distance) >= self.escape_distance:
+            self.next_state('finish')
 
 class OnlyMove(BaseAuto):
     MODE_NAME = "Only Move"
     DEFAULT = False
 
+    escape_distance = paths.SLOW_ESCAPE_DISTANCE
+
     # Injection
     drive: swervedrive.SwerveDrive
+    odometry: odometry.Odometry
+
+    # Follow the slow escape path until its end or until the escape distance is travelled.
+    @timed_state(duration=3.5, next_state="finish", first=True)
+    def drive(self, initial_call, state_tm):
+        if initial_call:
+            self.start_distance = self.odometry.distance
+
+        finished = self.follow(paths.SLOW_ESCAPE, state_tm)
 
-    # Drive backwards.
-    @timed_state(duration=2.5, next_state="finish", first=True)
-    def drive(self):
-        self.drive.set_raw_fwd(0.35)
\ No newline at end of file
+        if finished or self.odometry.distance_since(self.start_distance) >= self.escape_distance:
+            self.next_state('finish')
\ No newline at end of file
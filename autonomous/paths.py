@@ -0,0 +1,24 @@
+import os
+
+from common import trajectory
+
+"""
+The paths driven by the autonomous modes.
+
+They are generated when the robot code starts (or read from the cache in the
+trajectories folder if they were already generated), never during autonomous.
+"""
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'trajectories')
+
+# Distances to drive away after the auto in feet, the same as the timed escapes
+# they replace (0.5 and 0.35 of MAX_SPEED for 2.5 seconds)
+ESCAPE_DISTANCE = 15
+SLOW_ESCAPE_DISTANCE = 10.5
+MAX_ACCELERATION = 8 # ft/s^2
+
+# Drive backwards at half speed (the same as set_raw_fwd(0.5))
+ESCAPE = trajectory.load_or_generate([(0, 0), (ESCAPE_DISTANCE, 0)], 6, MAX_ACCELERATION, cache_dir=CACHE_DIR)
+
+# Drive backwards slower (the same as set_raw_fwd(0.35))
+SLOW_ESCAPE = trajectory.load_or_generate([(0, 0), (SLOW_ESCAPE_DISTANCE, 0)], 4.2, MAX_ACCELERATION, cache_dir=CACHE_DIR)
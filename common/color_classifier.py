@@ -0,0 +1,61 @@
+import math
+
+from collections import namedtuple
+
+# Result of a classification: index of the reference color (-1 for none), its letter and the confidence [0, 1]
+Classification = namedtuple('Classification', ['index', 'letter', 'confidence'])
+
+class ColorClassifier():
+    """
+    Nearest reference color classifier.
+
+    The colors are normalized (r + g + b = 1) and compared with the reference colors by
+    euclidean distance, the confidence is 1 - distance (the same as REV's ColorMatch).
+    The references are normalized once when the classifier is created.
+    """
+
+    def __init__(self, references, confidence=0.9):
+        """
+        :param references: Dictionary of color letters to (r, g, b) reference colors
+        :param confidence: Minimum confidence of a match, below it the color is "N"
+        """
+        self.confidence = confidence
+        self.letters = tuple(references)
+
+        self._references = tuple(
+            (index, *self._normalize(*rgb)) for index, rgb in enumerate(references.values())
+        )
+        self._none = Classification(-1, "N", 0.0)
+
+    @staticmethod
+    def _normalize(r, g, b):
+        total = r + g + b
+        if total <= 0:
+            return (0.0, 0.0, 0.0)
+        return (r / total, g / total, b / total)
+
+    def classify(self, r, g, b):
+        """
+        :returns: Classification of the color, letter "N" if no reference is close enough
+        """
+        total = r + g + b
+        if total <= 0:
+            return self._none
+
+        r /= total
+        g /= total
+        b /= total
+
+        best_index = -1
+        best_distance = math.inf
+        for index, ref_r, ref_g, ref_b in self._references:
+            distance = (r - ref_r) ** 2 + (g - ref_g) ** 2 + (b - ref_b) ** 2
+            if distance < best_distance:
+                best_index = index
+                best_distance = distance
+
+        confidence = 1 - math.sqrt(best_distance)
+        if confidence < self.confidence:
+            return Classification(-1, "N", confidence)
+
+        return Classification(best_index, self.letters[best_index], confidence)
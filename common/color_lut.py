@@ -0,0 +1,181 @@
+"""
+Quantized RGB to color lookup table for the color sensor.
+
+The table is fitted offline from recorded samples of every field color. Each color
+gets a Gaussian model (mean and covariance of its normalized r, g), and every cell of
+the quantized RGB cube is assigned to the color with the smallest Mahalanobis distance:
+    - within `core` standard deviations: the color, full confidence
+    - within `outer` standard deviations: the color, low confidence
+    - farther: no color (N)
+At runtime a reading is normalized, quantized and looked up, one index per sample.
+
+Build the table from CSV files with rows of color,r,g,b (e.g. R,0.39,0.41,0.19):
+    python -m common.color_lut samples/*.csv --output color_lut.bin
+"""
+
+import argparse
+import csv
+import struct
+
+from common.color_classifier import Classification
+
+MAGIC = b'CLUT'
+VERSION = 1
+
+# Magic, version, bits per channel, number of colors
+HEADER_STRUCT = struct.Struct('<4sBBB')
+
+CORE_CONFIDENCE = 1.0 # Confidence of the cells close to a color
+OUTER_CONFIDENCE = 0.88 # Confidence of the cells at the edge of a color (can keep a color, but not start a new one)
+
+class ColorLookupTable():
+    """
+    Classifies colors with a table of (2^bits)^3 cells.
+    A cell is 0 for no color, or the color's index + 1, plus 0x80 for the full confidence.
+    """
+
+    def __init__(self, letters, table, bits=5):
+        """
+        :param letters: Letters of the colors
+        :param table: bytes of the cells, r major
+        :param bits: Bits per channel of the quantization
+        """
+        if len(table) != 1 << (3 * bits):
+            raise ValueError('The table should have %d cells' % (1 << (3 * bits)))
+
+        self.letters = tuple(letters)
+        self.table = bytes(table)
+        self.bits = bits
+
+        self._scale = (1 << bits) - 1e-6 # [0, 1] to [0, 2^bits)
+        self._shift_r = 2 * bits
+        self._shift_g = bits
+
+        # Every possible result is created once, the lookup returns one of them
+        results = [Classification(-1, "N", 0.0)] * 256
+        for index, letter in enumerate(self.letters):
+            results[index + 1] = Classification(index, letter, OUTER_CONFIDENCE)
+            results[(index + 1) | 0x80] = Classification(index, letter, CORE_CONFIDENCE)
+        self._results = tuple(results)
+
+    def classify(self, r, g, b):
+        """
+        :returns: common.color_classifier.Classification of the color
+        """
+        total = r + g + b
+        if total <= 0:
+            return self._results[0]
+
+        scale = self._scale / total
+        cell = (int(r * scale) << self._shift_r) | (int(g * scale) << self._shift_g) | int(b * scale)
+        return self._results[self.table[cell]]
+
+    def tobytes(self):
+        letters = ''.join(self.letters).encode()
+        return HEADER_STRUCT.pack(MAGIC, VERSION, self.bits, len(letters)) + letters + self.table
+
+    @classmethod
+    def frombytes(cls, data):
+        magic, version, bits, count = HEADER_STRUCT.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a version %d color lookup table' % VERSION)
+
+        start = HEADER_STRUCT.size
+        letters = data[start:start + count].decode()
+        return cls(letters, data[start + count:], bits)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            return cls.frombytes(file.read())
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            file.write(self.tobytes())
+
+def read_samples(paths):
+    """
+    Read the samples from CSV files with rows of color,r,g,b. A header row is skipped.
+
+    :returns: Dictionary of color letters to lists of (r, g, b)
+    """
+    samples = {}
+    for path in paths:
+        with open(path, newline='') as file:
+            for row in csv.reader(file):
+                if len(row) < 4:
+                    continue
+                try:
+                    rgb = (float(row[1]), float(row[2]), float(row[3]))
+                except ValueError:
+                    continue # Header
+                samples.setdefault(row[0].strip().upper()[:1], []).append(rgb)
+    return samples
+
+def fit(samples, bits=5, core=3.0, outer=4.0):
+    """
+    Fit the Gaussian model of every color and fill the table.
+
+    :param samples: Dictionary of color letters to lists of (r, g, b)
+    :param bits: Bits per channel of the quantization
+    :param core: Distance (in standard deviations) of the full confidence region
+    :param outer: Distance (in standard deviations) of the low confidence region
+    :returns: ColorLookupTable
+    """
+    import numpy as np
+
+    letters = sorted(samples)
+    size = 1 << bits
+
+    # Normalized r, g of the center of every cell (b is 1 - r - g after the normalization)
+    centers = (np.arange(size) + 0.5) / size
+    r, g, b = np.meshgrid(centers, centers, centers, indexing='ij')
+    total = r + g + b
+    cells = np.stack((r / total, g / total), axis=-1).reshape(-1, 2)
+
+    distances = np.empty((len(letters), len(cells)))
+    for i, letter in enumerate(letters):
+        rgb = np.asarray(samples[letter], dtype=float)
+        chroma = rgb[:, :2] / rgb.sum(axis=1, keepdims=True)
+
+        mean = chroma.mean(axis=0)
+        covariance = np.cov(chroma, rowvar=False) + np.eye(2) * 1e-6 # Keeps it invertible
+        inverse = np.linalg.inv(covariance)
+
+        difference = cells - mean
+        distances[i] = np.einsum('ij,jk,ik->i', difference, inverse, difference)
+
+    nearest = distances.argmin(axis=0)
+    nearest_distance = distances.min(axis=0)
+
+    table = np.zeros(len(cells), dtype=np.uint8)
+    table[nearest_distance <= outer ** 2] = nearest[nearest_distance <= outer ** 2] + 1
+    table[nearest_distance <= core ** 2] |= 0x80
+
+    return ColorLookupTable(letters, table.tobytes(), bits)
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the color lookup table from recorded samples.')
+    parser.add_argument('samples', nargs='+', help='CSV files with rows of color,r,g,b')
+    parser.add_argument('--output', default='color_lut.bin')
+    parser.add_argument('--bits', type=int, default=5, help='Bits per channel (5 is a 32 KB table)')
+    parser.add_argument('--core', type=float, default=3.0)
+    parser.add_argument('--outer', type=float, default=4.0)
+    args = parser.parse_args()
+
+    samples = read_samples(args.samples)
+    lut = fit(samples, args.bits, args.core, args.outer)
+    lut.save(args.output)
+
+    # Check the table with the samples it was fitted from
+    print('%-6s %8s %8s %8s %8s' % ('color', 'samples', 'correct', 'none', 'wrong'))
+    for letter, rgbs in sorted(samples.items()):
+        results = [lut.classify(*rgb).letter for rgb in rgbs]
+        correct = results.count(letter)
+        none = results.count("N")
+        print('%-6s %8d %8d %8d %8d' % (letter, len(rgbs), correct, none, len(rgbs) - correct - none))
+
+    print('Wrote %s (%d bytes)' % (args.output, len(lut.tobytes())))
+
+if __name__ == '__main__':
+    main()
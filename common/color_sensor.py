@@ -1,60 +1,170 @@
-from wpilib import I2C, Color
-from rev.color import ColorSensorV3, ColorMatch
+import os
+import threading
+import time
+
+from collections import namedtuple
+
+from wpilib import I2C, Color, Timer
+from rev.color import ColorSensorV3
 from networktables import NetworkTables
 
+from common.color_classifier import ColorClassifier
+from common.color_lut import ColorLookupTable
+
+# A reading of the sensor: FPGA timestamp, raw color, the first letter of the matched color and the match confidence
+Sample = namedtuple('Sample', ['timestamp', 'color', 'match', 'confidence'])
+
 class ColorSensor():
-    def __init__(self):
+    """
+    Reads the REV color sensor and matches the color with the wheel of fortune colors.
+
+    After startSampling, the sensor is read on a background thread and the latest
+    sample is swapped in as a single attribute, so the control loop never waits for I2C.
+    Without the thread, the sensor is read when the color is requested.
+    """
+
+    sample_period = 0.02 # Time between two readings of the sampler thread in seconds
+    max_sample_age = 0.1 # A sample older than this is stale (the sensor is not read anymore) in seconds
+
+    # Lookup table built by the calibration tool (python -m common.color_lut), used instead of the reference colors if it exists
+    lut_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'color_lut.bin')
+
+    def __init__(self, telemetry):
+        """
+        :param telemetry: common.telemetry.Telemetry to register the dashboard values
+        """
         self.sd = NetworkTables.getTable('SmartDashboard')
 
         self.colorSensor = ColorSensorV3(I2C.Port.kOnboard)
-        self.colorMatcher = ColorMatch()
 
-        # Create possible colors to match from
+        # Create possible colors to match from, if there is no calibrated lookup table.
         # These values need to change for different environments.
-        # Use the print(color) line in the mathColor function to see the color values.
+        # Use the printColor function to see the color values.
         # Get the values from the driver station's console and adjust these values.
         self.kBlue = Color(0.167, 0.446, 0.385)
         self.kGreen = Color(0.202, 0.535, 0.261)
         self.kRed = Color(0.395, 0.409, 0.195)
         self.kYellow = Color(0.302, 0.542, 0.155)
         
-        # Add the colors to the matcher as options
-        self.colorMatcher.addColorMatch(self.kBlue)
-        self.colorMatcher.addColorMatch(self.kGreen)
-        self.colorMatcher.addColorMatch(self.kRed)
-        self.colorMatcher.addColorMatch(self.kYellow)
+        # Match the colors with 90% of confidence
+        self.classifier = ColorClassifier({
+            "B": (self.kBlue.red, self.kBlue.green, self.kBlue.blue),
+            "G": (self.kGreen.red, self.kGreen.green, self.kGreen.blue),
+            "R": (self.kRed.red, self.kRed.green, self.kRed.blue),
+            "Y": (self.kYellow.red, self.kYellow.green, self.kYellow.blue)
+        }, 0.9)
+
+        # Without a usable table (it is not calibrated yet), the reference colors are used.
+        # The dashboard shows which one is used.
+        self.classifierSource = 'reference colors'
+        try:
+            self.classifier = ColorLookupTable.load(self.lut_path)
+            self.classifierSource = 'lookup table'
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            self.classifierSource = 'reference colors (lookup table not loaded: %s)' % e
+
+        # The latest sample, replaced (never changed) by the reader
+        self.sample = Sample(0, Color(0, 0, 0), "N", 0.0)
+
+        # The last sample used by the robot code
+        self.lastSample = self.sample
+
+        self._thread = None
+        self._running = False
+        self.errors = 0 # Failed readings of the sampler thread
+
+        self.setupTelemetry(telemetry)
+
+    def startSampling(self):
+        """
+        Start reading the sensor on a background thread.
+        """
+        if self._thread is not None:
+            return
+
+        self._running = True
+        self._thread = threading.Thread(target=self._sampleLoop, name='ColorSensor', daemon=True)
+        self._thread.start()
+
+    def stopSampling(self):
+        """
+        Stop the background thread. The sensor is read on request again.
+        """
+        if self._thread is None:
+            return
+
+        self._running = False
+        self._thread.join()
+        self._thread = None
+
+    def _sampleLoop(self):
+        failing = False
+        while self._running:
+            # A failed reading (e.g. an I2C error) keeps the last sample, it becomes stale if it continues
+            try:
+                self.sample = self.readSample()
+                failing = False
+            except Exception as e:
+                self.errors += 1
+                if not failing:
+                    print('Color sensor reading failed:', repr(e))
+                failing = True
+            time.sleep(self.sample_period)
+
+    def readSample(self):
+        """
+        Read the sensor (blocking I2C read) and match the color.
+        :returns: Sample
+        """
+        color = self.colorSensor.getColor()
+        match = self.classifier.classify(color.red, color.green, color.blue)
+        return Sample(Timer.getFPGATimestamp(), color, match.letter, match.confidence)
+
+    def getSample(self):
+        """
+        Get the latest sample. Only reads the sensor if the sampler thread is not running.
+        :returns: Sample
+        """
+        if self._thread is None:
+            self.sample = self.readSample()
+
+        sample = self.sample
+        self.lastSample = sample
+        return sample
+
+    def isStale(self, sample):
+        '''
+        :returns: True if the sample is too old to be used (the sensor could not be read)
+        '''
+        return Timer.getFPGATimestamp() - sample.timestamp > self.max_sample_age
 
     def getColor(self):
         '''
         Get the current color from the sensor in raw format.
         :returns: frc::Color class with normalized sRGB values
         '''
-        return self.colorSensor.getColor()
+        return self.getSample().color
 
     def matchColor(self):
         '''
         Match the raw color output from the sensor with an option.
         :returns: First letter of the color (R / G / B / Y) or N for none.
         '''
-        color = self.getColor()
-        # Match the color with 90% of confidence
-        self.match = self.colorMatcher.matchClosestColor(color, 0.9)
-        # TODO: Adjust color values using the print function.
-        # print(color)
-        # If you don't see the prints in the DS, press the config button (gear)
-        # on the top left of the consol and select "+ Prints" option.
-
-        # Return the first letter of the color that matches the sensor value.
-        if (self.match == self.kBlue):
-            return "B"
-        elif (self.match == self.kGreen):
-            return "G"
-        elif (self.match == self.kRed):
-            return "R"
-        elif (self.match == self.kYellow):
-            return "Y"
-        else:
-            return "N"
-
-    def updateSD(self):
-        self.sd.putString("/wof/Color Match", self.matchColor())
+        return self.getSample().match
+
+    def printColor(self):
+        '''
+        Print the current color to adjust the reference colors.
+        If you don't see the prints in the DS, press the config button (gear)
+        on the top left of the consol and select "+ Prints" option.
+        '''
+        sample = self.getSample()
+        print(sample.color.red, sample.color.green, sample.color.blue, sample.match, sample.confidence)
+
+    def setupTelemetry(self, telemetry):
+        # The dashboard shows the latest sample, it does not read the sensor
+        telemetry.add_string("/wof/Color Match", lambda: self.sample.match)
+        telemetry.add_number("/wof/Color Sensor Errors", lambda: self.errors)
+        telemetry.add_string("/wof/Color Classifier", lambda: self.classifierSource)
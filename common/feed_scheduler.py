@@ -0,0 +1,82 @@
+class FeedScheduler():
+    """
+    Decides when the belt feeds the next ball into the shooter, and when the hopper is empty.
+
+    A ball entering the flywheels is a spike of the shooter current. The baseline follows the
+    current between the spikes, a spike starts `shot_current` over it and ends below half of that
+    (hysteresis). The belt holds the next ball until the spike ended and the flywheels are ready,
+    or until `recovery_timeout` after the last shot. With a ball count, the hopper is empty once
+    that many balls are shot, or when no ball is shot for `empty_time` while feeding (a ball is
+    missing). Without a ball count (the driver holds the trigger), it feeds until it is stopped.
+    """
+
+    def __init__(self, shot_current, baseline_gain, recovery_timeout, empty_time):
+        """
+        :param shot_current: A ball raises the current over the baseline by this in amps
+        :param baseline_gain: Part of the difference to the current that the baseline follows every update
+        :param recovery_timeout: Feeds the next ball after this many seconds even if the flywheels did not recover
+        :param empty_time: With a ball count, the hopper is empty if no ball is shot in this many seconds of feeding
+        """
+        self.shot_current = shot_current
+        self.baseline_gain = baseline_gain
+        self.recovery_timeout = recovery_timeout
+        self.empty_time = empty_time
+
+        self.reset()
+        self.start(0.0, 0.0)
+
+    def reset(self):
+        """
+        Start a new shoot, nothing is shot yet.
+        """
+        self.shots = 0 # Balls shot since the shoot started
+        self.ballCount = None # Balls to shoot, None to shoot until the hopper is empty
+        self.isEmpty = False
+
+    def start(self, current, now):
+        """
+        Start feeding, the flywheels are at speed.
+
+        :param current: Shooter current in amps, the baseline of the spikes
+        :param now: Time in seconds
+        """
+        self._baselineCurrent = current
+        self._inShot = False
+        self._lastShotTime = now
+
+    def detectShot(self, current):
+        """
+        Detect the start of a current spike.
+
+        :param current: Shooter current in amps
+        :returns: True if a ball entered the flywheels in this update
+        """
+        if self._inShot:
+            if current < self._baselineCurrent + self.shot_current / 2:
+                self._inShot = False
+            return False
+
+        if current > self._baselineCurrent + self.shot_current:
+            self._inShot = True
+            return True
+
+        self._baselineCurrent += (current - self._baselineCurrent) * self.baseline_gain
+        return False
+
+    def update(self, current, ready, now):
+        """
+        :param current: Shooter current in amps
+        :param ready: True if the flywheels are at the speed of the shot
+        :param now: Time in seconds, same clock as start
+        :returns: True if the belt should feed
+        """
+        if self.detectShot(current):
+            self.shots += 1
+            self._lastShotTime = now
+
+        sinceShot = now - self._lastShotTime
+        if self.ballCount is not None and (self.shots >= self.ballCount or sinceShot >= self.empty_time):
+            self.isEmpty = True
+            return False
+
+        return not self._inShot and (ready or sinceShot >= self.recovery_timeout)
@@ -0,0 +1,120 @@
+import math
+
+# Order of the modules in the SwerveDrive's buffers and in a rectangular geometry
+MODULE_NAMES = ('front_left', 'front_right', 'rear_left', 'rear_right')
+
+class ChassisGeometry():
+    """
+    Positions of the swerve modules and the constants calculated from them.
+
+    Positive x is to the front of the robot, positive y is to the left of the robot.
+    Everything is calculated when the positions are set, so the control loop only
+    reads the precalculated coefficients.
+
+    For a module at (px, py), the wheel vector of a (fwd, strafe, rcw) command is:
+        x = strafe + rcw * x_coefficients[i]
+        y = fwd + rcw * y_coefficients[i]
+    """
+
+    def __init__(self, positions):
+        """
+        :param positions: List of (x, y) module positions
+        """
+        self.positions = positions
+
+    @classmethod
+    def rectangular(cls, length, width):
+        """
+        Create the geometry of a rectangular chassis, in the SwerveDrive's module order
+        (front_left, front_right, rear_left, rear_right).
+
+        :param length: Half of the chassis' length (center to the front axle)
+        :param width: Half of the chassis' width (center to the left wheel)
+        """
+        return cls(cls.rectangle(length, width))
+
+    @staticmethod
+    def rectangle(length, width):
+        """
+        :returns: Module positions of a rectangular chassis
+        """
+        return ((length, width), (length, -width), (-length, width), (-length, -width))
+
+    @property
+    def positions(self):
+        return self._positions
+
+    @positions.setter
+    def positions(self, positions):
+        self._positions = tuple((float(x), float(y)) for x, y in positions)
+        self._calculate()
+
+    def _calculate(self):
+        """
+        Calculate every constant of the geometry. Only called when the positions change.
+        """
+        positions = self._positions
+
+        # The rotation vectors are scaled by the distance of the farthest module,
+        # so that a full rotation command turns the farthest wheel at full speed.
+        self.ratio = max(math.hypot(x, y) for x, y in positions)
+
+        self.x_coefficients = tuple(-x / self.ratio for x, _ in positions)
+        self.y_coefficients = tuple(y / self.ratio for _, y in positions)
+
+        # (module index, x coefficient, y coefficient) rows, iterated by the control loop
+        self.coefficients = tuple(zip(range(len(positions)), self.x_coefficients, self.y_coefficients))
+
+        # Wheel lock: each wheel is turned perpendicular to its rotation vector,
+        # so the wheels form an X and the robot is hard to push.
+        lock_angles = []
+        for xc, yc in zip(self.x_coefficients, self.y_coefficients):
+            angle = math.degrees(math.atan2(xc, yc)) + 90
+            if angle > 90:
+                angle -= 180
+            lock_angles.append(angle)
+        self.lock_angles = tuple(lock_angles)
+
+        self.forward_matrix = self._forward_matrix()
+
+    def _forward_matrix(self):
+        """
+        Calculate the least squares solution of the inverse kinematics.
+        It maps the stacked wheel vectors (x0, y0, x1, y1, ...) to (fwd, strafe, rcw).
+
+        :returns: 3 rows of 2 * N values
+        """
+        # Rows of the inverse kinematics matrix A, one for each wheel vector component
+        rows = []
+        for xc, yc in zip(self.x_coefficients, self.y_coefficients):
+            rows.append((0.0, 1.0, xc)) # x = strafe + rcw * xc
+            rows.append((1.0, 0.0, yc)) # y = fwd + rcw * yc
+
+        # (A^T A)^-1 A^T
+        ata = [[sum(row[i] * row[j] for row in rows) for j in range(3)] for i in range(3)]
+        inverse = self._invert3(ata)
+        return tuple(
+            tuple(sum(inverse[i][k] * row[k] for k in range(3)) for row in rows) for i in range(3)
+        )
+
+    @staticmethod
+    def _invert3(m):
+        """
+        :returns: The inverse of a 3x3 matrix
+        """
+        a, b, c = m[0]
+        d, e, f = m[1]
+        g, h, i = m[2]
+
+        det = a * (e * i - f * h) - b * (d * i - f * g) + c * (d * h - e * g)
+        if det == 0:
+            raise ValueError('The module positions can not describe the chassis movement')
+
+        return (
+            ((e * i - f * h) / det, (c * h - b * i) / det, (b * f - c * e) / det),
+            ((f * g - d * i) / det, (a * i - c * g) / det, (c * d - a * f) / det),
+            ((d * h - e * g) / det, (b * g - a * h) / det, (a * e - b * d) / det)
+        )
+
+    def __len__(self):
+        return len(self._positions)
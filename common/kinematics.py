@@ -0,0 +1,80 @@
+"""
+Batch swerve kinematics.
+
+These functions do the same math as SwerveDrive._calculate_vectors but for many
+commands and any number of modules at once. They are meant to be used offline
+(trajectory replays, simulations) where thousands of ticks are calculated in one call.
+
+Unlike the drive, they skip its input handling:
+    - No input threshold, components under SwerveDrive.lower_input_thresh are not zeroed.
+      Threshold the commands first to get the drive's result for small inputs.
+    - No zero command early return, a (0, 0, 0) command gives speeds of 0 and angles of 0
+      where the drive keeps the last angles of the modules (or turns them to the lock angles).
+"""
+
+import numpy as np
+
+from common.geometry import ChassisGeometry, MODULE_NAMES
+
+def module_positions(length, width):
+    """
+    Get the position of each module of a rectangular chassis.
+    Positive x is to the front of the robot, positive y is to the left of the robot.
+
+    :param length: Half of the chassis' length (center to the front axle)
+    :param width: Half of the chassis' width (center to the left wheel)
+    :returns: (4, 2) array of module positions in the MODULE_NAMES order
+    """
+    return np.array(ChassisGeometry.rectangle(length, width), dtype=float)
+
+def normalize_rows(data):
+    """
+    Divide each row by its maximum magnitude if that maximum is more than 1.
+    Batch version of SwerveDrive.normalize.
+
+    :param data: (M, N) array
+    :returns: A new normalized (M, N) array
+    """
+    data = np.asarray(data, dtype=float)
+    maxMagnitude = np.abs(data).max(axis=1, keepdims=True)
+    return data / np.maximum(maxMagnitude, 1.0)
+
+def inverse_kinematics(commands, positions, normalize=True):
+    """
+    Calculate the speed and angle of every module for every command.
+
+    Positive fwd value = Forward robot movement\n
+    Positive strafe value = Left robot movement\n
+    Positive rcw value = Clockwise robot rotation
+
+    :param commands: (M, 3) array of (fwd, strafe, rcw) commands, or a single (3,) command
+    :param positions: (N, 2) array of module positions (see module_positions) or a ChassisGeometry
+    :param normalize: Normalize the commands and the speeds the same way SwerveDrive does
+    :returns: (speeds, angles) as two (M, N) arrays. Angles are in degrees between -180 and 180.
+    """
+    commands = np.atleast_2d(np.asarray(commands, dtype=float))
+    if isinstance(positions, ChassisGeometry):
+        positions = positions.positions
+    positions = np.asarray(positions, dtype=float)
+
+    if normalize:
+        commands = normalize_rows(commands)
+
+    fwd = commands[:, 0:1]
+    strafe = commands[:, 1:2]
+    rcw = commands[:, 2:3]
+
+    # The rotation vector of each module is scaled by the farthest module's distance from the center.
+    # For a rectangular chassis this is math.hypot(length, width) just like the SwerveDrive.
+    ratio = np.hypot(positions[:, 0], positions[:, 1]).max()
+
+    x = strafe - rcw * (positions[:, 0] / ratio)
+    y = fwd + rcw * (positions[:, 1] / ratio)
+
+    speeds = np.hypot(x, y)
+    angles = np.degrees(np.arctan2(x, y))
+
+    if normalize:
+        speeds = normalize_rows(speeds)
+
+    return speeds, angles
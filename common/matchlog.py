@@ -0,0 +1,271 @@
+"""
+Binary match logs.
+
+Every robot iteration is stored as one fixed-size record, so any tick can be read
+directly with its index. The writer packs the records into a buffer and hands full
+buffers to a background thread, so the control loop never waits for the flash.
+The reader maps the file to the memory and unpacks the records from there.
+"""
+
+import mmap
+import os
+import queue
+import struct
+import threading
+
+from collections import namedtuple
+
+MAGIC = b'SWRVLOG'
+VERSION = 6
+
+# (name, struct format, count) of every value in a record
+FIELDS = (
+    # Time
+    ('timestamp', 'd', 1),
+    ('mode', 'B', 1), # See the MODE_ constants
+
+    # Inputs
+    ('gamepad_axes', 'f', 6),
+    ('gamepad_buttons', 'I', 1), # Bit i is button i + 1
+    ('gamepad_pov', 'h', 1),
+    ('gamepad2_axes', 'f', 6),
+    ('gamepad2_buttons', 'I', 1),
+    ('gamepad2_pov', 'h', 1),
+    ('switch', '?', 1),
+    ('encoder_voltages', 'f', 4), # Raw voltage, module order of the SwerveDrive
+    ('vision', 'f', 4), # tx, ty, tv, tl
+    ('pdp', 'f', 3), # Battery voltage, left and right shooter currents (the last values read by the shooter)
+    ('power_scales', 'f', 4), # Scales of the drive, shooter, climber and wof outputs, see POWER_GROUPS
+    ('color', 'f', 3), # red, green, blue of the last color sample used by the robot code
+    ('color_timestamp', 'd', 1), # FPGA timestamp of that sample
+    ('color_match', 'c', 1), # First letter of its matched color
+    ('color_confidence', 'f', 1),
+    ('game_data', 'c', 1), # First letter of the game specific message, N if there is none
+
+    # Outputs
+    ('module_speeds', 'f', 4), # Requested speed of each module
+    ('module_voltages', 'f', 4), # Requested rotate position of each module
+    ('rotate_outputs', 'f', 4),
+    ('drive_outputs', 'f', 4),
+    ('shooter_outputs', 'f', 4), # left, right, intake, belt
+    ('wof_output', 'f', 1),
+    ('climber_outputs', 'f', 2), # climbing, hook
+)
+
+# Names of the output fields, used to compare a replay with the log
+OUTPUT_FIELDS = (
+    'module_speeds', 'module_voltages', 'rotate_outputs', 'drive_outputs',
+    'shooter_outputs', 'wof_output', 'climber_outputs'
+)
+
+# Power groups of the power_scales field, in order
+POWER_GROUPS = ('drive', 'shooter', 'climber', 'wof')
+
+# Robot modes
+MODE_DISABLED = 0
+MODE_AUTONOMOUS = 1
+MODE_TELEOP = 2
+MODE_TEST = 3
+
+Record = namedtuple('Record', [name for name, _, _ in FIELDS])
+
+RECORD_STRUCT = struct.Struct('<' + ''.join('%d%s' % (count, fmt) for _, fmt, count in FIELDS))
+RECORD_SIZE = RECORD_STRUCT.size
+
+# Magic, version, record size
+HEADER_STRUCT = struct.Struct('<7sBI')
+HEADER_SIZE = HEADER_STRUCT.size
+
+def _field_slices():
+    """
+    :returns: Where each field is in the flat unpacked values. Single values are an index, groups are a slice.
+    """
+    slices = []
+    index = 0
+    for _, _, count in FIELDS:
+        slices.append(index if count == 1 else slice(index, index + count))
+        index += count
+    return tuple(slices)
+
+FIELD_SLICES = _field_slices()
+
+# Field names to their place in the flat values
+FIELD_INDEX = dict(zip(Record._fields, FIELD_SLICES))
+
+# Where the outputs start in the flat values, the outputs are the last fields
+OUTPUTS_START = FIELD_SLICES[len(FIELDS) - len(OUTPUT_FIELDS)].start
+
+def group(values):
+    """
+    Turn the flat values of a record into a Record.
+    """
+    return Record._make(values[s] for s in FIELD_SLICES)
+
+def flatten(record):
+    """
+    Turn a Record (or any sequence of field values) into flat values.
+    """
+    values = []
+    for (_, _, count), value in zip(FIELDS, record):
+        if count == 1:
+            values.append(value)
+        else:
+            values.extend(value)
+    return values
+
+class MatchLogWriter():
+    """
+    Appends records to a log file without blocking the caller.
+    """
+
+    def __init__(self, path, batch_size=50):
+        """
+        :param path: Log file, a header is written if the file is new
+        :param batch_size: Number of records given to the writing thread at once
+        """
+        self.path = path
+        self.batch_size = batch_size
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(HEADER_STRUCT.pack(MAGIC, VERSION, RECORD_SIZE))
+
+        self._queue = queue.SimpleQueue()
+        self._buffer = bytearray(batch_size * RECORD_SIZE)
+        self._count = 0
+
+        self.dropped = 0 # Records lost because the writing thread stopped (e.g. the disk is full)
+
+        self._thread = threading.Thread(target=self._run, name='MatchLogWriter', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """
+        Write the batches to the file until None is received.
+        """
+        try:
+            while True:
+                batch = self._queue.get()
+                if batch is None:
+                    break
+                self._file.write(batch)
+                self._file.flush()
+        finally:
+            self._file.close()
+
+    def _put(self, batch):
+        """
+        Hand a batch to the writing thread. If the thread stopped, the batch is dropped
+        instead of growing the queue forever.
+        """
+        if self._thread.is_alive():
+            self._queue.put(batch)
+        else:
+            self.dropped += len(batch) // RECORD_SIZE
+
+    def write(self, *values):
+        """
+        Add a record. The values are flat, in the order of RECORD_STRUCT.
+        """
+        RECORD_STRUCT.pack_into(self._buffer, self._count * RECORD_SIZE, *values)
+        self._count += 1
+
+        if self._count == self.batch_size:
+            self._put(self._buffer)
+            self._buffer = bytearray(self.batch_size * RECORD_SIZE)
+            self._count = 0
+
+    def write_record(self, record):
+        """
+        Add a Record.
+        """
+        self.write(*flatten(record))
+
+    def close(self):
+        """
+        Write the remaining records and wait for the thread to finish.
+        """
+        if self._count:
+            self._put(self._buffer[:self._count * RECORD_SIZE])
+            self._count = 0
+        if self._thread.is_alive():
+            self._queue.put(None)
+        self._thread.join()
+
+class MatchLogReader():
+    """
+    Random access to the records of a log file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._check_header()
+        except ValueError:
+            self.close()
+            raise
+
+        self._length = (len(self._map) - HEADER_SIZE) // RECORD_SIZE
+
+    def _check_header(self):
+        """
+        :raises ValueError: If the file is not a log of this version (truncated, or written by an older robot code)
+        """
+        if len(self._map) < HEADER_SIZE:
+            raise ValueError('%s is not a match log' % self.path)
+
+        magic, version, record_size = HEADER_STRUCT.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError('%s is not a match log' % self.path)
+        if version != VERSION or record_size != RECORD_SIZE:
+            raise ValueError('%s has log version %d with %d byte records, expected version %d with %d byte records'
+                % (self.path, version, record_size, VERSION, RECORD_SIZE))
+
+    def __len__(self):
+        return self._length
+
+    def values(self, index):
+        """
+        :returns: The flat values of a record
+        """
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('record index out of range')
+        return RECORD_STRUCT.unpack_from(self._map, HEADER_SIZE + index * RECORD_SIZE)
+
+    def __getitem__(self, index):
+        return group(self.values(index))
+
+    def iter_values(self, start=0, stop=None):
+        """
+        Iterate over the flat values of the records. Faster than grouping every record.
+        """
+        if stop is None or stop > self._length:
+            stop = self._length
+        view = memoryview(self._map)[HEADER_SIZE + start * RECORD_SIZE:HEADER_SIZE + stop * RECORD_SIZE]
+        try:
+            yield from RECORD_STRUCT.iter_unpack(view)
+        finally:
+            view.release()
+
+    def __iter__(self):
+        for values in self.iter_values():
+            yield group(values)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
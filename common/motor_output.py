@@ -0,0 +1,159 @@
+import time
+
+from collections import namedtuple
+
+# Set calls of a device and how many of them were sent to the motor controller
+WriteCount = namedtuple('WriteCount', ['calls', 'writes'])
+
+class CoalescedOutput():
+    """
+    Wraps a motor controller (ctre.WPI_VictorSPX) and only sends the set calls that matter.
+
+    A value is sent when it differs from the last sent value by more than the deadband,
+    when it is zero and the motor is not stopped yet, or when the last write is older than
+    the keepalive period (so the motor safety does not time out during long holds).
+    Every other attribute is forwarded to the motor controller.
+
+    The sent value is multiplied by scale, which the power manager lowers to prevent brownouts.
+    The scale can change between two set calls, applied_scale is the one the last value was sent with.
+    """
+
+    def __init__(self, motor, deadband=0.005, keepalive=0.05):
+        """
+        :param motor: The motor controller to write to
+        :param deadband: Changes smaller than this are not sent
+        :param keepalive: The value is sent again after this many seconds without a write
+        """
+        self.motor = motor
+        self.deadband = deadband
+        self.keepalive = keepalive
+
+        self._value = 0.0 # Last requested value
+        self._sent = None # Last value sent to the motor
+        self._last_write = 0.0
+
+        self.scale = 1.0 # Multiplier of the sent values
+        self.applied_scale = 1.0 # Scale of the last set call
+
+        self.calls = 0
+        self.writes = 0
+
+    def set(self, value):
+        """
+        Request an output. Only sent to the motor if it changed or the keepalive period passed.
+
+        :param value: [-1, 1]
+        """
+        self._value = value
+        self.calls += 1
+
+        self.applied_scale = self.scale
+        value *= self.scale
+        sent = self._sent
+        now = time.monotonic()
+        if sent is None or abs(value - sent) > self.deadband or (value == 0 and sent != 0) \
+                or now - self._last_write >= self.keepalive:
+            self.motor.set(value)
+            self._sent = value
+            self._last_write = now
+            self.writes += 1
+
+    def get(self):
+        """
+        :returns: The last requested value before the scale (the motor is within the deadband of it times the scale)
+        """
+        return self._value
+
+    def get_applied(self):
+        """
+        :returns: The last requested value times the scale it was sent with
+        """
+        return self._value * self.applied_scale
+
+    def reset_counts(self):
+        self.calls = 0
+        self.writes = 0
+
+    def __getattr__(self, name):
+        # Only called for the attributes that are not defined here
+        return getattr(self.motor, name)
+
+class OutputRegistry():
+    """
+    Creates the CoalescedOutputs of the robot and reports their write counts.
+    """
+
+    def __init__(self, deadband=0.005, keepalive=0.05):
+        """
+        :param deadband: Default deadband of the outputs
+        :param keepalive: Default keepalive period of the outputs in seconds
+        """
+        self.deadband = deadband
+        self.keepalive = keepalive
+
+        self.outputs = {}
+        self.groups = {} # Group names to their outputs
+        self.channels = {} # Group names to the PDP channels of their motors
+
+    def wrap(self, name, motor, deadband=None, keepalive=None, group=None, channel=None):
+        """
+        Wrap a motor controller.
+
+        :param name: Name of the device in the reports
+        :param motor: The motor controller
+        :param group: Name of the power group of the motor, its outputs are scaled together
+        :param channel: PDP channel of the motor, its current is counted for the group
+        :returns: CoalescedOutput to inject to the components instead of the motor controller
+        """
+        output = CoalescedOutput(
+            motor,
+            self.deadband if deadband is None else deadband,
+            self.keepalive if keepalive is None else keepalive
+        )
+        self.outputs[name] = output
+
+        if group is not None:
+            self.groups.setdefault(group, []).append(output)
+            channels = self.channels.setdefault(group, [])
+            if channel is not None:
+                channels.append(channel)
+
+        return output
+
+    def set_scale(self, group, scale):
+        """
+        Scale the outputs of a group. The new scale is used from their next set call.
+        """
+        for output in self.groups[group]:
+            output.scale = scale
+
+    def get_scale(self, group):
+        return self.groups[group][0].scale
+
+    def counts(self):
+        """
+        :returns: Dictionary of device names to WriteCounts
+        """
+        return {name: WriteCount(output.calls, output.writes) for name, output in self.outputs.items()}
+
+    def reset(self):
+        for output in self.outputs.values():
+            output.reset_counts()
+
+    def print_report(self):
+        """
+        Print the write counts to the log.
+        """
+        print('%-28s %8s %8s %8s' % ('device', 'calls', 'writes', 'saved'))
+        for name, count in self.counts().items():
+            saved = 1 - count.writes / count.calls if count.calls else 0
+            print('%-28s %8d %8d %7.1f%%' % (name, count.calls, count.writes, saved * 100))
+
+    def setup_telemetry(self, telemetry):
+        """
+        Register the write count of every device to the dashboard.
+
+        :param telemetry: common.telemetry.Telemetry
+        """
+        for name, output in self.outputs.items():
+            telemetry.add_number('can/%s_writes' % name, lambda output=output: output.writes)
@@ -0,0 +1,55 @@
+from networktables import NetworkTables, NetworkTablesInstance
+
+NotifyFlags = NetworkTablesInstance.NotifyFlags
+
+class ntcachedproperty():
+    """
+    Works like networktables.util.ntproperty, but the value is kept as a plain
+    attribute of the object.
+
+    The entry is found once when the class is created. On the first read, a listener
+    is added to the entry and the value is stored in the object's __dict__. After that,
+    reading the attribute does not go through the networktables at all, and the
+    listener replaces the value whenever it changes on the dashboard.
+
+    Assigning the attribute only changes the local value, it is not written to the table.
+    """
+
+    def __init__(self, key, defaultValue, writeDefault=True):
+        """
+        :param key: Full networktables key (e.g. /SmartDashboard/drive/drive/debugging)
+        :param defaultValue: Value to use if the entry does not exist
+        :param writeDefault: If True, overwrite the value in the table with the default
+        """
+        self.key = key
+        self.defaultValue = defaultValue
+        self.name = None
+
+        self.entry = NetworkTables.getEntry(key)
+        if writeDefault:
+            self.entry.forceSetValue(defaultValue)
+        else:
+            self.entry.setDefaultValue(defaultValue)
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+
+        name = self.name
+        values = obj.__dict__
+
+        def listener(entry, key, value, param):
+            values[name] = value
+
+        # Add the listener first so that no change is missed while reading the value.
+        self.entry.addListener(listener, NotifyFlags.UPDATE | NotifyFlags.LOCAL)
+
+        value = self.entry.value
+        if value is None:
+            value = self.defaultValue
+        values[name] = value
+
+        return value
@@ -0,0 +1,42 @@
+"""
+PDP channel of every motor whose current is read.
+
+The power manager and the shooter use the currents of these channels. The channels are NOT
+checked against the wiring yet. To check them, run each motor alone and see that its current
+shows on its channel in the dashboard (power/channel_N), then set VERIFIED to True.
+Until then the power manager does not scale the outputs.
+"""
+
+# True once every channel below is checked against the wiring
+VERIFIED = False
+
+CHANNEL_COUNT = 16
+
+# Motor names (the names of the outputs in robot.py) to their PDP channels
+CHANNELS = {
+    'frontLeftModule_driveMotor': 0,
+    'frontRightModule_driveMotor': 15,
+    'rearLeftModule_driveMotor': 1,
+    'rearRightModule_driveMotor': 14,
+    'shooter_leftShooterMotor': 4,
+    'shooter_rightShooterMotor': 5,
+    'shooter_intakeMotor': 6,
+    'shooter_beltMotor': 7,
+    'wof_motor': 8,
+    'hookMotor': 9,
+    'climbingMotor': 10,
+}
+
+def check(channels=CHANNELS, channel_count=CHANNEL_COUNT):
+    """
+    Check that every channel exists and is used by a single motor.
+
+    :raises ValueError: If a channel is out of range or used twice
+    """
+    used = {}
+    for name, channel in channels.items():
+        if not 0 <= channel < channel_count:
+            raise ValueError('%s is on channel %d, the PDP has %d channels' % (name, channel, channel_count))
+        if channel in used:
+            raise ValueError('%s and %s are both on channel %d' % (used[channel], name, channel))
+        used[channel] = name
@@ -0,0 +1,193 @@
+import time
+
+from array import array
+from collections import namedtuple
+
+# Timing summary of a section, durations are in seconds
+SectionStats = namedtuple('SectionStats', ['count', 'p50', 'p99', 'max', 'overruns'])
+
+class _Section():
+    """
+    Fixed-size ring buffer of the durations of one profiled section.
+    """
+    __slots__ = ('name', 'budget', 'durations', 'index', 'count', 'overruns', 'last_call')
+
+    def __init__(self, name, size, budget):
+        self.name = name
+        self.budget = budget
+        self.durations = array('d', (0,) * size)
+        self.index = 0
+        self.count = 0
+        self.overruns = 0
+        self.last_call = None
+
+    def record(self, duration):
+        """
+        Store a duration, overwriting the oldest one when the buffer is full.
+        """
+        self.durations[self.index] = duration
+        self.index += 1
+        if self.index == len(self.durations):
+            self.index = 0
+
+        self.count += 1
+        if self.budget is not None and duration > self.budget:
+            self.overruns += 1
+
+    def reset(self):
+        self.index = 0
+        self.count = 0
+        self.overruns = 0
+        self.last_call = None
+
+    def stats(self):
+        """
+        :returns: SectionStats of the durations in the buffer.
+        """
+        filled = min(self.count, len(self.durations))
+        if filled == 0:
+            return SectionStats(0, 0.0, 0.0, 0.0, self.overruns)
+
+        durations = sorted(self.durations[:filled])
+        return SectionStats(
+            self.count,
+            durations[(filled - 1) // 2],
+            durations[min(filled - 1, int(filled * 0.99))],
+            durations[-1],
+            self.overruns
+        )
+
+class Profiler():
+    """
+    Records how long the watched methods take every iteration.
+
+    Watched methods are only replaced with timed wrappers while the profiler is enabled.
+    When it is disabled the original methods are put back, so the instrumentation
+    costs nothing and can stay in the code for competitions.
+    """
+
+    def __init__(self, size=512, loop_period=0.02, enabled=False):
+        """
+        :param size: Number of durations kept for each section
+        :param loop_period: Time of one robot iteration in seconds, used as the default budget
+        :param enabled: Start timing right away
+        """
+        self.size = size
+        self.loop_period = loop_period
+
+        self._sections = {}
+        self._watches = [] # (section, obj, method, period)
+        self._enabled = False
+
+        self.enabled = enabled
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        enabled = bool(enabled)
+        if enabled == self._enabled:
+            return
+
+        self._enabled = enabled
+        for watch in self._watches:
+            if enabled:
+                self._install(*watch)
+            else:
+                self._uninstall(*watch)
+
+    def watch(self, name, obj, method='execute', budget=None, period=False):
+        """
+        Time a method of an object.
+
+        :param name: Name of the section in the report
+        :param obj: Object that owns the method (e.g. a component)
+        :param method: Name of the method to time
+        :param budget: Durations above this value (seconds) are counted as overruns.
+                       Defaults to the loop period.
+        :param period: If True, record the time between two calls instead of the duration of a call.
+                       Used to measure the length of the robot iterations.
+        """
+        if budget is None:
+            budget = self.loop_period
+
+        section = _Section(name, self.size, budget)
+        self._sections[name] = section
+
+        watch = (section, obj, method, period)
+        self._watches.append(watch)
+
+        if self._enabled:
+            self._install(*watch)
+
+    @staticmethod
+    def _install(section, obj, method, period):
+        """
+        Replace the method of the object with a timed wrapper.
+        """
+        func = getattr(obj, method)
+        perf_counter = time.perf_counter
+        record = section.record
+
+        if period:
+            def timed(*args, **kwargs):
+                now = perf_counter()
+                if section.last_call is not None:
+                    record(now - section.last_call)
+                section.last_call = now
+                return func(*args, **kwargs)
+        else:
+            def timed(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    record(perf_counter() - start)
+
+        # Remember what the wrapper covers, a method of the class or an attribute of the instance
+        timed.__wrapped__ = func
+        timed.section = section
+        timed.replaced_attribute = method in vars(obj)
+
+        setattr(obj, method, timed)
+
+    @staticmethod
+    def _uninstall(section, obj, method, period):
+        """
+        Put back the original method of the object.
+        """
+        timed = vars(obj).get(method)
+
+        # Keep the attribute if something else replaced the wrapper since
+        if getattr(timed, 'section', None) is section:
+            if timed.replaced_attribute:
+                setattr(obj, method, timed.__wrapped__)
+            else:
+                # The wrapper is stored on the instance, removing it uncovers the class' method.
+                del vars(obj)[method]
+        section.last_call = None
+
+    def reset(self):
+        """
+        Clear every recorded duration.
+        """
+        for section in self._sections.values():
+            section.reset()
+
+    def report(self):
+        """
+        :returns: Dictionary of section names to SectionStats
+        """
+        return {name: section.stats() for name, section in self._sections.items()}
+
+    def print_report(self):
+        """
+        Print the report to the log, durations in milliseconds.
+        """
+        print('%-28s %8s %8s %8s %8s %8s' % ('section', 'count', 'p50', 'p99', 'max', 'overrun'))
+        for name, stats in self.report().items():
+            print('%-28s %8d %8.3f %8.3f %8.3f %8d' % (
+                name, stats.count, stats.p50 * 1000, stats.p99 * 1000, stats.max * 1000, stats.overruns
+            ))
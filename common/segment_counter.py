@@ -0,0 +1,115 @@
+class SegmentCounter():
+    """
+    Counts the color segments of the wheel of fortune passing under the color sensor.
+
+    A new color is only accepted after it is read `debounce` times in a row with at least
+    `enter_confidence`, while a reading of the current color with `stay_confidence` cancels
+    it (hysteresis). Single misreads and the blurred readings between two segments are ignored.
+
+    The colors pass in a known order, so the step between the old and the new color tells
+    the direction, and a skipped segment is still counted.
+
+    The time between the transitions gives the speed of the wheel in segments per second.
+    """
+
+    def __init__(self, order, debounce=2, enter_confidence=0.92, stay_confidence=0.85):
+        """
+        :param order: Color letters in the order they pass under the sensor while spinning
+        :param debounce: Number of readings in a row needed to accept a new color
+        :param enter_confidence: Minimum confidence of a reading of a new color
+        :param stay_confidence: Minimum confidence of a reading of the current color to cancel a new color
+        """
+        self.order = tuple(order)
+        self.debounce = debounce
+        self.enter_confidence = enter_confidence
+        self.stay_confidence = stay_confidence
+
+        self.reset()
+
+    def reset(self, color="N", timestamp=0):
+        """
+        Start counting from a color.
+
+        :param color: Letter of the color under the sensor
+        :param timestamp: Time of the reading in seconds
+        """
+        self.current = color
+        self.transitions = 0 # Segments passed, negative if the wheel turned backwards
+        self.last_transition = timestamp # Time of the last transition, between the readings of the two colors
+        self._velocity = 0.0
+        self._measured = False # The first segment is partial, its speed is not measured
+
+        self._candidate = None
+        self._candidate_count = 0
+        self._candidate_time = timestamp
+        self._last_timestamp = None
+
+    def update(self, sample):
+        """
+        Add a reading of the sensor. The same reading (same timestamp) is only used once.
+
+        :param sample: common.color_sensor.Sample
+        :returns: Number of segments counted by this reading
+        """
+        if sample.timestamp == self._last_timestamp:
+            return 0
+        previous = self._last_timestamp
+        self._last_timestamp = sample.timestamp
+
+        color = sample.match
+        if color == "N":
+            return 0
+
+        if color == self.current or self.current == "N":
+            if self.current == "N" or sample.confidence >= self.stay_confidence:
+                self.current = color
+                self._candidate = None
+            return 0
+
+        if sample.confidence < self.enter_confidence:
+            return 0
+
+        if color != self._candidate:
+            self._candidate = color
+            self._candidate_count = 0
+
+            # The segment changed between the last reading and this one
+            self._candidate_time = sample.timestamp if previous is None else (previous + sample.timestamp) / 2
+
+        self._candidate_count += 1
+        if self._candidate_count < self.debounce:
+            return 0
+
+        # Accept the new color. 1 step is the next segment, 2 steps is a skipped segment
+        # and 3 steps is the previous segment.
+        step = (self.order.index(color) - self.order.index(self.current)) % len(self.order)
+        if step == len(self.order) - 1:
+            step = -1
+
+        # Speed over the last segment
+        elapsed = self._candidate_time - self.last_transition
+        if self._measured and elapsed > 0:
+            self._velocity = step / elapsed
+        self._measured = True
+
+        self.current = color
+        self.transitions += step
+        self.last_transition = self._candidate_time
+        self._candidate = None
+
+        return step
+
+    def velocity(self, now):
+        """
+        Estimate the speed of the wheel. If no transition happened for a while, the wheel
+        can not be faster than one segment in that time, so the estimate goes to zero when it stops.
+
+        :param now: Current time in seconds (same clock as the samples)
+        :returns: Segments per second, negative if the wheel turns backwards
+        """
+        elapsed = now - self.last_transition
+        if elapsed <= 0:
+            return self._velocity
+
+        limit = 1 / elapsed
+        return max(min(self._velocity, limit), -limit)
@@ -0,0 +1,129 @@
+"""
+Shot solutions for the limelight's vertical offset.
+
+The table is built once at startup with NumPy: a uniform grid of ty values, the
+distance of the target at each of them (the limelight distance estimation) and the
+shooter speed and spin up time at that distance (interpolated from the calibration shots).
+At runtime a lookup is a single index into the grid and a linear interpolation.
+
+The whole table can also be evaluated for many ty values at once for offline analysis:
+    distance, speed, spinup = table.evaluate(np.linspace(-30, 10, 100))
+"""
+
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+# Distance to the target wall in inches, shooter output [0, 1] and spin up time in seconds.
+# These values need to change after testing the shooter at each distance.
+CALIBRATION = (
+    (60, 0.55, 0.4),
+    (120, 0.7, 0.5),
+    (180, 0.8, 0.6),
+    (240, 0.9, 0.7),
+    (300, 1.0, 0.8),
+)
+
+# Solution of a shot: distance in inches, shooter output and spin up time in seconds
+Shot = namedtuple('Shot', ['distance', 'speed', 'spinup'])
+
+class ShotTable():
+    """
+    Distance, speed and spin up time for every `step` degrees of ty from ty_min to ty_max.
+    Outside of the grid, the values of the closest end are used.
+    """
+
+    def __init__(self, distance, speed, spinup, ty_min, step):
+        """
+        :param distance: array('f') of the distances in inches
+        :param speed: array('f') of the shooter outputs
+        :param spinup: array('f') of the spin up times in seconds
+        :param ty_min: ty of the first cell in degrees
+        :param step: Degrees between two cells
+        """
+        self.distance = distance
+        self.speed = speed
+        self.spinup = spinup
+        self.ty_min = ty_min
+        self.step = step
+
+        self._last = len(distance) - 1
+
+    def __len__(self):
+        return len(self.distance)
+
+    @property
+    def ty_max(self):
+        return self.ty_min + self._last * self.step
+
+    def _cell(self, ty):
+        """
+        :returns: Index of the cell before ty and the fraction to the next cell
+        """
+        position = (ty - self.ty_min) / self.step
+        if position <= 0:
+            return 0, 0.0
+        if position >= self._last:
+            return self._last - 1, 1.0
+
+        index = int(position)
+        return index, position - index
+
+    def distanceAt(self, ty):
+        """
+        :returns: Distance of the target in inches
+        """
+        index, fraction = self._cell(ty)
+        start = self.distance[index]
+        return start + (self.distance[index + 1] - start) * fraction
+
+    def lookup(self, ty):
+        """
+        :param ty: Vertical offset of the target in degrees
+        :returns: Shot
+        """
+        index, fraction = self._cell(ty)
+        distance, speed, spinup = self.distance, self.speed, self.spinup
+        return Shot(
+            distance[index] + (distance[index + 1] - distance[index]) * fraction,
+            speed[index] + (speed[index + 1] - speed[index]) * fraction,
+            spinup[index] + (spinup[index + 1] - spinup[index]) * fraction
+        )
+
+    def evaluate(self, ty):
+        """
+        Batch version of lookup.
+
+        :param ty: Array of vertical offsets in degrees
+        :returns: (distance, speed, spinup) arrays
+        """
+        grid = self.ty_min + np.arange(len(self)) * self.step
+        return tuple(np.interp(ty, grid, np.frombuffer(column, dtype=np.float32))
+            for column in (self.distance, self.speed, self.spinup))
+
+def build(calibration, cam_height, cam_angle, target_height, ty_min=-60, ty_max=15, step=0.1):
+    """
+    Build the table for a camera.
+
+    :param calibration: (distance, speed, spinup) of the calibration shots, sorted by distance
+    :param cam_height: Camera's height from the ground in inches
+    :param cam_angle: Camera's angle from the horizontal in degrees
+    :param target_height: Target's height from the ground in inches
+    :param ty_min: First ty of the grid in degrees
+    :param ty_max: Last ty of the grid in degrees, ty + cam_angle should stay below 90
+    :param step: Degrees between two cells
+    :returns: ShotTable
+    """
+    count = int(round((ty_max - ty_min) / step)) + 1
+    ty = ty_min + np.arange(count) * step
+
+    # https://docs.limelightvision.io/en/latest/cs_estimating_distance.html
+    distance = (target_height - cam_height) / np.tan(np.radians(ty + cam_angle))
+
+    points = np.asarray(calibration, dtype=float)
+    speed = np.interp(distance, points[:, 0], points[:, 1])
+    spinup = np.interp(distance, points[:, 0], points[:, 2])
+
+    columns = [array('f', column.astype(np.float32).tobytes()) for column in (distance, speed, spinup)]
+    return ShotTable(*columns, ty_min, step)
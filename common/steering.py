@@ -0,0 +1,31 @@
+"""
+Constants and steering decisions of a swerve module, in degrees.
+"""
+
+MAX_VOLTAGE = 5 # Absolute encoder measures from 0V to 5V
+MAX_SPEED = 12 # Estimated wheel speed at full output in feet per second
+
+def wrap_degrees(deg):
+    """
+    Wrap an angle difference to the shortest rotation.
+
+    :param deg: an angle in degrees, any value
+    :returns: the same angle from -180 (included) to 180 (excluded)
+    """
+    return (deg + 180) % 360 - 180
+
+def reverse(speed, deg, current):
+    """
+    If the shortest rotation from the current angle to the requested one is more than 90 degrees,
+    don't turn the wheel that far. Instead turn it to the opposite angle and reverse the speed.
+    The difference is wrapped, so 350 and 10 degrees are 20 degrees apart. At exactly 90 degrees
+    the wheel is turned and keeps its direction, at 180 degrees it is reversed and does not turn.
+
+    :param speed: requested speed of the wheel from -1 to 1
+    :param deg: requested angle of the wheel from 0 to 359
+    :param current: current angle of the wheel in degrees
+    :returns: (speed, angle) to set
+    """
+    if abs(wrap_degrees(deg - current)) > 90:
+        return -speed, (deg + 180) % 360
+    return speed, deg
@@ -0,0 +1,101 @@
+import math
+
+class TargetFilter():
+    """
+    Median filter of the vision target's frames, relative to the field.
+
+    Every frame is a bearing (the heading of the target on the field in degrees) and a distance
+    (in inches) measured at a position of the robot. The distance of a frame is seen from another
+    position by projecting the robot's movement since the frame onto the frame's bearing, so
+    turning in place does not change it. A frame too far from the median of the window is dropped,
+    unless the next ones agree with it (the target really moved).
+    """
+
+    def __init__(self, window, outlier_threshold, outlier_count, cam_facing=1):
+        """
+        :param window: Number of frames in the median filter
+        :param outlier_threshold: Maximum difference to the median in degrees (or inches / 10 for the distance)
+        :param outlier_count: Frames in a row that are accepted even if they are outliers
+        :param cam_facing: 1 if the camera looks to the front of the robot, -1 if it looks to the back
+        """
+        self.window = window
+        self.outlier_threshold = outlier_threshold
+        self.outlier_count = outlier_count
+        self.cam_facing = cam_facing
+
+        self._bearings = []
+        self._distances = []
+        self._positions = [] # Position (x, y) of the robot in feet at each frame
+        self._outliers = 0
+
+    def __len__(self):
+        return len(self._bearings)
+
+    def clear(self):
+        """
+        Forget the frames (the target is lost).
+        """
+        self._bearings.clear()
+        self._distances.clear()
+        self._positions.clear()
+        self._outliers = 0
+
+    @staticmethod
+    def _median(values):
+        ordered = sorted(values)
+        return ordered[len(ordered) // 2]
+
+    def _distanceFrom(self, i, x, y):
+        """
+        :returns: Distance of the frame i seen from the position (x, y) in inches
+        """
+        frame_x, frame_y = self._positions[i]
+        direction = math.radians(self._bearings[i])
+        travel = self.cam_facing * ((x - frame_x) * math.cos(direction) + (y - frame_y) * math.sin(direction)) * 12
+        return self._distances[i] - travel
+
+    def add(self, bearing, distance, x, y):
+        """
+        Gate and add a frame.
+
+        :param bearing: Heading of the target on the field in degrees
+        :param distance: Distance of the target in inches
+        :param x: Position of the robot when the frame was captured in feet
+        :param y: Position of the robot when the frame was captured in feet
+        :returns: False if the frame was dropped as an outlier
+        """
+        if len(self._bearings) >= self.window // 2 + 1:
+            outlier = abs(bearing - self._median(self._bearings)) > self.outlier_threshold or \
+                abs(distance - self.distanceAt(x, y)) > self.outlier_threshold * 10
+
+            if outlier:
+                self._outliers += 1
+                if self._outliers < self.outlier_count:
+                    return False
+
+                # The target moved, start over from the new frames
+                del self._bearings[:-1]
+                del self._distances[:-1]
+                del self._positions[:-1]
+
+        self._outliers = 0
+        self._bearings.append(bearing)
+        self._distances.append(distance)
+        self._positions.append((x, y))
+        if len(self._bearings) > self.window:
+            del self._bearings[0]
+            del self._distances[0]
+            del self._positions[0]
+        return True
+
+    def bearing(self):
+        """
+        :returns: Filtered heading of the target on the field in degrees
+        """
+        return self._median(self._bearings)
+
+    def distanceAt(self, x, y):
+        """
+        :returns: Filtered distance of the target seen from the position (x, y) in inches
+        """
+        return self._median([self._distanceFrom(i, x, y) for i in range(len(self._distances))])
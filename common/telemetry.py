@@ -0,0 +1,92 @@
+import time
+
+from networktables import NetworkTables
+
+class _Field():
+    """
+    A value that is published to the networktables.
+    """
+    __slots__ = ('entry', 'setter', 'getter', 'condition', 'last')
+
+    def __init__(self, entry, setter, getter, condition):
+        self.entry = entry
+        self.setter = setter
+        self.getter = getter
+        self.condition = condition
+        self.last = None
+
+class Telemetry():
+    """
+    Publishes the dashboard values of every component in one batch.
+
+    Components register their fields once (usually in their setup function) with a
+    function that returns the current value. The networktables entries are looked up
+    at registration, so publishing does not format or search any keys.
+    Values are only written if they changed, and only every `period` seconds
+    instead of every robot iteration.
+    """
+
+    def __init__(self, table='SmartDashboard', period=0.1):
+        """
+        :param table: Default networktable of the fields
+        :param period: Minimum time between two publishes in seconds
+        """
+        self.table = table
+        self.period = period
+
+        self._fields = []
+        self._last_publish = 0
+
+    def _add(self, key, getter, condition, table, setter):
+        entry = NetworkTables.getTable(table or self.table).getEntry(key)
+        self._fields.append(_Field(entry, getattr(entry, setter), getter, condition))
+
+    def add_number(self, key, getter, condition=None, table=None):
+        """
+        Register a number field.
+
+        :param key: Key of the value in the table
+        :param getter: Function that returns the value
+        :param condition: Optional function, the field is only published when it returns True
+        :param table: Networktable of the field, defaults to the telemetry's table
+        """
+        self._add(key, getter, condition, table, 'setDouble')
+
+    def add_boolean(self, key, getter, condition=None, table=None):
+        """
+        Register a boolean field. See add_number.
+        """
+        self._add(key, getter, condition, table, 'setBoolean')
+
+    def add_string(self, key, getter, condition=None, table=None):
+        """
+        Register a string field. See add_number.
+        """
+        self._add(key, getter, condition, table, 'setString')
+
+    def publish(self, force=False):
+        """
+        Write the changed fields to the networktables and flush them at once.
+        Should be called every robot iteration. Does nothing until the period passes.
+
+        :param force: Publish even if the period did not pass
+        """
+        now = time.monotonic()
+        if not force and now - self._last_publish < self.period:
+            return
+
+        self._last_publish = now
+
+        changed = False
+        for field in self._fields:
+            if field.condition is not None and not field.condition():
+                continue
+
+            value = field.getter()
+            if value != field.last:
+                field.setter(value)
+                field.last = value
+                changed = True
+
+        if changed:
+            NetworkTables.flush()
@@ -0,0 +1,188 @@
+"""
+Time-parameterized swerve paths.
+
+A path goes through a list of waypoints with a trapezoidal velocity profile
+(limited velocity and acceleration). It is sampled once at every robot period
+into drive commands, so playing it back is a single index into the samples.
+
+Generated paths are saved to a binary cache named after the path's parameters,
+the next time the same path is requested it is read from the cache.
+"""
+
+import hashlib
+import math
+import os
+import struct
+
+from array import array
+
+from common.steering import MAX_SPEED
+
+MAGIC = b'TRAJ'
+VERSION = 1
+
+# Magic, version, sample count, period
+HEADER_STRUCT = struct.Struct('<4sBIf')
+
+class Trajectory():
+    """
+    Drive commands (fwd, strafe, rcw) for every period of a path.
+    """
+
+    def __init__(self, fwd, strafe, rcw, period):
+        """
+        :param fwd: array('f') of the fwd commands
+        :param strafe: array('f') of the strafe commands
+        :param rcw: array('f') of the rcw commands
+        :param period: Time between two samples in seconds
+        """
+        self.fwd = fwd
+        self.strafe = strafe
+        self.rcw = rcw
+        self.period = period
+
+    def __len__(self):
+        return len(self.fwd)
+
+    @property
+    def duration(self):
+        """
+        :returns: Time until the last sample in seconds
+        """
+        return (len(self.fwd) - 1) * self.period
+
+    def sample(self, time):
+        """
+        Get the commands at a time since the start of the path.
+        After the end of the path, the last sample (stopped) is returned.
+
+        :param time: Seconds since the start of the path
+        :returns: (fwd, strafe, rcw)
+        """
+        index = int(time / self.period)
+        if index >= len(self.fwd):
+            index = len(self.fwd) - 1
+        elif index < 0:
+            index = 0
+        return self.fwd[index], self.strafe[index], self.rcw[index]
+
+    def tobytes(self):
+        return HEADER_STRUCT.pack(MAGIC, VERSION, len(self.fwd), self.period) + \
+            self.fwd.tobytes() + self.strafe.tobytes() + self.rcw.tobytes()
+
+    @classmethod
+    def frombytes(cls, data):
+        magic, version, count, period = HEADER_STRUCT.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a version %d trajectory' % VERSION)
+
+        size = HEADER_STRUCT.size + 3 * count * array('f').itemsize
+        if len(data) != size:
+            raise ValueError('The trajectory should have %d bytes, got %d' % (size, len(data)))
+
+        columns = []
+        offset = HEADER_STRUCT.size
+        for _ in range(3):
+            column = array('f')
+            column.frombytes(data[offset:offset + count * column.itemsize])
+            offset += count * column.itemsize
+            columns.append(column)
+
+        return cls(*columns, period)
+
+def generate(waypoints, max_velocity, max_acceleration, period=0.02):
+    """
+    Generate a path through the waypoints with a trapezoidal velocity profile.
+    The robot does not turn, x is along the drive's fwd command and y along the strafe command.
+
+    :param waypoints: List of (x, y) points in feet, starting at the robot (0, 0)
+    :param max_velocity: Maximum speed in ft/s
+    :param max_acceleration: Maximum acceleration in ft/s^2
+    :param period: Time between two samples in seconds
+    :returns: Trajectory
+    """
+    # Length of each segment
+    segments = []
+    for (x1, y1), (x2, y2) in zip(waypoints, waypoints[1:]):
+        length = math.hypot(x2 - x1, y2 - y1)
+        if length > 0:
+            segments.append((length, (x2 - x1) / length, (y2 - y1) / length))
+
+    total = sum(length for length, _, _ in segments)
+
+    # Trapezoidal profile, a triangle if the path is too short to reach the max velocity
+    peak = min(max_velocity, math.sqrt(max_acceleration * total))
+    accel_time = peak / max_acceleration if peak > 0 else 0
+    accel_distance = peak * accel_time / 2
+    cruise_time = (total - 2 * accel_distance) / peak if peak > 0 else 0
+    duration = 2 * accel_time + cruise_time
+
+    fwd = array('f')
+    strafe = array('f')
+    rcw = array('f')
+
+    count = int(math.ceil(duration / period)) + 1
+    for k in range(count):
+        t = min(k * period, duration)
+
+        # Distance along the path and the speed at time t
+        if t < accel_time:
+            velocity = max_acceleration * t
+            distance = velocity * t / 2
+        elif t < accel_time + cruise_time:
+            velocity = peak
+            distance = accel_distance + peak * (t - accel_time)
+        else:
+            remaining = max(duration - t, 0)
+            velocity = max_acceleration * remaining
+            distance = total - velocity * remaining / 2
+
+        if k == count - 1:
+            velocity = 0
+
+        # Direction of the segment at that distance
+        direction_x = direction_y = 0
+        for length, direction_x, direction_y in segments:
+            if distance <= length:
+                break
+            distance -= length
+
+        fwd.append(velocity * direction_x / MAX_SPEED)
+        strafe.append(velocity * direction_y / MAX_SPEED)
+        rcw.append(0)
+
+    return Trajectory(fwd, strafe, rcw, period)
+
+def cache_key(waypoints, max_velocity, max_acceleration, period):
+    """
+    :returns: A file name unique to the path's parameters
+    """
+    parameters = repr((VERSION, MAX_SPEED, tuple(map(tuple, waypoints)), max_velocity, max_acceleration, period))
+    return hashlib.sha1(parameters.encode()).hexdigest()[:16] + '.traj'
+
+def load_or_generate(waypoints, max_velocity, max_acceleration, period=0.02, cache_dir='trajectories'):
+    """
+    Read the path from the cache, or generate it and save it to the cache.
+    See generate for the parameters.
+
+    :returns: Trajectory
+    """
+    path = os.path.join(cache_dir, cache_key(waypoints, max_velocity, max_acceleration, period))
+
+    try:
+        with open(path, 'rb') as file:
+            return Trajectory.frombytes(file.read())
+    except (OSError, ValueError, struct.error):
+        pass
+
+    trajectory = generate(waypoints, max_velocity, max_acceleration, period)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(trajectory.tobytes())
+    except OSError:
+        # The path still works without the cache
+        pass
+
+    return trajectory
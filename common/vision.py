@@ -1,39 +1,94 @@
 import wpilib
 import math
 
-from components import swervedrive
+from components import swervedrive, odometry
 from networktables import NetworkTables
-from networktables.util import ntproperty
+
+from common import telemetry, shot_table
+from common.target_filter import TargetFilter
+from common.ntcache import ntcachedproperty
 
 class Vision():
+    """
+    Filters the limelight's target measurements.
+
+    Every iteration, a new frame of the limelight goes through:
+        - Validity: frames without a target (tv) are dropped, the target is lost after lost_time
+        - Latency compensation: the pose of the robot when the frame was captured is found in the
+          odometry's history, and the target is stored relative to the field (a bearing and a distance
+          measured at the frame's position)
+        - Outlier rejection: a frame too far from the median of the window is dropped,
+          unless the next ones agree with it (the target really moved)
+        - Median filter over the last `window` frames
+    The filtered target is then seen from the current pose, so the robot's movement since
+    the frame is compensated even between frames. See common.target_filter.TargetFilter.
+    """
+    # The pose history comes from the odometry
+    odometry: odometry.Odometry
+
+    telemetry: telemetry.Telemetry
+
     # Main networktable
     table = NetworkTables.getTable('limelight')
     # Horizontal offset from croshair to target in degrees
-    tx = ntproperty('/limelight/tx', 0)
+    tx = ntcachedproperty('/limelight/tx', 0, writeDefault=False)
     # Vertical offset from croshair to target in degress
-    ty = ntproperty('/limelight/ty', 0)
+    ty = ntcachedproperty('/limelight/ty', 0, writeDefault=False)
     # Whether the limelight has any valid targets
-    tv = ntproperty('/limelight/tv', 0)
+    tv = ntcachedproperty('/limelight/tv', 0, writeDefault=False)
+    # The pipeline's latency contribution in ms
+    tl = ntcachedproperty('/limelight/tl', 0, writeDefault=False)
 
     KpHorizontal = -0.6 # Proportional control constant for adjustment in horizontal
     KpVertical = -0.3 # Proportional control constant for adjustment in vertical
 
     cam_height = 38.5 # Camera's height from the ground in inches
     cam_angle = 70 # Camera's angle from the horizontal in degrees
+    cam_facing = -1 # The camera looks to the negative fwd direction of the drive (-x of the odometry)
+    capture_latency = 11 # Image capture latency of the limelight in ms (added to tl)
 
     target_height = 98.25 # Target's mid-point's height from the ground in inches
     target_distance = 120 # Desired distance from the wall to shoot
 
+    window = 5 # Number of frames in the median filter
+    outlier_threshold = 4 # Maximum difference to the median in degrees (or inches / 10 for the distance)
+    outlier_count = 3 # Frames in a row that are accepted even if they are outliers
+    lost_time = 0.25 # Time without a valid frame before the target is lost in seconds
+
+    deadband = 0.5 # The robot is aligned when the error is inside this in degrees
+    release = 1.0 # An aligned axis is only corrected again when the error is over this in degrees
+
     debug = True
 
+    def setup(self):
+        """
+        Called after injection.
+        """
+        # Field relative frames (bearing in degrees, distance in inches)
+        self.filter = TargetFilter(self.window, self.outlier_threshold, self.outlier_count, self.cam_facing)
+
+        self._last_frame = None
+        self._last_valid = None
+
+        # Filtered values, seen from the current pose
+        self.hasTarget = False
+        self.targetX = 0.0
+        self.targetY = 0.0
+        self.distance = 0.0
+
+        # Distance and shot solution of every ty, built once
+        self.shotTable = shot_table.build(shot_table.CALIBRATION, self.cam_height, self.cam_angle, self.target_height)
+
+        self.setupTelemetry()
+
     def getValues(self):
         '''
         Get values from the Limelight networktable.
         '''
         values = dict()
-        values['tx'] = self.table.getNumber('tx', 0)
-        values['ty'] = self.table.getNumber('ty', 0)
-        values['tv'] = self.table.getNumber('tv', 0)
+        values['tx'] = self.tx
+        values['ty'] = self.ty
+        values['tv'] = self.tv
 
         return values
 
@@ -47,43 +102,84 @@ class Vision():
         """
         return degree * math.pi / 180
 
-    def getDistance(self):
+    def distanceFromTy(self, ty):
         '''
-        Calculate the distance between the camera and the target wall.
-        :return: Distance in inch
+        :return: Distance between the camera and the target wall in inch
         '''
+        table = self.shotTable
+        if table.ty_min <= ty <= table.ty_max:
+            return table.distanceAt(ty)
+
         # https://docs.limelightvision.io/en/latest/cs_estimating_distance.html
-        
-        a1 = self.degree_to_rad(self.ty)
+        a1 = self.degree_to_rad(ty)
         a2 = self.degree_to_rad(self.cam_angle)
 
-        distance = (self.target_height - self.cam_height) / math.tan(a1 + a2)
-        return distance
+        return (self.target_height - self.cam_height) / math.tan(a1 + a2)
 
-    def verticalAdjust(self):
+    def tyFromDistance(self, distance):
         '''
-        Return the required vertical adjustment (drive) to align.
-        :return: Clamped error [-1, 1]
+        :return: The ty of the target at a distance in inch
         '''
-        error = self.ty
-        if error < 0.5 and error > -0.5:
-            error = 0
-        adjust = max(min(error, 1), -1)
-        return adjust
+        return math.degrees(math.atan2(self.target_height - self.cam_height, distance)) - self.cam_angle
 
-    def horizontalAdjust(self):
+    def getDistance(self):
         '''
-        Get the required horizontal adjustment (rotate) to align.
-        :return: Clamped error [-1, 1]
+        Calculate the distance between the camera and the target wall.
+        :return: Distance in inch
+        '''
+        return self.distance
+
+    def getShot(self):
         '''
-        error = self.tx
-        if error < 0.5 and error > -0.5:
-            error = 0
-        adjust = max(min(error, 1), -1)
-        return adjust
-
-    def updateTable(self):
-        if self.debug:
-            self.table.putNumber('Drive', self.verticalAdjust())
-            self.table.putNumber('Rotate', self.horizontalAdjust())
-            self.table.putNumber('Distance', self.getDistance())
+        :return: common.shot_table.Shot for the filtered target
+        '''
+        return self.shotTable.lookup(self.targetY)
+
+    def _addFrame(self, now):
+        """
+        Gate, compensate and filter a new frame.
+        """
+        frame_time = now - (self.tl + self.capture_latency) / 1000
+        pose = self.odometry.get_pose_at(frame_time)
+        if pose is None:
+            pose = self.odometry.pose
+        x, y, heading = pose
+
+        # The target relative to the field: turning left (CCW) moves it to the right (tx grows)
+        bearing = math.degrees(heading) - self.tx
+        self.filter.add(bearing, self.distanceFromTy(self.ty), x, y)
+
+    def execute(self):
+        now = wpilib.Timer.getFPGATimestamp()
+
+        if self.tv == 1:
+            # A new frame changes at least one of the values
+            frame = (self.tx, self.ty, self.tl)
+            if frame != self._last_frame:
+                self._last_frame = frame
+                self._addFrame(now)
+            self._last_valid = now
+
+        if self._last_valid is None or now - self._last_valid > self.lost_time:
+            # Lost the target
+            self.filter.clear()
+            self._last_valid = None
+
+        if not self.filter:
+            self.hasTarget = False
+            return
+
+        # See the filtered target from the current pose
+        x, y, heading = self.odometry.pose
+        self.hasTarget = True
+        self.targetX = math.degrees(heading) - self.filter.bearing()
+        self.distance = self.filter.distanceAt(x, y)
+        self.targetY = self.tyFromDistance(self.distance)
+
+    def setupTelemetry(self):
+        debug = lambda: self.debug
+
+        self.telemetry.add_boolean('hasTarget', lambda: self.hasTarget, debug, table='limelight')
+        self.telemetry.add_number('Filtered tx', lambda: self.targetX, debug, table='limelight')
+        self.telemetry.add_number('Filtered ty', lambda: self.targetY, debug, table='limelight')
+        self.telemetry.add_number('Distance', self.getDistance, debug, table='limelight')
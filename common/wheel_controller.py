@@ -0,0 +1,79 @@
+import math
+
+class WheelController():
+    """
+    Turns the wheel of fortune until the segment after a number of transitions is under the sensor.
+
+    The speed follows a profile that decelerates into the middle of the target segment
+    (v = sqrt(2 * decel * remaining)). The speed is measured from the segment timestamps,
+    and predicted from the motor output between them (the higher one is used, so the stop
+    is never late). The position inside the current segment is predicted from the speed and
+    the time since the last transition. When the wheel would coast into the target,
+    the motor is stopped.
+    """
+
+    def __init__(self, counter, max_segment_rate, wheel_tau, wheel_decel, velocity_kP, min_output, settle_time):
+        """
+        :param counter: SegmentCounter of the wheel
+        :param max_segment_rate: Segments per second at full motor output
+        :param wheel_tau: Time constant of the wheel speed in seconds
+        :param wheel_decel: Deceleration of the wheel in segments/s^2 (coasting, and the limit of the profile)
+        :param velocity_kP: Motor output per segment/s of speed error
+        :param min_output: Lowest output that still turns the wheel
+        :param settle_time: Time without a transition before the wheel is considered stopped
+        """
+        self.counter = counter
+        self.max_segment_rate = max_segment_rate
+        self.wheel_tau = wheel_tau
+        self.wheel_decel = wheel_decel
+        self.velocity_kP = velocity_kP
+        self.min_output = min_output
+        self.settle_time = settle_time
+
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the predicted speed, before a new spin.
+        """
+        self.remaining = 0 # Segments to the target
+        self.modelVelocity = 0 # Speed of the wheel predicted from the motor output
+        self._lastTime = None
+
+    def update(self, target, max_output, last_output, now):
+        """
+        :param target: Number of segment transitions since the start
+        :param max_output: Maximum motor output
+        :param last_output: Motor output since the last update
+        :param now: Current time in seconds (same clock as the samples)
+        :returns: (motor output, True once the wheel stopped on the target)
+        """
+        counter = self.counter
+
+        # Predict the speed from the last output
+        if self._lastTime is not None:
+            dt = now - self._lastTime
+            if last_output > 0:
+                self.modelVelocity += (last_output * self.max_segment_rate - self.modelVelocity) * (1 - math.exp(-dt / self.wheel_tau))
+            else:
+                self.modelVelocity = max(self.modelVelocity - self.wheel_decel * dt, 0)
+        self._lastTime = now
+
+        velocity = max(counter.velocity(now), self.modelVelocity)
+
+        # Remaining segments to the middle of the target segment
+        position = min(max(velocity, 0) * (now - counter.last_transition), 0.9)
+        remaining = target - counter.transitions + 0.5 - position
+        self.remaining = remaining
+
+        if counter.transitions >= target:
+            # On the target (or past it), done once the wheel stopped
+            return 0, counter.transitions == target and now - counter.last_transition > self.settle_time
+
+        if remaining <= velocity * velocity / (2 * self.wheel_decel):
+            # It will stop on the target by coasting
+            return 0, False
+
+        target_velocity = min(self.max_segment_rate * max_output, math.sqrt(2 * self.wheel_decel * remaining))
+        output = target_velocity / self.max_segment_rate + self.velocity_kP * (target_velocity - velocity)
+        return max(min(output, max_output), self.min_output), False
@@ -0,0 +1,105 @@
+import wpilib
+
+from components import swervedrive
+from common import vision
+
+class Aligner:
+    """
+    Aligns the robot with the vision target, correcting the distance (fwd) and the
+    heading (rcw) at the same time.
+
+    Each axis is a proportional controller on the filtered target angle with the vision's
+    gains scaled to max_output, plus a static feedforward to overcome the friction near the
+    target. The feedforward is never lower than the drive's input threshold, so the small
+    corrections are not dropped by the drive. The change of the outputs is limited by
+    slew_rate, so the robot does not jerk when the target appears.
+
+    This component should execute before the drive, so its commands replace the
+    driver's for the same iteration.
+    """
+    drive: swervedrive.SwerveDrive
+    vision: vision.Vision
+
+    max_output = 0.35 # Output at the full correction
+    feedforward = 0.1 # Output added in the direction of the error (outside the deadband), at least the drive's lower_input_thresh
+    slew_rate = 2.0 # Maximum change of an output per second
+
+    def setup(self):
+        """
+        Called after injection.
+        """
+        self._requested = False
+        self._last_time = None
+
+        self.fwd = 0.0
+        self.rcw = 0.0
+
+        self._verticalAligned = False
+        self._horizontalAligned = False
+        self.aligned = False # True when both axes are inside the deadband
+
+    def align(self):
+        """
+        Align the robot in this iteration. Should be called every iteration while aligning.
+        """
+        self._requested = True
+
+    def _axisAligned(self, error, aligned):
+        """
+        Deadband with hysteresis: an aligned axis is only corrected again when the
+        error leaves the release band.
+        """
+        if aligned:
+            return abs(error) < self.vision.release
+        return abs(error) < self.vision.deadband
+
+    def _correction(self, gain, error, aligned):
+        """
+        :returns: The output of an axis [-max_output, max_output]
+        """
+        if aligned:
+            return 0.0
+
+        feedforward = max(self.feedforward, self.drive.lower_input_thresh)
+        output = min(abs(gain * error) * self.max_output + feedforward, self.max_output)
+        return output if gain * error > 0 else -output
+
+    @staticmethod
+    def _slew(last, target, step):
+        return max(min(target, last + step), last - step)
+
+    def execute(self):
+        now = wpilib.Timer.getFPGATimestamp()
+        dt = 0 if self._last_time is None else min(now - self._last_time, 0.1)
+        self._last_time = now
+
+        requested = self._requested
+        self._requested = False
+
+        if not self.vision.hasTarget:
+            self.aligned = False
+            self._verticalAligned = False
+            self._horizontalAligned = False
+            target_fwd = 0.0
+            target_rcw = 0.0
+        else:
+            # The error is the opposite of the target's position, the gains are negative
+            self._verticalAligned = self._axisAligned(self.vision.targetY, self._verticalAligned)
+            self._horizontalAligned = self._axisAligned(self.vision.targetX, self._horizontalAligned)
+            self.aligned = self._verticalAligned and self._horizontalAligned
+
+            target_fwd = self._correction(self.vision.KpVertical, -self.vision.targetY, self._verticalAligned)
+            target_rcw = self._correction(self.vision.KpHorizontal, -self.vision.targetX, self._horizontalAligned)
+
+        if not requested:
+            # Start from zero the next time
+            self.fwd = 0.0
+            self.rcw = 0.0
+            return
+
+        step = self.slew_rate * dt
+        self.fwd = self._slew(self.fwd, target_fwd, step)
+        self.rcw = self._slew(self.rcw, target_rcw, step)
+
+        self.drive.set_raw_fwd(self.fwd)
+        self.drive.set_raw_rcw(self.rcw)
@@ -0,0 +1,146 @@
+import math
+
+from array import array
+
+import wpilib
+
+from components import swervedrive
+from common.steering import MAX_SPEED
+
+class Odometry:
+    """
+    Estimates the position of the robot from the module angles and speeds.
+
+    Every iteration the wheel vectors are combined into the chassis movement with
+    the drive geometry's forward kinematics and added to the pose. The wheel speeds
+    come from the drive motor outputs, since the drive motors have no encoders.
+    The pose and the distance are an open loop estimate (output times MAX_SPEED), they are
+    off by as much as MAX_SPEED is off and do not see wheel slip or a blocked robot.
+
+    The pose is x, y in feet and the heading in radians (counter-clockwise).
+    At reset, the robot faces the +x direction.
+    """
+    # The modules and the geometry come from the drive
+    drive: swervedrive.SwerveDrive
+
+    history_size = 256 # Number of poses kept in the history (about 5 seconds)
+
+    def setup(self):
+        """
+        Called after injection.
+        """
+        n = len(self.drive._modules)
+        self._wheel_vectors = array('d', (0,) * (2 * n))
+
+        # Ring buffers of the pose history
+        self._times = array('d', (0,) * self.history_size)
+        self._xs = array('d', (0,) * self.history_size)
+        self._ys = array('d', (0,) * self.history_size)
+        self._headings = array('d', (0,) * self.history_size)
+        self._index = 0
+        self._count = 0
+
+        self.reset()
+
+    def reset(self, x=0, y=0, heading=0):
+        """
+        Set the pose and clear the history.
+        """
+        self.x = x
+        self.y = y
+        self.heading = heading
+        self.distance = 0 # Total distance travelled in feet (estimated from the outputs)
+
+        self._last_time = None
+        self._index = 0
+        self._count = 0
+
+    @property
+    def pose(self):
+        return (self.x, self.y, self.heading)
+
+    def distance_since(self, distance):
+        """
+        :param distance: A previous value of self.distance
+        :returns: Distance travelled since then in feet
+        """
+        return self.distance - distance
+
+    def get_pose_at(self, timestamp):
+        """
+        Find the pose at a time in the past by interpolating the history.
+
+        :param timestamp: FPGA timestamp in seconds
+        :returns: (x, y, heading) or None if the history does not go back that far
+        """
+        size = self.history_size
+        newer = None
+
+        for back in range(self._count):
+            i = (self._index - 1 - back) % size
+            time = self._times[i]
+
+            if time <= timestamp:
+                if newer is None:
+                    return (self._xs[i], self._ys[i], self._headings[i])
+
+                # Interpolate between this pose and the newer one
+                t = (timestamp - time) / (self._times[newer] - time)
+                return (
+                    self._xs[i] + (self._xs[newer] - self._xs[i]) * t,
+                    self._ys[i] + (self._ys[newer] - self._ys[i]) * t,
+                    self._headings[i] + (self._headings[newer] - self._headings[i]) * t
+                )
+
+            newer = i
+
+        return None
+
+    def execute(self):
+        """
+        Add this iteration's movement to the pose.
+        """
+        now = wpilib.Timer.getFPGATimestamp()
+        dt = 0 if self._last_time is None else now - self._last_time
+        self._last_time = now
+
+        geometry = self.drive.geometry
+        vectors = self._wheel_vectors
+
+        for i, module in self.drive._indexed_modules:
+            angle = math.radians(module.voltage_to_degrees(module.get_voltage()))
+            # The power manager can scale the output down
+            speed = module.driveMotor.get_applied() * MAX_SPEED
+            vectors[2 * i] = speed * math.sin(angle)
+            vectors[2 * i + 1] = speed * math.cos(angle)
+
+        # Chassis speeds with the precalculated forward kinematics
+        fwd_row, strafe_row, rcw_row = geometry.forward_matrix
+        fwd = 0.0
+        strafe = 0.0
+        rcw = 0.0
+        for i in range(len(vectors)):
+            fwd += fwd_row[i] * vectors[i]
+            strafe += strafe_row[i] * vectors[i]
+            rcw += rcw_row[i] * vectors[i]
+
+        # The rotation is clockwise and scaled by the farthest module's distance
+        turn = -rcw / geometry.ratio * dt
+
+        heading = self.heading + turn / 2 # Heading at the middle of the iteration
+        cos = math.cos(heading)
+        sin = math.sin(heading)
+        self.x += (fwd * cos - strafe * sin) * dt
+        self.y += (fwd * sin + strafe * cos) * dt
+        self.heading += turn
+        self.distance += math.hypot(fwd, strafe) * dt
+
+        # Add the pose to the history
+        i = self._index
+        self._times[i] = now
+        self._xs[i] = self.x
+        self._ys[i] = self.y
+        self._headings[i] = self.heading
+        self._index = (i + 1) % self.history_size
+        if self._count < self.history_size:
+            self._count += 1
@@ -0,0 +1,178 @@
+import math
+
+import wpilib
+
+from common import motor_output, telemetry, pdp_channels
+
+class PowerManager:
+    """
+    Keeps the battery above the brownout voltage by scaling the motor groups down by priority.
+
+    The PDP is sampled every sample_period. The battery is modelled as an open circuit
+    voltage behind an internal resistance (V = Voc - I * R), both are fitted from the
+    samples with exponentially weighted averages, so the model follows the battery as
+    it drains during the match.
+
+    The demand of a group is its requested outputs times its current per output, which is
+    learned from the samples while the group runs. Every iteration, the current that keeps the
+    voltage above min_voltage is shared between the groups by priority. A group gets its full
+    demand if it fits, otherwise it is scaled to the current left for it, and the groups after it
+    get nothing. Scales drop at once and recover at recovery_rate.
+
+    This component should execute first, so the scales are used by the other
+    components in the same iteration.
+    """
+    pdp: wpilib.PowerDistributionPanel
+    outputs: motor_output.OutputRegistry
+    telemetry: telemetry.Telemetry
+
+    priorities = ('drive', 'shooter', 'climber', 'wof') # Output groups from the most to the least important
+
+    # Never scale the outputs before the PDP channels are checked against the wiring, guessed currents would throttle the robot
+    enabled = pdp_channels.VERIFIED
+    sample_period = 0.04 # Time between two samples of the PDP in seconds
+    channel_count = pdp_channels.CHANNEL_COUNT
+
+    min_voltage = 7.5 # Lowest battery voltage allowed (the roboRIO browns out at 6.8 V)
+    model_time = 2.0 # Time constant of the battery model's averages in seconds
+    resistance = 0.015 # Initial internal resistance of the battery and the wiring in ohms
+    min_resistance = 0.005
+    max_resistance = 0.05
+    min_variance = 25 # Current variance (A^2) needed to fit the resistance
+    recovery_rate = 2.0 # Maximum increase of a scale per second
+    amps_per_output = 40 # Initial current of a motor at the full output in amps
+    demand_time = 0.1 # Time constant of the learned current per output in seconds (a stall raises it quickly)
+    min_applied = 0.1 # Sum of the applied outputs of a group needed to learn its current per output
+
+    debug = True
+
+    def setup(self):
+        """
+        Called after injection.
+        """
+        self.voltage = 12.0
+        self.current = 0.0
+        self.openVoltage = 12.0
+        self.available = 0.0 # Current that keeps the voltage above min_voltage in amps
+        self.groupCurrents = dict.fromkeys(self.priorities, 0.0)
+        self.groupDemands = dict.fromkeys(self.priorities, 0.0)
+        self.channelCurrents = [0.0] * self.channel_count
+        self._gains = dict.fromkeys(self.priorities, self.amps_per_output)
+
+        self._meanCurrent = None
+        self._meanVoltage = 0.0
+        self._covariance = 0.0
+        self._variance = 0.0
+
+        self._last_sample = None
+        self._last_budget = None
+
+        self.setupTelemetry()
+
+    def sample(self):
+        """
+        Read the voltage and the current of every channel.
+        """
+        currents = self.channelCurrents
+        for channel in range(self.channel_count):
+            currents[channel] = self.pdp.getCurrent(channel)
+
+        self.voltage = self.pdp.getVoltage()
+        self.current = sum(currents)
+        for group in self.priorities:
+            self.groupCurrents[group] = sum(currents[channel] for channel in self.outputs.channels.get(group, ()))
+
+    def updateModel(self):
+        """
+        Fit the open circuit voltage and the internal resistance to the latest sample.
+        """
+        current, voltage = self.current, self.voltage
+        if self._meanCurrent is None:
+            self._meanCurrent = current
+            self._meanVoltage = voltage
+
+        alpha = 1 - math.exp(-self.sample_period / self.model_time)
+        self._meanCurrent += (current - self._meanCurrent) * alpha
+        self._meanVoltage += (voltage - self._meanVoltage) * alpha
+
+        dI = current - self._meanCurrent
+        dV = voltage - self._meanVoltage
+        self._covariance += (dI * dV - self._covariance) * alpha
+        self._variance += (dI * dI - self._variance) * alpha
+
+        # Only fit the resistance when the current changed enough, otherwise keep the last one
+        if self._variance > self.min_variance:
+            resistance = -self._covariance / self._variance
+            self.resistance = max(min(resistance, self.max_resistance), self.min_resistance)
+
+        self.openVoltage = self._meanVoltage + self.resistance * self._meanCurrent
+
+        # Current per output of every group that ran since the last sample
+        alpha = 1 - math.exp(-self.sample_period / self.demand_time)
+        for group, outputs in self.outputs.groups.items():
+            if group not in self._gains:
+                continue
+            applied = sum(abs(output.get_applied()) for output in outputs)
+            if applied >= self.min_applied:
+                self._gains[group] += (self.groupCurrents[group] / applied - self._gains[group]) * alpha
+
+    def budget(self, dt):
+        """
+        Share the available current between the groups by priority.
+
+        :param dt: Time since the last budget in seconds
+        """
+        self.available = (self.openVoltage - self.min_voltage) / self.resistance
+
+        # The motors outside of the groups (e.g. the rotate motors) are never scaled
+        remaining = self.available - (self.current - sum(self.groupCurrents.values()))
+
+        for group in self.priorities:
+            if group not in self.outputs.groups:
+                continue
+
+            outputs = self.outputs.groups[group]
+            scale = outputs[0].scale
+            demand = self._gains[group] * sum(abs(output.get()) for output in outputs)
+            self.groupDemands[group] = demand
+
+            if demand <= max(remaining, 0):
+                target = 1.0
+            else:
+                target = max(remaining, 0) / demand
+            remaining -= demand * target
+
+            self.outputs.set_scale(group, min(target, scale + self.recovery_rate * dt))
+
+    def execute(self):
+        now = wpilib.Timer.getFPGATimestamp()
+
+        if self._last_sample is None or now - self._last_sample >= self.sample_period:
+            self._last_sample = now
+            self.sample()
+            self.updateModel()
+
+        dt = 0 if self._last_budget is None else now - self._last_budget
+        self._last_budget = now
+
+        if self.enabled:
+            self.budget(dt)
+        else:
+            for group in self.outputs.groups:
+                self.outputs.set_scale(group, 1.0)
+
+    def setupTelemetry(self):
+        debug = lambda: self.debug
+
+        self.telemetry.add_number('power/voltage', lambda: self.voltage, debug)
+        self.telemetry.add_number('power/current', lambda: self.current, debug)
+        self.telemetry.add_number('power/resistance', lambda: self.resistance, debug)
+        self.telemetry.add_number('power/available', lambda: self.available, debug)
+        for channel in range(self.channel_count):
+            # Shows the channel of a motor that runs alone, to check the wiring
+            self.telemetry.add_number('power/channel_%d' % channel, lambda channel=channel: self.channelCurrents[channel], debug)
+        for group in self.priorities:
+            self.telemetry.add_number('power/%s_current' % group, lambda group=group: self.groupCurrents[group], debug)
+            self.telemetry.add_number('power/%s_demand' % group, lambda group=group: self.groupDemands[group], debug)
+            self.telemetry.add_number('power/%s_scale' % group,
+                lambda group=group: self.outputs.get_scale(group) if group in self.outputs.groups else 1.0, debug)
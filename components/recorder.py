@@ -0,0 +1,141 @@
+import os
+import time
+
+import wpilib
+
+from components import swervedrive, shooter, wof
+from common import color_sensor, vision, matchlog, motor_output
+
+class MatchRecorder:
+    """
+    Records the inputs and outputs of every iteration to a match log.
+
+    This component should be the last one in the robot, so that it
+    executes after the other components set their outputs.
+    A new log file is started every time the robot is enabled.
+    """
+    # Get the inputs and the components from the injection
+    gamempad: wpilib.Joystick
+    gamempad2: wpilib.Joystick
+    switch: wpilib.DigitalInput
+
+    drive: swervedrive.SwerveDrive
+    shooter: shooter.Shooter
+    wof: wof.WheelOfFortune
+
+    climbingMotor: motor_output.CoalescedOutput
+    hookMotor: motor_output.CoalescedOutput
+
+    vision: vision.Vision
+    colorSensor: color_sensor.ColorSensor
+
+    enabled = True # Turn to false to stop recording
+    log_dir = '/home/lvuser/logs' # Directory of the logs on the roboRIO
+
+    def setup(self):
+        """
+        Called after injection.
+        """
+        if wpilib.RobotBase.isSimulation():
+            self.log_dir = 'logs'
+
+        self.writer = None
+
+    def on_enable(self):
+        """
+        Called by MagicBot when the robot is enabled. Starts a new log.
+        """
+        if self.enabled:
+            path = os.path.join(self.log_dir, time.strftime('match-%Y%m%d-%H%M%S.swlog'))
+            self.writer = matchlog.MatchLogWriter(path)
+
+    def on_disable(self):
+        """
+        Called by MagicBot when the robot is disabled. Writes the rest of the log.
+        """
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    @staticmethod
+    def _buttons(gamepad):
+        """
+        :returns: The buttons of the gamepad as bits
+        """
+        buttons = 0
+        for i in range(gamepad.getButtonCount()):
+            if gamepad.getRawButton(i + 1):
+                buttons |= 1 << i
+        return buttons
+
+    @staticmethod
+    def _mode():
+        """
+        :returns: The current robot mode as one of the matchlog.MODE_ constants
+        """
+        ds = wpilib.DriverStation.getInstance()
+        if ds.isDisabled():
+            return matchlog.MODE_DISABLED
+        elif ds.isAutonomous():
+            return matchlog.MODE_AUTONOMOUS
+        elif ds.isTest():
+            return matchlog.MODE_TEST
+        return matchlog.MODE_TELEOP
+
+    def scaledMotors(self):
+        """
+        :returns: A motor of every power group, in the order of matchlog.POWER_GROUPS
+        """
+        return (self.drive._modules[0].driveMotor, self.shooter.leftShooterMotor, self.climbingMotor, self.wof.motor)
+
+    def inputs(self):
+        """
+        :returns: The flat input values of a record
+        """
+        gamepad = self.gamempad
+        gamepad2 = self.gamempad2
+        sample = self.colorSensor.lastSample
+        color = sample.color
+
+        return (
+            *(gamepad.getRawAxis(i) for i in range(6)),
+            self._buttons(gamepad),
+            gamepad.getPOV(),
+            *(gamepad2.getRawAxis(i) for i in range(6)),
+            self._buttons(gamepad2),
+            gamepad2.getPOV(),
+            self.switch.get(),
+            *(module.encoder.getVoltage() for module in self.drive._modules),
+            self.vision.tx, self.vision.ty, self.vision.tv, self.vision.tl,
+            self.shooter.voltage, self.shooter.leftCurrent, self.shooter.rightCurrent,
+            *(motor.applied_scale for motor in self.scaledMotors()),
+            color.red, color.green, color.blue,
+            sample.timestamp, sample.match[:1].encode(), sample.confidence,
+            self.wof.getData()[:1].encode()
+        )
+
+    def outputs(self):
+        """
+        :returns: The flat output values of a record
+        """
+        modules = self.drive._modules
+
+        return (
+            *(module._requested_speed for module in modules),
+            *(module._requested_voltage for module in modules),
+            *(module.rotateMotor.get() for module in modules),
+            *(module.driveMotor.get() for module in modules),
+            self.shooter.leftShooterMotor.get(),
+            self.shooter.rightShooterMotor.get(),
+            self.shooter.intakeMotor.get(),
+            self.shooter.beltMotor.get(),
+            self.wof.motor.get(),
+            self.climbingMotor.get(),
+            self.hookMotor.get()
+        )
+
+    def execute(self):
+        if self.writer is None:
+            return
+
+        self.writer.write(wpilib.Timer.getFPGATimestamp(), self._mode(), *self.inputs(), *self.outputs())
@@ -1,10 +1,12 @@
+import math
+
 import wpilib
-import ctre
 
 from magicbot import StateMachine, timed_state, state
 
-from components import swervedrive
-from common import vision
+from components import swervedrive, aligner
+from common import vision, motor_output, shot_table, pdp_channels
+from common.feed_scheduler import FeedScheduler
 
 class Shooter(StateMachine):
     """
@@ -18,18 +20,81 @@ class Shooter(StateMachine):
     # Get the motors, drive and vision from injection
     drive: swervedrive.SwerveDrive
 
-    leftShooterMotor: ctre.WPI_VictorSPX
-    rightShooterMotor: ctre.WPI_VictorSPX
-    beltMotor: ctre.WPI_VictorSPX
-    intakeMotor: ctre.WPI_VictorSPX
+    leftShooterMotor: motor_output.CoalescedOutput
+    rightShooterMotor: motor_output.CoalescedOutput
+    beltMotor: motor_output.CoalescedOutput
+    intakeMotor: motor_output.CoalescedOutput
 
     vision: vision.Vision
+    aligner: aligner.Aligner
+
+    # The battery voltage and the current of the shooter motors
+    pdp: wpilib.PowerDistributionPanel
+
+    # The shot without a target (from the initiation line)
+    default_shot = shot_table.Shot(vision.Vision.target_distance, 0.7, 0.5)
+    shot = default_shot
+
+    # Flywheel model, the speed is a fraction of the free speed at the nominal voltage
+    nominal_voltage = 12
+    flywheel_tau = 0.15 # Time constant of the flywheels while they are driven in seconds
+    coast_tau = 2.0 # Time constant of the flywheels while they coast in seconds
+    motor_resistance = 0.09 # Winding resistance of a shooter motor in ohms
+    left_channel = pdp_channels.CHANNELS['shooter_leftShooterMotor'] # PDP channels of the shooter motors
+    right_channel = pdp_channels.CHANNELS['shooter_rightShooterMotor']
+    min_current_output = 0.2 # Below this output, the current is too small to estimate the speed
+    current_gain = 0.2 # Part of the difference to the current's estimate corrected every iteration
+
+    ready_tolerance = 0.05 # The flywheels are ready inside this fraction of the shot's speed
+    spinup_timeout = 2 # The shooter feeds after this many times the shot's spin up time even if it is not ready
+
+    # Feed scheduler
+    feed_speed = 0.5 # Belt output while feeding
+    shot_current = 10 # A ball in the flywheels raises the shooter current over the baseline by this in amps
+    baseline_gain = 0.1 # Part of the difference to the current that the baseline follows every iteration
+    recovery_timeout = 0.5 # Feeds the next ball after this many seconds even if the flywheels did not recover
+    empty_time = 1.0 # With a ball count, the hopper is empty if no ball is shot in this many seconds of feeding
 
     # Set the speeds to zero.
     shooter_speed = 0
     intake_speed = 0
     belt_speed = 0
 
+    def setup(self):
+        """
+        Called after injection.
+        """
+        self.flywheelSpeed = 0.0
+        self.voltage = self.nominal_voltage
+        self.leftCurrent = 0.0
+        self.rightCurrent = 0.0
+        self._lastFlywheelTime = None
+
+        self.feeder = FeedScheduler(self.shot_current, self.baseline_gain, self.recovery_timeout, self.empty_time)
+
+    @property
+    def shots(self):
+        """
+        Balls shot since the shoot started
+        """
+        return self.feeder.shots
+
+    @property
+    def isEmpty(self):
+        """
+        True when the hopper is empty (or all the requested balls are shot)
+        """
+        return self.feeder.isEmpty
+
+    def on_enable(self):
+        """
+        Called by MagicBot when the robot is enabled. The flywheels stopped while it was disabled.
+        """
+        super().on_enable()
+
+        self.flywheelSpeed = 0.0
+        self._lastFlywheelTime = None
+
     def stop(self):
         """
         Set every motor to 0 and finish the iteration.
@@ -59,24 +124,19 @@ class Shooter(StateMachine):
         """
         Using the limelight, autonomously align the robot.
         """
-        # Get the adjustment values from the vision component.
-        drive = self.vision.verticalAdjust()
-        rotate = self.vision.horizontalAdjust()
+        self.aligner.align()
 
-        # Allign the robot.
-        if not drive == 0:
-            self.drive.set_raw_fwd(drive * 0.35)
-        else:
-            self.drive.set_raw_fwd(0)
-            if not rotate == 0:
-                self.drive.set_raw_rcw(rotate * 0.35)
-            else:
-                self.drive.set_raw_rcw(0)
-
-    def shoot(self):
+    def shoot(self, ballCount=None):
         """
         This will start the shooting procedure by calling the @timed_states.
+        With a ball count, it stops feeding when the hopper is empty (isEmpty).
+
+        :param ballCount: Number of balls to shoot, None to feed as long as this is called
         """
+        if not self.is_executing:
+            self.feeder.reset()
+        self.feeder.ballCount = ballCount
+
         self.engage()
 
     # The adjust function will not run (disabled) because the first state is spinup.
@@ -90,29 +150,110 @@ class Shooter(StateMachine):
         """
         self.unload()
 
-    @timed_state(duration=0.5, first=True, next_state="feedShooter")
-    def spinup(self):
+    @state(first=True)
+    def spinup(self, state_tm):
         """
-        Spinup the shooters for 0.5 seconds the call the feedShooter.
+        Spinup the shooters until the flywheels reach the shot's speed, then call the feedShooter.
+        If the model never gets there (e.g. a low battery), the shooter feeds after the timeout.
         """
-        self.shooter_speed = 0.7
+        self.shooter_speed = self.shot.speed
+
+        if self.isReady() or state_tm >= self.shot.spinup * self.spinup_timeout:
+            self.next_state("feedShooter")
 
     @state
-    def feedShooter(self):
+    def feedShooter(self, initial_call, state_tm):
         """
-        Until the stop function is called feed the shooter.
+        Feed the balls one by one, as fast as the flywheels recover.
+        A shot (a current spike of the shooter motors) slows the flywheels down,
+        the belt holds the next ball until they are ready again.
+        With a ball count, the hopper is empty when all the balls are shot or no ball is shot for a while.
+        See common.feed_scheduler.FeedScheduler.
         """
-        self.shooter_speed = 0.7
-        self.belt_speed = 0.5
+        current = self.leftCurrent + self.rightCurrent
+        if initial_call:
+            self.feeder.start(current, state_tm)
+
+        self.shooter_speed = self.shot.speed
+
+        if self.feeder.update(current, self.isReady(), state_tm):
+            self.belt_speed = self.feed_speed
+
+        if self.feeder.isEmpty:
+            self.next_state("empty")
+
+    @state
+    def empty(self):
+        """
+        The hopper is empty, wait with the motors stopped until the stop function is called.
+        """
+        pass
+
+    def isReady(self):
+        """
+        :returns: True if the flywheels are at the speed of the shot
+        """
+        return abs(self.flywheelSpeed - self.shot.speed) <= self.ready_tolerance * self.shot.speed
+
+    def updateFlywheel(self):
+        """
+        Estimate the speed of the flywheels.
+
+        The model follows the output of the last iteration (with the power manager's scale
+        it was sent with) and the battery voltage.
+        While the motors are driven, the current gives the back EMF of the motors,
+        so the model is corrected toward the speed it measures.
+        """
+        now = wpilib.Timer.getFPGATimestamp()
+        output = self.leftShooterMotor.get_applied()
+
+        if output != 0:
+            self.voltage = self.pdp.getVoltage()
+
+        if self._lastFlywheelTime is not None:
+            dt = now - self._lastFlywheelTime
+            applied = output * self.voltage / self.nominal_voltage
+            tau = self.flywheel_tau if output != 0 else self.coast_tau
+            self.flywheelSpeed += (applied - self.flywheelSpeed) * (1 - math.exp(-dt / tau))
+
+            if abs(output) >= self.min_current_output:
+                self.leftCurrent = self.pdp.getCurrent(self.left_channel)
+                self.rightCurrent = self.pdp.getCurrent(self.right_channel)
+
+                # The PDP measures the battery current, the motor current is larger by 1 / output
+                motorCurrent = (self.leftCurrent + self.rightCurrent) / 2 / abs(output)
+                backEmf = applied * self.nominal_voltage - math.copysign(motorCurrent * self.motor_resistance, output)
+                self.flywheelSpeed += (backEmf / self.nominal_voltage - self.flywheelSpeed) * self.current_gain
+        self._lastFlywheelTime = now
+
+    def compensate(self, speed):
+        """
+        :returns: The output that gives the speed at the nominal voltage with the current battery voltage
+        """
+        output = speed * self.nominal_voltage / max(self.voltage, 1)
+        return max(min(output, 1), -1)
+
+    def updateShot(self):
+        """
+        Find the shooter speed and the spin up time for the distance of the target.
+        """
+        if self.vision.hasTarget:
+            self.shot = self.vision.getShot()
+        else:
+            self.shot = self.default_shot
 
     def execute(self):
         """
         Execute the component using the preset speeds.
         """
+        self.updateShot()
+        self.updateFlywheel()
+
         super().execute()
 
-        self.leftShooterMotor.set(self.shooter_speed)
-        self.rightShooterMotor.set(-self.shooter_speed)
+        output = self.compensate(self.shooter_speed)
+        self.leftShooterMotor.set(output)
+        self.rightShooterMotor.set(-output)
         self.intakeMotor.set(self.intake_speed)
         self.beltMotor.set(self.belt_speed)
 
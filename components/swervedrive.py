@@ -1,10 +1,19 @@
 import math
 
+from array import array
+
 from magicbot import magiccomponent
 from components import swervemodule
+from common import telemetry
+from common.geometry import ChassisGeometry, MODULE_NAMES
+from common.ntcache import ntcachedproperty
 
 from networktables import NetworkTables
-from networktables.util import ntproperty
+
+# Indexes of the requested vectors
+FWD = 0
+STRAFE = 1
+RCW = 2
 
 class SwerveDrive:
     # These modules will be injected from ../robot.py
@@ -13,65 +22,87 @@ class SwerveDrive:
     rearLeftModule: swervemodule.SwerveModule
     rearRightModule: swervemodule.SwerveModule
 
+    telemetry: telemetry.Telemetry
+
     # Get some config options from the dashboard.
-    lower_input_thresh = ntproperty('/SmartDashboard/drive/drive/lower_input_thresh', 0.1)
-    rotation_multiplier = ntproperty('/SmartDashboard/drive/drive/rotation_multiplier', 0.5)
-    xy_multiplier = ntproperty('/SmartDashboard/drive/drive/xy_multiplier', 0.65)
-    debugging = ntproperty('/SmartDashboard/drive/drive/debugging', False) # Turn to true to run it in verbose mode.
+    # They are cached as plain attributes and updated by listeners when changed.
+    lower_input_thresh = ntcachedproperty('/SmartDashboard/drive/drive/lower_input_thresh', 0.1)
+    rotation_multiplier = ntcachedproperty('/SmartDashboard/drive/drive/rotation_multiplier', 0.5)
+    xy_multiplier = ntcachedproperty('/SmartDashboard/drive/drive/xy_multiplier', 0.65)
+    debugging = ntcachedproperty('/SmartDashboard/drive/drive/debugging', False) # Turn to true to run it in verbose mode.
 
     def setup(self):
         """
         Called after injection.
         """
+        # Fixed order of the modules. Every per-module buffer uses this order.
+        self.module_names = MODULE_NAMES
+        self._modules = (
+            self.frontLeftModule,
+            self.frontRightModule,
+            self.rearLeftModule,
+            self.rearRightModule
+        )
+        self._indexed_modules = tuple(enumerate(self._modules))
+
         # Put all the modules into a dictionary
-        self.modules = {
-            'front_left': self.frontLeftModule,
-            'front_right': self.frontRightModule,
-            'rear_left': self.rearLeftModule,
-            'rear_right': self.rearRightModule
-        }
+        self.modules = dict(zip(self.module_names, self._modules))
 
         # Get Smart Dashboard
         self.sd = NetworkTables.getTable('SmartDashboard')
 
-        # Set all inputs to zero
-        self._requested_vectors = {
-            'fwd': 0,
-            'strafe': 0,
-            'rcw': 0
-        }
-
-        self._requested_angles = {
-            'front_left': 0,
-            'front_right': 0,
-            'rear_left': 0,
-            'rear_right': 0
-        }
-
-        self._requested_speeds = {
-            'front_left': 0,
-            'front_right': 0,
-            'rear_left': 0,
-            'rear_right': 0
-        }
+        # Preallocated buffers for the requested values. They are changed in place
+        # so that the control loop does not create new objects every iteration.
+        self._requested_vectors = array('d', (0, 0, 0)) # FWD, STRAFE, RCW
+        self._requested_angles = array('d', (0,) * len(self._modules))
+        self._requested_speeds = array('d', (0,) * len(self._modules))
+
+        # Vectors of the last calculation. NaN never equals a command, so the first one is calculated.
+        self._last_vectors = array('d', (math.nan,) * 3)
 
         # Variables that allow enabling and disabling of features in code
         self.squared_inputs = True
         self.threshold_input_vectors = True
+        self.incremental = True # Reuse the module targets while the requested vectors do not change
 
-        self.width = (19.5 / 12) / 2 # (Inch / 12 = Foot) / 2
-        self.length = (22 / 12) / 2 # (Inch / 12 = Foot) / 2
+        # Positions of the modules. The constant kinematics math is calculated in it
+        # and only recalculated when the dimensions or the layout change.
+        self._width = (19.5 / 12) / 2 # (Inch / 12 = Foot) / 2
+        self._length = (22 / 12) / 2 # (Inch / 12 = Foot) / 2
+        self.geometry = ChassisGeometry.rectangular(self._length, self._width)
 
         self.request_wheel_lock = False
 
+        # Set to true to skip the input threshold in this iteration (e.g. for the small commands of a path)
+        self.bypass_input_threshold = False
+
+        self.setup_telemetry()
+
+    @property
+    def width(self):
+        return self._width
+
+    @width.setter
+    def width(self, width):
+        self.chassis_dimension = (width, self._length)
+
+    @property
+    def length(self):
+        return self._length
+
+    @length.setter
+    def length(self, length):
+        self.chassis_dimension = (self._width, length)
+
     @property
     def chassis_dimension(self):
-        return (self.width, self.length)
+        return (self._width, self._length)
 
     @chassis_dimension.setter
     def chassis_dimension(self, dimension):
-        self.width = dimension[0]
-        self.length = dimension[1]
+        self._width = dimension[0]
+        self._length = dimension[1]
+        self.geometry.positions = ChassisGeometry.rectangle(self._length, self._width)
 
     @staticmethod
     def square_input(input):
@@ -85,7 +116,10 @@ class SwerveDrive:
         :param data: The data to be normalized
         :returns: The normalized data
         """
-        maxMagnitude = max(abs(x) for x in data)
+        maxMagnitude = 0.0
+        for x in data:
+            if abs(x) > maxMagnitude:
+                maxMagnitude = abs(x)
 
         if maxMagnitude > 1.0:
             for i in range(len(data)):
@@ -93,48 +127,21 @@ class SwerveDrive:
         
         return data
 
-    @staticmethod
-    def normalizeDictionary(data):
-        """
-        Get the maximum value in the data. If the max is more than 1,
-        divide each data by that max.
-        :param data: The dictionary with the data to be normalized
-        :returns: The normalized dictionary with the data
-        """
-        maxMagnitude = max(abs(x) for x in data.values())
-
-        if maxMagnitude > 1.0:
-            for key in data:
-                data[key] = data[key] / maxMagnitude
-        
-        return data
-
     def flush(self):
         """
         This method should be called to reset all requested values of the drive system.
         It will also flush each module individually.
         """
-        self._requested_vectors = {
-            'fwd': 0,
-            'strafe': 0,
-            'rcw': 0
-        }
-
-        self._requested_angles = {
-            'front_left': 0,
-            'front_right': 0,
-            'rear_left': 0,
-            'rear_right': 0
-        }
-
-        self._requested_speeds = {
-            'front_left': 0,
-            'front_right': 0,
-            'rear_left': 0,
-            'rear_right': 0
-        }
-
-        for module in self.modules.values():
+        for i in range(3):
+            self._requested_vectors[i] = 0
+            self._last_vectors[i] = math.nan
+        self.bypass_input_threshold = False
+
+        for i in range(len(self._modules)):
+            self._requested_angles[i] = 0
+            self._requested_speeds[i] = 0
+
+        for module in self._modules:
             module.flush()
 
     def set_raw_fwd(self, fwd):
@@ -143,7 +150,7 @@ class SwerveDrive:
 
         :param fwd: A value from -1 to 1
         """
-        self._requested_vectors['fwd'] = fwd
+        self._requested_vectors[FWD] = fwd
 
     def set_raw_strafe(self, strafe):
         """
@@ -151,7 +158,7 @@ class SwerveDrive:
 
         :param strafe: A value from -1 to 1
         """
-        self._requested_vectors['strafe'] = strafe
+        self._requested_vectors[STRAFE] = strafe
     
     def set_raw_rcw(self, rcw):
         """
@@ -159,7 +166,7 @@ class SwerveDrive:
 
         :param rcw: A value from -1 to 1
         """
-        self._requested_vectors['rcw'] = rcw
+        self._requested_vectors[RCW] = rcw
 
     def set_fwd(self, fwd):
         """
@@ -172,7 +179,7 @@ class SwerveDrive:
 
         fwd *= self.xy_multiplier
 
-        self._requested_vectors['fwd'] = fwd
+        self._requested_vectors[FWD] = fwd
 
     def set_strafe(self, strafe):
         """
@@ -185,7 +192,7 @@ class SwerveDrive:
 
         strafe *= self.xy_multiplier
 
-        self._requested_vectors['strafe'] = strafe
+        self._requested_vectors[STRAFE] = strafe
 
     def set_rcw(self, rcw):
         """
@@ -198,7 +205,7 @@ class SwerveDrive:
 
         rcw *= self.rotation_multiplier
 
-        self._requested_vectors['rcw'] = rcw
+        self._requested_vectors[RCW] = rcw
 
     def move(self, fwd, strafe, rcw):
         """
@@ -220,113 +227,110 @@ class SwerveDrive:
     def _calculate_vectors(self):
         """
         Calculate the requested speed and angle of each modules from self._requested_vectors and store them in
-        self._requested_speeds and self._requested_angles dictionaries.
-        """
-        self._requested_vectors['fwd'], self._requested_vectors['strafe'], self._requested_vectors['rcw'] = self.normalize([self._requested_vectors['fwd'], self._requested_vectors['strafe'], self._requested_vectors['rcw']])
+        self._requested_speeds and self._requested_angles buffers.
 
-        # Does nothing if the values are lower than the input thresh
-        if self.threshold_input_vectors:
-            if abs(self._requested_vectors['fwd']) < self.lower_input_thresh:
-                self._requested_vectors['fwd'] = 0
+        :returns: False if the vectors are the same as the last time and the buffers were kept
+        """
+        vectors = self._requested_vectors
+        speeds = self._requested_speeds
+        angles = self._requested_angles
 
-            if abs(self._requested_vectors['strafe']) < self.lower_input_thresh:
-                self._requested_vectors['strafe'] = 0
+        self.normalize(vectors)
 
-            if abs(self._requested_vectors['rcw']) < self.lower_input_thresh:
-                self._requested_vectors['rcw'] = 0
+        # Does nothing if the values are lower than the input thresh
+        if self.threshold_input_vectors and not self.bypass_input_threshold:
+            if abs(vectors[FWD]) < self.lower_input_thresh:
+                vectors[FWD] = 0
 
-            if self._requested_vectors['rcw'] == 0 and self._requested_vectors['strafe'] == 0 and self._requested_vectors['fwd'] == 0:  # Prevents a useless loop.
-                self._requested_speeds = dict.fromkeys(self._requested_speeds, 0) # Do NOT reset the wheel angles.
+            if abs(vectors[STRAFE]) < self.lower_input_thresh:
+                vectors[STRAFE] = 0
 
-                if self.request_wheel_lock:
-                    # This is intended to set the wheels in such a way that it
-                    # difficult to push the robot (intended for defence)
+            if abs(vectors[RCW]) < self.lower_input_thresh:
+                vectors[RCW] = 0
 
-                    self._requested_angles['front_left'] = 45
-                    self._requested_angles['front_right'] = -45
-                    self._requested_angles['rear_left'] = -45
-                    self._requested_angles['rear_right'] = 45
+        fwd = vectors[FWD]
+        strafe = vectors[STRAFE]
+        rcw = vectors[RCW]
 
-                    self.request_wheel_lock = False
+        # Zero request vectors for saftey reasons
+        vectors[FWD] = 0.0
+        vectors[STRAFE] = 0.0
+        vectors[RCW] = 0.0
+        self.bypass_input_threshold = False
 
-                return
-        
-        ratio = math.hypot(self.length, self.width)
+        # The same vectors give the same speeds and angles, keep the last ones
+        last = self._last_vectors
+        if self.incremental and not self.request_wheel_lock and \
+                fwd == last[FWD] and strafe == last[STRAFE] and rcw == last[RCW]:
+            return False
 
-        # Velocities per quadrant
-        frontX = self._requested_vectors['strafe'] - (self._requested_vectors['rcw'] * (self.length / ratio))
-        rearX = self._requested_vectors['strafe'] + (self._requested_vectors['rcw'] * (self.length / ratio))
-        leftY = self._requested_vectors['fwd'] - (self._requested_vectors['rcw'] * (self.width / ratio))
-        rightY = self._requested_vectors['fwd'] + (self._requested_vectors['rcw'] * (self.width / ratio))
+        last[FWD] = fwd
+        last[STRAFE] = strafe
+        last[RCW] = rcw
 
-        # Calculate the speed and angle for each wheel given the combination of the corresponding quadrant vectors
-        frontLeft_speed = math.hypot(frontX, rightY)
-        frontLeft_angle = math.degrees(math.atan2(frontX, rightY))
+        if self.threshold_input_vectors and rcw == 0 and strafe == 0 and fwd == 0:  # Prevents a useless loop.
+            for i, module in self._indexed_modules:
+                speeds[i] = 0 # Do NOT reset the wheel angles.
 
-        frontRight_speed = math.hypot(frontX, leftY)
-        frontRight_angle = math.degrees(math.atan2(frontX, leftY))
+            if self.request_wheel_lock:
+                # This is intended to set the wheels in such a way that it
+                # difficult to push the robot (intended for defence)
+                for i, angle in enumerate(self.geometry.lock_angles):
+                    angles[i] = angle
 
-        rearLeft_speed = math.hypot(rearX, rightY)
-        rearLeft_angle = math.degrees(math.atan2(rearX, rightY))
+                self.request_wheel_lock = False
 
-        rearRight_speed = math.hypot(rearX, leftY)
-        rearRight_angle = math.degrees(math.atan2(rearX, leftY))
+            return True
 
-        self._requested_speeds['front_left'] = frontLeft_speed
-        self._requested_speeds['front_right'] = frontRight_speed
-        self._requested_speeds['rear_left'] = rearLeft_speed
-        self._requested_speeds['rear_right'] = rearRight_speed
+        # Calculate the speed and angle for each wheel given the combination of the
+        # translation and the module's precalculated rotation vector
+        for i, x_coefficient, y_coefficient in self.geometry.coefficients:
+            x = strafe + rcw * x_coefficient
+            y = fwd + rcw * y_coefficient
 
-        self._requested_angles['front_left'] = frontLeft_angle
-        self._requested_angles['front_right'] = frontRight_angle
-        self._requested_angles['rear_left'] = rearLeft_angle
-        self._requested_angles['rear_right'] = rearRight_angle
+            speeds[i] = math.hypot(x, y)
+            angles[i] = math.degrees(math.atan2(x, y))
 
-        self._requested_speeds = self.normalizeDictionary(self._requested_speeds)
+        self.normalize(speeds)
 
-        # Zero request vectors for saftey reasons
-        self._requested_vectors['fwd'] = 0.0
-        self._requested_vectors['strafe'] = 0.0
-        self._requested_vectors['rcw'] = 0.0
+        return True
 
     def debug(self, debug_modules=False):
         """
         Prints debugging information to log
         """
         if debug_modules:
-            for key in self.modules:
-                self.modules[key].debug()
+            for module in self._modules:
+                module.debug()
         
-        print('Requested values: ', self._requested_vectors, '\n')
-        print('Requested angles: ', self._requested_angles, '\n')
-        print('Requested speeds: ', self._requested_speeds, '\n')
+        print('Requested values: ', dict(zip(('fwd', 'strafe', 'rcw'), self._requested_vectors)), '\n')
+        print('Requested angles: ', dict(zip(self.module_names, self._requested_angles)), '\n')
+        print('Requested speeds: ', dict(zip(self.module_names, self._requested_speeds)), '\n')
 
     def execute(self):
         """
         Sends the speeds and angles to each corresponding wheel module.
         Executes the doit in each wheel module.
         """
-        self.update_smartdash()
-
-        # Calculate each vector
-        self._calculate_vectors()
+        # Calculate each vector. If they did not change, the modules keep their targets.
+        if self._calculate_vectors():
+            speeds = self._requested_speeds
+            angles = self._requested_angles
 
-        # Set the speed and angle for each module
-        for key in self.modules:
-            self.modules[key].move(self._requested_speeds[key], self._requested_angles[key])
-
-        # Reset the speed back to zero
-        self._requested_speeds = dict.fromkeys(self._requested_speeds, 0)
+            # Set the speed and angle for each module
+            for i, module in self._indexed_modules:
+                module.move(speeds[i], angles[i])
 
         # Execute each module
-        for key in self.modules:
-            self.modules[key].execute()
+        for module in self._modules:
+            module.execute()
         
-    def update_smartdash(self):
+    def setup_telemetry(self):
         """
-        Pushes some internal variables for debugging.
+        Register some internal variables to the dashboard for debugging.
         """
-        if self.debugging:
-            for key in self._requested_angles:
-                self.sd.putNumber('drive/drive/%s_angle' % key, self._requested_angles[key])
-                self.sd.putNumber('drive/drive/%s_speed' % key, self._requested_speeds[key])
+        debugging = lambda: self.debugging
+
+        for i, name in enumerate(self.module_names):
+            self.telemetry.add_number('drive/drive/%s_angle' % name, lambda i=i: self._requested_angles[i], debugging)
+            self.telemetry.add_number('drive/drive/%s_speed' % name, lambda i=i: self._requested_speeds[i], debugging)
@@ -1,26 +1,31 @@
 import math
 
 import wpilib
-import ctre
 
 from networktables import NetworkTables
 from wpilib.controller import PIDController
 from collections import namedtuple
 
+from common import telemetry, motor_output, steering
+from common.ntcache import ntcachedproperty
+
 # Create the structure of the config: SmartDashboard prefix, Encoder's zero point, Drive motor inverted, Allow reverse
 ModuleConfig = namedtuple('ModuleConfig', ['sd_prefix', 'zero', 'inverted', 'allow_reverse'])
 
-MAX_VOLTAGE = 5 # Absolute encoder measures from 0V to 5V
-
 class SwerveModule:
     # Get the motors, encoder and config from injection
-    driveMotor: ctre.WPI_VictorSPX
-    rotateMotor: ctre.WPI_VictorSPX
+    driveMotor: motor_output.CoalescedOutput
+    rotateMotor: motor_output.CoalescedOutput
         
     encoder: wpilib.AnalogInput
 
     cfg: ModuleConfig
 
+    telemetry: telemetry.Telemetry
+
+    # Written by the SwerveDrive, turn to true to put more values to the dashboard.
+    debugging = ntcachedproperty('/SmartDashboard/drive/drive/debugging', False, writeDefault=False)
+
     def setup(self):
         """
         Called after injection
@@ -29,17 +34,21 @@ class SwerveModule:
         self.sd_prefix = self.cfg.sd_prefix or 'Module'
         self.encoder_zero = self.cfg.zero or 0
         self.inverted = self.cfg.inverted or False
-        self.allow_reverse = self.cfg.allow_reverse or True
+        self.allow_reverse = self.cfg.allow_reverse if self.cfg.allow_reverse is not None else True
 
         # SmartDashboard
         self.sd = NetworkTables.getTable('SmartDashboard')
-        self.debugging = self.sd.getEntry('drive/drive/debugging')
 
         # Motor
         self.driveMotor.setInverted(self.inverted)
 
         self._requested_voltage = 0
         self._requested_speed = 0
+        self._output = 0
+        self._drive_output = 0
+
+        # Last arguments of move, to skip the unchanged ones
+        self._last_move = None
 
         # PID Controller
         # kP = 1.5, kI = 0.0, kD = 0.0
@@ -47,6 +56,8 @@ class SwerveModule:
         self._pid_controller.enableContinuousInput(0.0, 5.0) # Will set the 0 and 5 as the same point
         self._pid_controller.setTolerance(0.05, 0.05) # Tolerance where the PID will be accpeted aligned
 
+        self.setup_telemetry()
+
     def get_voltage(self):
         """
         :returns: the voltage position after the zero
@@ -60,6 +71,7 @@ class SwerveModule:
         """
         self._requested_voltage = self.encoder_zero
         self._requested_speed = 0
+        self._last_move = None
         self._pid_controller.reset()
 
     @staticmethod
@@ -113,15 +125,15 @@ class SwerveModule:
         """
         deg %= 360 # Prevent values past 360
 
+        # The same request gives the same target. The reverse decision is kept as well,
+        # the module keeps turning toward the target it already chose.
+        if self._last_move is not None and self._last_move[0] == speed and self._last_move[1] == deg:
+            return
+        self._last_move = (speed, deg)
+
         if self.allow_reverse:
-            """
-            If the difference between the requested degree and the current degree is
-            more than 90 degrees, don't turn the wheel 180 degrees. Instead reverse the speed.
-            """
-            if abs(deg - self.voltage_to_degrees(self.get_voltage())) > 90:
-                speed *= -1
-                deg += 180
-                deg %= 360
+            # Turn to the opposite angle and reverse the speed if the wheel is more than 90 degrees away
+            speed, deg = steering.reverse(speed, deg, self.voltage_to_degrees(self.get_voltage()))
 
         self._requested_speed = speed
         self._set_deg(deg)
@@ -141,7 +153,8 @@ class SwerveModule:
         """
         # Calculate the error using the current voltage and the requested voltage.
         # DO NOT use the #self.get_voltage function here. It has to be the raw voltage.
-        error = self._pid_controller.calculate(self.encoder.getVoltage(), self._requested_voltage)
+        voltage = self.encoder.getVoltage()
+        error = self._pid_controller.calculate(voltage, self._requested_voltage)
 
         # Set the output 0 as the default value
         output = 0
@@ -151,31 +164,37 @@ class SwerveModule:
             # Use max-min to clamped the output between -1 and 1.
             output = max(min(error, 1), -1)
 
-        # Put the output to the dashboard
-        self.sd.putNumber('drive/%s/output' % self.sd_prefix, output)
+        # Keep the output for the dashboard
+        self._output = output
         # Set the output as the rotateMotor's voltage
         self.rotateMotor.set(output)
 
-        # Set the requested speed as the driveMotor's voltage
-        self.driveMotor.set(self._requested_speed)
+        # Scale the requested speed by the cosine of the remaining steering error,
+        # so the wheel does not push sideways while it turns. Past 90 degrees it stops.
+        steering_error = steering.wrap_degrees((voltage - self._requested_voltage) / 5 * 360)
+        self._drive_output = self._requested_speed * max(math.cos(math.radians(steering_error)), 0)
 
-        self.update_smartdash()
+        # Set the scaled speed as the driveMotor's voltage
+        self.driveMotor.set(self._drive_output)
 
-    def update_smartdash(self):
+    def setup_telemetry(self):
         """
-        Output a bunch on internal variables for debugging purposes.
+        Register a bunch on internal variables to the dashboard for debugging purposes.
         """
-        self.sd.putNumber('drive/%s/degrees' % self.sd_prefix, self.voltage_to_degrees(self.get_voltage()))
+        prefix = 'drive/%s/' % self.sd_prefix
+        debugging = lambda: self.debugging
+
+        self.telemetry.add_number(prefix + 'output', lambda: self._output)
+        self.telemetry.add_number(prefix + 'degrees', lambda: self.voltage_to_degrees(self.get_voltage()))
 
-        if self.debugging.getBoolean(False):
-            self.sd.putNumber('drive/%s/requested_voltage' % self.sd_prefix, self._requested_voltage)
-            self.sd.putNumber('drive/%s/requested_speed' % self.sd_prefix, self._requested_speed)
-            self.sd.putNumber('drive/%s/raw voltage' % self.sd_prefix, self.encoder.getVoltage())  # DO NOT USE self.get_voltage() here
-            self.sd.putNumber('drive/%s/average voltage' % self.sd_prefix, self.encoder.getAverageVoltage())
-            self.sd.putNumber('drive/%s/encoder_zero' % self.sd_prefix, self.encoder_zero)
+        self.telemetry.add_number(prefix + 'requested_voltage', lambda: self._requested_voltage, debugging)
+        self.telemetry.add_number(prefix + 'requested_speed', lambda: self._requested_speed, debugging)
+        self.telemetry.add_number(prefix + 'raw voltage', self.encoder.getVoltage, debugging) # DO NOT USE self.get_voltage() here
+        self.telemetry.add_number(prefix + 'average voltage', self.encoder.getAverageVoltage, debugging)
+        self.telemetry.add_number(prefix + 'encoder_zero', lambda: self.encoder_zero, debugging)
 
-            self.sd.putNumber('drive/%s/PID Setpoint' % self.sd_prefix, self._pid_controller.getSetpoint())
-            self.sd.putNumber('drive/%s/PID Error' % self.sd_prefix, self._pid_controller.getPositionError())
-            self.sd.putBoolean('drive/%s/PID isAligned' % self.sd_prefix, self._pid_controller.atSetpoint())
+        self.telemetry.add_number(prefix + 'PID Setpoint', self._pid_controller.getSetpoint, debugging)
+        self.telemetry.add_number(prefix + 'PID Error', self._pid_controller.getPositionError, debugging)
+        self.telemetry.add_boolean(prefix + 'PID isAligned', self._pid_controller.atSetpoint, debugging)
 
-            self.sd.putBoolean('drive/%s/allow_reverse' % self.sd_prefix, self.allow_reverse)
+        self.telemetry.add_boolean(prefix + 'allow_reverse', lambda: self.allow_reverse, debugging)
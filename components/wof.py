@@ -1,16 +1,31 @@
 import wpilib
-import ctre
 
 from magicbot import StateMachine, timed_state, state
 from networktables import NetworkTables
 
-from common import color_sensor
+from common import color_sensor, telemetry, motor_output
+from common.segment_counter import SegmentCounter
+from common.wheel_controller import WheelController
 
 class WheelOfFortune():
     # Get the motors from the injection
-    motor: ctre.WPI_VictorSPX
+    motor: motor_output.CoalescedOutput
     colorSensor: color_sensor.ColorSensor
 
+    telemetry: telemetry.Telemetry
+
+    first_stage_speed = 1 # Maximum speed of the motor while spinning the wheel for the first stage
+    first_stage_turns = 8 # Times to see the starting color (3,5 turns to be safe)
+    second_stage_speed = 0.5 # Maximum speed of the motor while turning to a color
+
+    # Wheel model for the rotation control, in segments (1/8 turn)
+    max_segment_rate = 16 # Segments per second at full motor output
+    wheel_tau = 0.15 # Time constant of the wheel speed in seconds
+    wheel_decel = 20 # Deceleration of the wheel in segments/s^2 (coasting, and the limit of the profile)
+    velocity_kP = 0.05 # Motor output per segment/s of speed error
+    min_output = 0.15 # Lowest output that still turns the wheel
+    settle_time = 0.3 # Time without a transition before the wheel is considered stopped
+
     def setup(self):
         # Get the table
         self.sd = NetworkTables.getTable('SmartDashboard')
@@ -18,6 +33,12 @@ class WheelOfFortune():
         # Array of the colors respected to the order on the wheel 
         self.color_scheme = ['R', 'G', 'B', 'Y']
 
+        # Counts the segments passing under the sensor. While spinning the colors
+        # come in the reverse order of the array (R, Y, B, G).
+        self.segmentCounter = SegmentCounter([self.color_scheme[-i] for i in range(len(self.color_scheme))])
+        self.controller = WheelController(self.segmentCounter, self.max_segment_rate, self.wheel_tau,
+            self.wheel_decel, self.velocity_kP, self.min_output, self.settle_time)
+
         # Phase indicator (0 = N/A, 1 = Spin, 2 = Color)
         self.phase = 0
 
@@ -25,9 +46,11 @@ class WheelOfFortune():
         self.target_color = "N"
         self.next_color = ""
         self.count = 0
-        self.isCounted = False # Used to prevent counting the same piece multiple times
+        self.target_transitions = 0
         self.inProgress = False # Indicates that a function is already running
 
+        self.setupTelemetry()
+
     def getData(self):
         """
         Get the color from the driver station.
@@ -63,7 +86,7 @@ class WheelOfFortune():
         self.next_color = ""
         self.count = 0
         self.inProgress = False
-        self.isCounted = False
+        self.controller.reset()
 
     def handleFirstStage(self):
         """
@@ -72,37 +95,35 @@ class WheelOfFortune():
         it sees the color 8 more times.
         """
         self.phase = 1 # Set the phase to 1
-        matched_color = self.colorSensor.matchColor() # Get the current color
+        sample = self.colorSensor.getSample() # Get the current color
+
+        if self.colorSensor.isStale(sample):
+            # The sensor is not read anymore, do not turn the wheel blindly
+            self.motor.set(0)
+            return
 
         # Initialization
         if not self.inProgress:
-            if not matched_color == "N":
+            if not sample.match == "N":
                 # If the color exists, set it as the target
-                self.target_color = matched_color
+                self.target_color = sample.match
 
                 # The color after will be set as the next color
-                index = self.color_scheme.index(matched_color)
+                index = self.color_scheme.index(sample.match)
                 self.next_color = self.color_scheme[index - 1] # -1 because how the array is ordered
+
+                self.segmentCounter.reset(sample.match, sample.timestamp)
                 self.inProgress = True
 
         # Periodic
-        if self.inProgress and not matched_color == "N":
-            if self.count < 8: # Until the count reaches 8 (3,5 turns to be safe)
-                if matched_color == self.next_color:
-                    # If the next color is read reset isCounted back to false
-                    self.isCounted = False
-                
-                if not self.isCounted:
-                    # If it is not counted yet, count 1 when reached to the target color
-                    if matched_color == self.target_color:
-                        self.count += 1
-                        self.isCounted = True
-
-                self.motor.set(1)
-            else:
-                # When reached the desired amount of turns stop and reset.
-                self.motor.set(0)
-                # self.reset()
+        if self.inProgress:
+            # The target color is seen again every 4 segments (it is counted once at the start)
+            self.segmentCounter.update(sample)
+            self.count = self.segmentCounter.transitions // len(self.color_scheme) + 1
+
+            # Stop in the middle of the segment after the last counted one
+            target = (self.first_stage_turns - 1) * len(self.color_scheme)
+            self.spinTo(target, self.first_stage_speed)
 
     def handleSecondStage(self):
         """
@@ -113,36 +134,64 @@ class WheelOfFortune():
         self.phase = 2 # Set the phase to 2
 
         if not self.getData() == "N": # If the game data is released
-            matched_color = self.colorSensor.matchColor() # Get the current color
+            sample = self.colorSensor.getSample() # Get the current color
+
+            if self.colorSensor.isStale(sample):
+                # The sensor is not read anymore, do not turn the wheel blindly
+                self.motor.set(0)
+                return
 
             # Initialization
-            if not self.inProgress:
+            if not self.inProgress and not sample.match == "N":
                 # Get the two previous color and set it as the target color
                 index = self.color_scheme.index(self.getData())
                 index -= 2
 
                 self.target_color = self.color_scheme[index]
+
+                # Number of segments to the target in the spinning order
+                order = self.segmentCounter.order
+                self.target_transitions = (order.index(self.target_color) - order.index(sample.match)) % len(order)
+
+                self.segmentCounter.reset(sample.match, sample.timestamp)
                 self.inProgress = True
-            
+
             # Periodic
-            if self.inProgress and not matched_color == "N":
-                # Spin the wheel until it sees the target color
-                if not matched_color == self.target_color:
-                    self.motor.set(0.35)
-                else:
-                    self.motor.set(0)
+            if self.inProgress:
+                self.segmentCounter.update(sample)
+
+                # If the wheel passed the target, aim for the next segment of the same color
+                if self.segmentCounter.transitions > self.target_transitions:
+                    self.target_transitions += len(self.color_scheme)
+
+                if self.spinTo(self.target_transitions, self.second_stage_speed):
                     self.reset()
 
+    def spinTo(self, target, max_output):
+        """
+        Turn the wheel until the segment after `target` transitions is under the sensor.
+
+        See common.wheel_controller.WheelController.
+
+        :param target: Number of segment transitions since the start
+        :param max_output: Maximum motor output
+        :returns: True once the wheel stopped on the target
+        """
+        output, done = self.controller.update(target, max_output, self.motor.get(), wpilib.Timer.getFPGATimestamp())
+        self.motor.set(output)
+        return done
+
     def execute(self):
         # Do not execute anything
         return
 
-    def updateSD(self):
-        # Update the SmartDashboard
-        self.sd.putString("/wof/Target-Color", self.target_color)
-        self.sd.putString("/wof/Next-Color", self.next_color)
-        self.sd.putString("/wof/Game-Data", self.getData())
-        self.sd.putNumber("/wof/phase", self.phase)
-        self.sd.putNumber("/wof/count", self.count)
-        self.sd.putBoolean("/wof/isCounted", self.isCounted)
-        self.sd.putBoolean("/wof/inProgress", self.inProgress)
+    def setupTelemetry(self):
+        # Register the values to the SmartDashboard
+        self.telemetry.add_string("/wof/Target-Color", lambda: self.target_color)
+        self.telemetry.add_string("/wof/Next-Color", lambda: self.next_color)
+        self.telemetry.add_string("/wof/Game-Data", self.getData)
+        self.telemetry.add_number("/wof/phase", lambda: self.phase)
+        self.telemetry.add_number("/wof/count", lambda: self.count)
+        self.telemetry.add_number("/wof/transitions", lambda: self.segmentCounter.transitions)
+        self.telemetry.add_number("/wof/remaining", lambda: self.controller.remaining)
+        self.telemetry.add_boolean("/wof/inProgress", lambda: self.inProgress)
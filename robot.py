@@ -13,8 +13,8 @@ from networktables.util import ntproperty
 
 from rev.color import ColorSensorV3, ColorMatch
 
-from components import swervedrive, swervemodule, shooter, wof
-from common import color_sensor, vision
+from components import swervedrive, swervemodule, shooter, wof, recorder, odometry, aligner, power
+from common import color_sensor, vision, profiler, telemetry, motor_output, pdp_channels
 
 from collections import namedtuple
 # Get the config preset from the swervemodule
@@ -38,6 +38,10 @@ class MyRobot(MagicRobot):
     """
 
     # Create low-level object
+    # The power manager executes first, so the output scales are used in the same iteration.
+    power: power.PowerManager
+    # The aligner executes before the drive, so its commands are used in the same iteration.
+    aligner: aligner.Aligner
     drive: swervedrive.SwerveDrive
     shooter: shooter.Shooter
     wof: wof.WheelOfFortune
@@ -47,6 +51,15 @@ class MyRobot(MagicRobot):
     rearLeftModule: swervemodule.SwerveModule
     rearRightModule: swervemodule.SwerveModule
 
+    # Odometry runs after the modules to use their latest angles and speeds.
+    odometry: odometry.Odometry
+
+    # Vision runs after the odometry to compensate the latency with the latest pose.
+    vision: vision.Vision
+
+    # The recorder should stay the last component to record the outputs of the others.
+    recorder: recorder.MatchRecorder
+
     # Create configs for each module. This is before #createObjects because modules need these configs to be initialized.
     frontLeftModule_cfg = ModuleConfig(sd_prefix='FrontLeft_Module', zero=2.97, inverted=True, allow_reverse=True)
     frontRightModule_cfg = ModuleConfig(sd_prefix='FrontRight_Module', zero=2.69, inverted=False, allow_reverse=True)
@@ -54,13 +67,12 @@ class MyRobot(MagicRobot):
     rearRightModule_cfg = ModuleConfig(sd_prefix='RearRight_Module', zero=4.76, inverted=False, allow_reverse=True)
 
     # Decleare motors for the shooter component
-    shooter_leftShooterMotor: ctre.WPI_VictorSPX
-    shooter_rightShooterMotor: ctre.WPI_VictorSPX
-    shooter_intakeMotor: ctre.WPI_VictorSPX
-    shooter_beltMotor: ctre.WPI_VictorSPX
+    shooter_leftShooterMotor: motor_output.CoalescedOutput
+    shooter_rightShooterMotor: motor_output.CoalescedOutput
+    shooter_intakeMotor: motor_output.CoalescedOutput
+    shooter_beltMotor: motor_output.CoalescedOutput
 
     # Create common components
-    vision: vision.Vision
     colorSensor: color_sensor.ColorSensor
 
     def createObjects(self):
@@ -71,21 +83,30 @@ class MyRobot(MagicRobot):
         # SmartDashboard
         self.sd = NetworkTables.getTable('SmartDashboard')
 
+        # Telemetry (Components register their dashboard values to it)
+        self.telemetry = telemetry.Telemetry()
+
+        # Motor outputs (Every motor is wrapped to skip the unchanged set calls)
+        # The groups are scaled by the power manager, the channels of the motors are in common/pdp_channels.py.
+        outputs = self.outputs = motor_output.OutputRegistry()
+        pdp_channels.check()
+        channels = pdp_channels.CHANNELS
+
         # Gamepad
         self.gamempad = wpilib.Joystick(0)
         self.gamempad2 = wpilib.Joystick(1)
 
         # Drive Motors
-        self.frontLeftModule_driveMotor = ctre.WPI_VictorSPX(5)
-        self.frontRightModule_driveMotor = ctre.WPI_VictorSPX(8)
-        self.rearLeftModule_driveMotor = ctre.WPI_VictorSPX(4)
-        self.rearRightModule_driveMotor = ctre.WPI_VictorSPX(9)
+        self.frontLeftModule_driveMotor = outputs.wrap('frontLeftModule_driveMotor', ctre.WPI_VictorSPX(5), group='drive', channel=channels['frontLeftModule_driveMotor'])
+        self.frontRightModule_driveMotor = outputs.wrap('frontRightModule_driveMotor', ctre.WPI_VictorSPX(8), group='drive', channel=channels['frontRightModule_driveMotor'])
+        self.rearLeftModule_driveMotor = outputs.wrap('rearLeftModule_driveMotor', ctre.WPI_VictorSPX(4), group='drive', channel=channels['rearLeftModule_driveMotor'])
+        self.rearRightModule_driveMotor = outputs.wrap('rearRightModule_driveMotor', ctre.WPI_VictorSPX(9), group='drive', channel=channels['rearRightModule_driveMotor'])
         
         # Rotate Motors
-        self.frontLeftModule_rotateMotor = ctre.WPI_VictorSPX(3)
-        self.frontRightModule_rotateMotor = ctre.WPI_VictorSPX(14)
-        self.rearLeftModule_rotateMotor = ctre.WPI_VictorSPX(2)
-        self.rearRightModule_rotateMotor = ctre.WPI_VictorSPX(15)
+        self.frontLeftModule_rotateMotor = outputs.wrap('frontLeftModule_rotateMotor', ctre.WPI_VictorSPX(3))
+        self.frontRightModule_rotateMotor = outputs.wrap('frontRightModule_rotateMotor', ctre.WPI_VictorSPX(14))
+        self.rearLeftModule_rotateMotor = outputs.wrap('rearLeftModule_rotateMotor', ctre.WPI_VictorSPX(2))
+        self.rearRightModule_rotateMotor = outputs.wrap('rearRightModule_rotateMotor', ctre.WPI_VictorSPX(15))
 
         # Encoders
         self.frontLeftModule_encoder = wpilib.AnalogInput(0)
@@ -94,33 +115,74 @@ class MyRobot(MagicRobot):
         self.rearRightModule_encoder = wpilib.AnalogInput(2)
 
         # Shooter
-        self.shooter_leftShooterMotor = ctre.WPI_VictorSPX(6)
-        self.shooter_rightShooterMotor = ctre.WPI_VictorSPX(7)
-        self.shooter_beltMotor = ctre.WPI_VictorSPX(11)
-        self.shooter_intakeMotor = ctre.WPI_VictorSPX(0)
+        self.shooter_leftShooterMotor = outputs.wrap('shooter_leftShooterMotor', ctre.WPI_VictorSPX(6), group='shooter', channel=channels['shooter_leftShooterMotor'])
+        self.shooter_rightShooterMotor = outputs.wrap('shooter_rightShooterMotor', ctre.WPI_VictorSPX(7), group='shooter', channel=channels['shooter_rightShooterMotor'])
+        self.shooter_beltMotor = outputs.wrap('shooter_beltMotor', ctre.WPI_VictorSPX(11), group='shooter', channel=channels['shooter_beltMotor'])
+        self.shooter_intakeMotor = outputs.wrap('shooter_intakeMotor', ctre.WPI_VictorSPX(0), group='shooter', channel=channels['shooter_intakeMotor'])
 
         # Wheel of Fortune
-        self.wof_motor = ctre.WPI_VictorSPX(13)
+        self.wof_motor = outputs.wrap('wof_motor', ctre.WPI_VictorSPX(13), group='wof', channel=channels['wof_motor'])
 
         # Climber
-        self.climbingMotor = ctre.WPI_VictorSPX(10)
-        self.hookMotor = ctre.WPI_VictorSPX(1)
+        self.climbingMotor = outputs.wrap('climbingMotor', ctre.WPI_VictorSPX(10), group='climber', channel=channels['climbingMotor'])
+        self.hookMotor = outputs.wrap('hookMotor', ctre.WPI_VictorSPX(1), group='climber', channel=channels['hookMotor'])
 
-        # Color Sensor
-        self.colorSensor = color_sensor.ColorSensor()
+        outputs.setup_telemetry(self.telemetry)
 
-        # Vision
-        self.vision = vision.Vision()
+        # Color Sensor
+        self.colorSensor = color_sensor.ColorSensor(self.telemetry)
 
         # Limit Switch
         self.switch = wpilib.DigitalInput(0)
 
         # PDP
         self.pdp = wpilib.PowerDistributionPanel(0)
+        self.telemetry.add_number('Climb_Current_Draw', lambda: self.pdp.getCurrent(10))
+
+        # Profiler (Enable it from the dashboard with profiler/enabled)
+        self.profiler = profiler.Profiler()
+
+    def robotInit(self):
+        """
+        Called once when the robot starts. MagicBot creates and sets up the components here.
+        """
+        super().robotInit()
+
+        # Read the color sensor on its own thread from now on
+        self.colorSensor.startSampling()
+
+        # Register the methods to be timed by the profiler.
+        # The time between two drive executions is the length of a robot iteration.
+        self.profiler.watch('loop', self.drive, budget=self.profiler.loop_period * 1.1, period=True)
+        self.profiler.watch('teleopPeriodic', self, 'teleopPeriodic')
+        self.profiler.watch('update_sd', self, 'update_sd')
+        self.profiler.watch('power', self.power)
+        self.profiler.watch('aligner', self.aligner)
+        self.profiler.watch('drive', self.drive)
+        self.profiler.watch('frontLeftModule', self.frontLeftModule)
+        self.profiler.watch('frontRightModule', self.frontRightModule)
+        self.profiler.watch('rearLeftModule', self.rearLeftModule)
+        self.profiler.watch('rearRightModule', self.rearRightModule)
+        self.profiler.watch('odometry', self.odometry, budget=0.0002)
+        self.profiler.watch('vision', self.vision)
+        self.profiler.watch('shooter', self.shooter)
+        self.profiler.watch('wof.handleFirstStage', self.wof, 'handleFirstStage')
+        self.profiler.watch('wof.handleSecondStage', self.wof, 'handleSecondStage')
+        # getSample is called by the WoF, readSample is the I2C read on the sampler thread
+        self.profiler.watch('colorSensor.getSample', self.colorSensor, 'getSample')
+        self.profiler.watch('colorSensor.readSample', self.colorSensor, 'readSample', budget=self.colorSensor.sample_period)
+
+    def disabledInit(self):
+        # Print the timings and the motor writes of the last enabled period.
+        if self.profiler.enabled:
+            self.profiler.print_report()
+            self.profiler.reset()
+            self.outputs.print_report()
+            self.outputs.reset()
 
     def disabledPeriodic(self):
-        # Update the dashboard, even when the robot is disabled.
-        self.update_sd()
+        # Profiling can only be turned on or off while disabled.
+        self.profiler.enabled = self.sd.getBoolean('profiler/enabled', False)
 
     def autonomousInit(self):
         # Reset the drive when the auto starts.
@@ -210,20 +272,16 @@ class MyRobot(MagicRobot):
         else:
             self.wof.manualTurn(0)
 
-        # Update smartdashboard
+    def robotPeriodic(self):
+        # Update the dashboard in every mode, even when the robot is disabled.
         self.update_sd()
 
     def update_sd(self):
         """
-        Calls each component's own update function
-        and puts data to the smartdashboard.
+        Publishes the values the components registered
+        to the telemetry in a single batch.
         """
-        self.sd.putNumber('Climb_Current_Draw', self.pdp.getCurrent(10))
-
-        self.drive.update_smartdash()
-        self.colorSensor.updateSD()
-        self.wof.updateSD()
-        self.vision.updateTable()
+        self.telemetry.publish()
 
 if __name__ == "__main__":
     wpilib.run(MyRobot)
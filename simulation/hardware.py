@@ -0,0 +1,106 @@
+"""
+Stand-ins for the hardware objects that are injected to the components.
+They only implement the functions the components use.
+"""
+
+class StubMotor():
+    """
+    Replaces ctre.WPI_VictorSPX (wrapped in a common.motor_output.CoalescedOutput). Keeps the last value that was set.
+    """
+
+    def __init__(self, value=0):
+        self.value = value
+        self.inverted = False
+        self.scale = 1.0 # The replay writes the logged scale of the motor's power group
+        self.applied_scale = 1.0
+
+    def set(self, value):
+        self.value = value
+        self.applied_scale = self.scale
+
+    def get(self):
+        return self.value
+
+    def get_applied(self):
+        return self.value * self.applied_scale
+
+    def setInverted(self, inverted):
+        self.inverted = inverted
+
+    def getInverted(self):
+        return self.inverted
+
+class StubEncoder():
+    """
+    Replaces the wpilib.AnalogInput of an absolute encoder.
+    The voltage is written by the simulator.
+    """
+
+    def __init__(self, voltage=0):
+        self.voltage = voltage
+
+    def getVoltage(self):
+        return self.voltage
+
+    def getAverageVoltage(self):
+        return self.voltage
+
+class StubJoystick():
+    """
+    Replaces wpilib.Joystick. The axes, buttons and POV are written by the replay.
+    """
+
+    def __init__(self, axis_count=6, button_count=12):
+        self.axes = [0.0] * axis_count
+        self.buttons = 0 # Bit i is button i + 1
+        self.button_count = button_count
+        self.pov = -1
+
+    def getRawAxis(self, axis):
+        return self.axes[axis]
+
+    def getRawButton(self, button):
+        return bool(self.buttons & (1 << (button - 1)))
+
+    def getButtonCount(self):
+        return self.button_count
+
+    def getPOV(self, pov=0):
+        return self.pov
+
+class StubDigitalInput():
+    """
+    Replaces wpilib.DigitalInput.
+    """
+
+    def __init__(self, value=False):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+class StubColorSensorV3():
+    """
+    Replaces rev.color.ColorSensorV3. Returns the color written by the replay.
+    """
+
+    def __init__(self):
+        self.color = None
+
+    def getColor(self):
+        return self.color
+
+class StubPDP():
+    """
+    Replaces wpilib.PowerDistributionPanel. Returns the voltage and currents written by the replay.
+    """
+
+    def __init__(self, voltage=12):
+        self.voltage = voltage
+        self.currents = {}
+
+    def getVoltage(self):
+        return self.voltage
+
+    def getCurrent(self, channel):
+        return self.currents.get(channel, 0)
@@ -0,0 +1,181 @@
+"""
+Headless simulation of the real SwerveDrive and SwerveModule components.
+
+The components are created and injected by hand (the same way MagicBot does it)
+with stub motors and encoders. Every tick the motor outputs are fed to the
+physics model, and the simulated encoder voltages are fed back to the modules.
+
+Run a whole match and print the speed compared to the real time:
+    python -m simulation.harness
+"""
+
+import math
+import random
+import time
+
+import numpy as np
+
+from components import swervedrive, swervemodule
+from common import telemetry
+from simulation.hardware import StubMotor, StubEncoder
+from simulation.physics import SwervePhysics
+
+# The module configs of the robot in the order of the SwerveDrive's buffers
+MODULE_ATTRIBUTES = ('frontLeftModule', 'frontRightModule', 'rearLeftModule', 'rearRightModule')
+
+def robot_module_configs():
+    """
+    :returns: The ModuleConfigs defined in robot.py
+    """
+    from robot import MyRobot
+    return [getattr(MyRobot, name + '_cfg') for name in MODULE_ATTRIBUTES]
+
+def create_module(cfg, telemetry):
+    """
+    Create and set up a SwerveModule with stub motors and a stub encoder.
+    """
+    module = swervemodule.SwerveModule()
+    module.driveMotor = StubMotor()
+    module.rotateMotor = StubMotor()
+    module.encoder = StubEncoder()
+    module.cfg = cfg
+    module.telemetry = telemetry
+    module.setup()
+    return module
+
+def create_drive(modules, telemetry):
+    """
+    Create and set up a SwerveDrive with the given modules.
+    """
+    drive = swervedrive.SwerveDrive()
+    for name, module in zip(MODULE_ATTRIBUTES, modules):
+        setattr(drive, name, module)
+    drive.telemetry = telemetry
+    drive.setup()
+    return drive
+
+class SwerveSimulator():
+    """
+    Runs the real drive components against the physics model as fast as possible.
+    """
+
+    def __init__(self, configs=None, period=0.02, **physics_options):
+        """
+        :param configs: ModuleConfig of each module, defaults to the ones in robot.py
+        :param period: Length of one robot iteration in seconds
+        :param physics_options: Extra arguments of the SwervePhysics
+        """
+        if configs is None:
+            configs = robot_module_configs()
+
+        self.period = period
+        self.time = 0
+        self.telemetry = telemetry.Telemetry()
+
+        self.modules = [create_module(cfg, self.telemetry) for cfg in configs]
+        self.drive = create_drive(self.modules, self.telemetry)
+
+        self.physics = SwervePhysics(
+            [cfg.zero for cfg in configs], self.drive.geometry, **physics_options
+        )
+
+        self._rotate_outputs = np.zeros(len(self.modules))
+        self._drive_outputs = np.zeros(len(self.modules))
+
+        self.update_encoders()
+
+    def update_encoders(self):
+        """
+        Write the simulated encoder voltages to the stub encoders.
+        """
+        for module, voltage in zip(self.modules, self.physics.encoder_voltages()):
+            module.encoder.voltage = voltage
+
+    def step(self, execute_drive=True):
+        """
+        Run one robot iteration and move the physics model by one period.
+
+        :param execute_drive: If False, only the modules are executed. Used to
+                              command the modules directly with SwerveModule.move
+        """
+        if execute_drive:
+            self.drive.execute()
+        else:
+            for module in self.modules:
+                module.execute()
+
+        for i, module in enumerate(self.modules):
+            self._rotate_outputs[i] = module.rotateMotor.value
+            self._drive_outputs[i] = module.driveMotor.value
+
+        self.physics.update(self.period, self._rotate_outputs, self._drive_outputs)
+        self.update_encoders()
+
+        self.time += self.period
+
+    def run(self, duration, control=None):
+        """
+        Run the simulation.
+
+        :param duration: Simulated time in seconds
+        :param control: Function called with (simulator, time) before every iteration,
+                        it should send the commands to self.drive
+        :returns: (ticks, 3) array of the robot's pose after each iteration
+        """
+        ticks = int(round(duration / self.period))
+        poses = np.zeros((ticks, 3))
+
+        for tick in range(ticks):
+            if control is not None:
+                control(self, self.time)
+            self.step()
+            poses[tick] = self.physics.pose
+
+        return poses
+
+    def run_match(self, autonomous=None, teleop=None, autonomous_duration=15, teleop_duration=135):
+        """
+        Run an autonomous and a teleop period back to back.
+        The drive is flushed between the periods like the robot does.
+
+        :returns: (ticks, 3) array of the robot's pose after each iteration
+        """
+        self.drive.flush()
+        self.drive.threshold_input_vectors = True
+        auto_poses = self.run(autonomous_duration, autonomous)
+
+        self.drive.flush()
+        self.drive.squared_inputs = True
+        self.drive.threshold_input_vectors = True
+        teleop_poses = self.run(teleop_duration, teleop)
+
+        return np.concatenate((auto_poses, teleop_poses))
+
+def random_driver(seed=0, hold=1.0):
+    """
+    Create a teleop control function that moves the sticks to a random position every `hold` seconds.
+    """
+    rng = random.Random(seed)
+    state = {'until': -1, 'sticks': (0, 0, 0)}
+
+    def control(sim, now):
+        if now >= state['until']:
+            state['until'] = now + hold
+            state['sticks'] = (rng.uniform(-1, 1), rng.uniform(-1, 1), rng.uniform(-1, 1))
+        sim.drive.move(*state['sticks'])
+
+    return control
+
+if __name__ == '__main__':
+    sim = SwerveSimulator()
+
+    def escape(sim, now):
+        if now < 2.5:
+            sim.drive.set_raw_fwd(0.5)
+
+    start = time.perf_counter()
+    poses = sim.run_match(escape, random_driver())
+    elapsed = time.perf_counter() - start
+
+    print('Simulated %.1f s in %.3f s (%.0fx real time)' % (sim.time, elapsed, sim.time / elapsed))
+    print('Final pose: x=%.2f ft y=%.2f ft heading=%.1f deg' % (poses[-1, 0], poses[-1, 1], math.degrees(poses[-1, 2])))
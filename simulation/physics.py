@@ -0,0 +1,126 @@
+"""
+NumPy model of the swerve modules and the chassis.
+
+Every module is an index in the arrays, so all four modules are stepped with
+a few array operations instead of a python loop.
+"""
+
+import math
+
+import numpy as np
+
+from common.steering import MAX_VOLTAGE, MAX_SPEED
+
+TWO_PI = 2 * math.pi
+
+class SwervePhysics():
+    """
+    Simulates the rotate motors, the drive motors and the absolute encoders of the modules.
+
+    The rotate motors turn the module with a first order lag. Positive output turns
+    the module to the higher encoder voltages. The encoders output 0V to 5V over a turn
+    and wrap around, starting from their zero offset.
+
+    The drive motors set the wheel speed with a first order lag. The wheel speeds and module
+    angles are combined into the chassis movement with a least squares forward kinematics.
+    """
+
+    def __init__(self, zeros, geometry, steer_speed=9.0, steer_tau=0.05, drive_speed=MAX_SPEED, drive_tau=0.1):
+        """
+        :param zeros: Encoder voltage of each module when it is facing forward
+        :param geometry: common.geometry.ChassisGeometry of the modules, in feet
+        :param steer_speed: Module turn speed at full output in rad/s
+        :param steer_tau: Time constant of the rotate motors in seconds
+        :param drive_speed: Wheel speed at full output in ft/s
+        :param drive_tau: Time constant of the drive motors in seconds
+        """
+        self.zeros = np.asarray(zeros, dtype=float)
+        self.geometry = geometry
+
+        self.steer_speed = steer_speed
+        self.steer_tau = steer_tau
+        self.drive_speed = drive_speed
+        self.drive_tau = drive_tau
+
+        n = len(self.zeros)
+
+        # Module state
+        self.angles = np.zeros(n) # rad, 0 is forward
+        self.steer_velocities = np.zeros(n) # rad/s
+        self.wheel_speeds = np.zeros(n) # ft/s
+
+        # Chassis state: x, y in feet and the heading in rad (counter-clockwise).
+        # At the start the robot faces the +x direction.
+        self.pose = np.zeros(3)
+
+        # Least squares solution of the inverse kinematics, maps the
+        # stacked (x, y) wheel velocities back to (fwd, strafe, rcw).
+        self._forward_matrix = np.array(geometry.forward_matrix)
+        self._ratio = geometry.ratio
+
+        self._wheel_vectors = np.zeros(2 * n)
+
+        # Decay factors of the first order lags, calculated for the last used dt
+        self._dt = None
+        self._steer_decay = 0
+        self._drive_decay = 0
+
+    def set_angles(self, degrees):
+        """
+        Set the angle of the modules, e.g. to start from a random position.
+        """
+        self.angles[:] = np.radians(degrees) % TWO_PI
+
+    def encoder_voltages(self):
+        """
+        :returns: The voltage of each absolute encoder
+        """
+        return (self.angles / TWO_PI * MAX_VOLTAGE + self.zeros) % MAX_VOLTAGE
+
+    def chassis_speeds(self):
+        """
+        :returns: (fwd, strafe, rcw) of the chassis from the current wheel vectors.
+                  fwd and strafe are in ft/s, rcw is the clockwise turn speed in rad/s.
+        """
+        self._wheel_vectors[0::2] = self.wheel_speeds * np.sin(self.angles)
+        self._wheel_vectors[1::2] = self.wheel_speeds * np.cos(self.angles)
+        fwd, strafe, rcw = self._forward_matrix.dot(self._wheel_vectors)
+        return fwd, strafe, rcw / self._ratio
+
+    def update(self, dt, rotate_outputs, drive_outputs):
+        """
+        Step the simulation.
+
+        :param dt: Time passed in seconds
+        :param rotate_outputs: Output of each rotate motor [-1, 1]
+        :param drive_outputs: Output of each drive motor [-1, 1]
+        """
+        if dt != self._dt:
+            self._dt = dt
+            self._steer_decay = math.exp(-dt / self.steer_tau)
+            self._drive_decay = math.exp(-dt / self.drive_tau)
+
+        steer_targets = np.clip(rotate_outputs, -1, 1) * self.steer_speed
+        drive_targets = np.clip(drive_outputs, -1, 1) * self.drive_speed
+
+        # Exact solution of the first order lags over dt, so no substeps are needed.
+        steer_error = self.steer_velocities - steer_targets
+        self.angles += steer_targets * dt + steer_error * (self.steer_tau * (1 - self._steer_decay))
+        self.angles %= TWO_PI
+        self.steer_velocities = steer_targets + steer_error * self._steer_decay
+
+        start_speeds = self.chassis_speeds()
+        self.wheel_speeds = drive_targets + (self.wheel_speeds - drive_targets) * self._drive_decay
+        end_speeds = self.chassis_speeds()
+
+        # Move the chassis with the average of the speeds at the start and the end of the step.
+        fwd = (start_speeds[0] + end_speeds[0]) / 2
+        strafe = (start_speeds[1] + end_speeds[1]) / 2
+        rcw = (start_speeds[2] + end_speeds[2]) / 2
+
+        heading = self.pose[2] - rcw * dt / 2 # Heading at the middle of the step
+        cos = math.cos(heading)
+        sin = math.sin(heading)
+        self.pose[0] += (fwd * cos - strafe * sin) * dt
+        self.pose[1] += (fwd * sin + strafe * cos) * dt
+        self.pose[2] -= rcw * dt # Clockwise rotation lowers the heading
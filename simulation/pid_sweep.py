@@ -0,0 +1,228 @@
+"""
+Searches the PID gains and tolerances of the module steering loop.
+
+Every candidate is run on the simulated modules against a list of steering steps,
+and ranked by the settle time, the overshoot and the oscillation of the responses.
+The candidates are spread over a process pool.
+
+Grid search:
+    python -m simulation.pid_sweep --kp 1 1.5 2 3 --kd 0 0.02 0.05
+Random search between the given minimum and maximum values:
+    python -m simulation.pid_sweep --kp 0.5 4 --ki 0 0.5 --kd 0 0.1 --samples 500
+Recorded steps (a CSV file with "start_degree,target_degree" lines):
+    python -m simulation.pid_sweep --steps steps.csv
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import random
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from common import steering
+from common.steering import MAX_VOLTAGE
+
+# PID gains and the tolerances given to PIDController.setTolerance
+Candidate = namedtuple('Candidate', ['kP', 'kI', 'kD', 'position_tolerance', 'velocity_tolerance'])
+
+# Result of a candidate. Times in seconds, angles in degrees.
+Result = namedtuple('Result', ['candidate', 'settle_time', 'settled', 'overshoot', 'oscillations', 'final_error'])
+
+# Synthetic steps (start degree, target degree), small and large turns and ones crossing the 0/360 point.
+DEFAULT_STEPS = (
+    (0, 10), (0, 45), (0, 90), (90, 0), (10, 350), (350, 10), (180, 260), (300, 30), (45, 225), (270, 95)
+)
+
+SETTLE_BAND = 3 # Degrees, the response is settled once the error stays inside this band
+DURATION = 1.5 # Seconds each step is simulated
+
+_simulator = None # Simulator of the worker process
+
+def _get_simulator():
+    global _simulator
+    if _simulator is None:
+        from simulation.harness import SwerveSimulator
+        _simulator = SwerveSimulator()
+    return _simulator
+
+def _wrapped_error(voltage, setpoint):
+    """
+    :returns: The shortest distance between two encoder voltages in degrees
+    """
+    error = (voltage - setpoint) % MAX_VOLTAGE
+    if error > MAX_VOLTAGE / 2:
+        error -= MAX_VOLTAGE
+    return error / MAX_VOLTAGE * 360
+
+def run_step(sim, candidate, start, target, duration=DURATION):
+    """
+    Turn every module of the simulator from start to target with the candidate's gains.
+    The modules do not reverse during the step, so the steering turns the whole requested step
+    (with reversal, a step over 90 degrees would become a shorter turn to the opposite angle).
+
+    :returns: List of the error traces of each module in degrees
+    :raises ValueError: If a module does not start the requested step
+    """
+    sim.physics.set_angles([start] * len(sim.modules))
+    sim.physics.steer_velocities[:] = 0
+    sim.physics.wheel_speeds[:] = 0
+    sim.update_encoders()
+
+    for module in sim.modules:
+        module.flush()
+        module._pid_controller.setPID(candidate.kP, candidate.kI, candidate.kD)
+        module._pid_controller.setTolerance(candidate.position_tolerance, candidate.velocity_tolerance)
+
+        allow_reverse = module.allow_reverse
+        module.allow_reverse = False
+        module.move(0, target)
+        module.allow_reverse = allow_reverse
+
+        step = steering.wrap_degrees(target - start)
+        error = _wrapped_error(module.encoder.getVoltage(), module._requested_voltage)
+        if abs(steering.wrap_degrees(error + step)) > 1:
+            raise ValueError('%s turns %.1f degrees for the step from %s to %s' % (module.sd_prefix, -error, start, target))
+
+    traces = [[] for _ in sim.modules]
+    for _ in range(int(round(duration / sim.period))):
+        sim.step(execute_drive=False)
+        for trace, module in zip(traces, sim.modules):
+            trace.append(_wrapped_error(module.encoder.getVoltage(), module._requested_voltage))
+
+    return traces
+
+def trace_metrics(trace, period):
+    """
+    :param trace: Errors of a step response in degrees
+    :param period: Time between two errors
+    :returns: (settle time, settled, overshoot, oscillations, final error)
+    """
+    settled_at = len(trace)
+    for i in range(len(trace) - 1, -1, -1):
+        if abs(trace[i]) > SETTLE_BAND:
+            break
+        settled_at = i
+
+    # Overshoot is the largest error on the other side of the target
+    start_sign = 1 if trace[0] >= 0 else -1
+    overshoot = max(0, max(-start_sign * error for error in trace))
+
+    # Count the sign changes outside of the settle band
+    oscillations = 0
+    sign = 0
+    for error in trace:
+        if abs(error) > SETTLE_BAND:
+            new_sign = 1 if error > 0 else -1
+            if sign and new_sign != sign:
+                oscillations += 1
+            sign = new_sign
+
+    settled = settled_at < len(trace)
+    return settled_at * period, settled, overshoot, oscillations, abs(trace[-1])
+
+def evaluate(candidate, steps=DEFAULT_STEPS):
+    """
+    Run every step with the candidate and combine the metrics of every module.
+    Runs in the worker processes.
+
+    :returns: Result
+    """
+    sim = _get_simulator()
+
+    settle_times = []
+    all_settled = True
+    overshoot = 0
+    oscillations = 0
+    final_error = 0
+
+    for start, target in steps:
+        for trace in run_step(sim, candidate, start, target):
+            settle_time, settled, step_overshoot, step_oscillations, step_error = trace_metrics(trace, sim.period)
+            settle_times.append(settle_time)
+            all_settled = all_settled and settled
+            overshoot = max(overshoot, step_overshoot)
+            oscillations += step_oscillations
+            final_error = max(final_error, step_error)
+
+    return Result(candidate, sum(settle_times) / len(settle_times), all_settled, overshoot, oscillations, final_error)
+
+def grid_candidates(kP, kI, kD, position_tolerance, velocity_tolerance):
+    """
+    :returns: A candidate for every combination of the given values
+    """
+    return [Candidate(*values) for values in itertools.product(kP, kI, kD, position_tolerance, velocity_tolerance)]
+
+def random_candidates(samples, kP, kI, kD, position_tolerance, velocity_tolerance, seed=0):
+    """
+    :param samples: Number of candidates
+    :returns: Candidates with values drawn uniformly between the min and max of each given list
+    """
+    rng = random.Random(seed)
+    ranges = (kP, kI, kD, position_tolerance, velocity_tolerance)
+    return [Candidate(*(rng.uniform(min(r), max(r)) for r in ranges)) for _ in range(samples)]
+
+def rank(results):
+    """
+    Sort the results, best first. Unsettled candidates go last, then the
+    average settle time, the overshoot and the oscillations are compared.
+    """
+    return sorted(results, key=lambda r: (not r.settled, r.settle_time, r.overshoot, r.oscillations))
+
+def sweep(candidates, steps=DEFAULT_STEPS, workers=None):
+    """
+    Evaluate the candidates in a process pool.
+
+    :param workers: Number of processes, defaults to the number of cores
+    :returns: Ranked list of Results
+    """
+    steps = tuple(steps)
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(candidates) // (4 * workers))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(evaluate, candidates, itertools.repeat(steps), chunksize=chunksize))
+    return rank(results)
+
+def load_steps(path):
+    """
+    Read recorded steps from a CSV file of "start_degree,target_degree" lines.
+    """
+    with open(path) as file:
+        return [(float(row[0]), float(row[1])) for row in csv.reader(file) if row and not row[0].startswith('#')]
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep the module steering PID gains on the simulator.')
+    parser.add_argument('--kp', type=float, nargs='+', default=[0.5, 1.0, 1.5, 2.0, 3.0])
+    parser.add_argument('--ki', type=float, nargs='+', default=[0.0])
+    parser.add_argument('--kd', type=float, nargs='+', default=[0.0, 0.01, 0.03])
+    parser.add_argument('--position-tolerance', type=float, nargs='+', default=[0.05])
+    parser.add_argument('--velocity-tolerance', type=float, nargs='+', default=[0.05])
+    parser.add_argument('--samples', type=int, default=0, help='Random search with this many candidates instead of a grid')
+    parser.add_argument('--steps', help='CSV file of recorded steps')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    values = (args.kp, args.ki, args.kd, args.position_tolerance, args.velocity_tolerance)
+    if args.samples:
+        candidates = random_candidates(args.samples, *values)
+    else:
+        candidates = grid_candidates(*values)
+
+    steps = load_steps(args.steps) if args.steps else DEFAULT_STEPS
+
+    results = sweep(candidates, steps, args.workers)
+
+    print('%8s %8s %8s %8s %8s | %8s %8s %10s %6s %8s' % (
+        'kP', 'kI', 'kD', 'posTol', 'velTol', 'settle', 'settled', 'overshoot', 'osc', 'error'
+    ))
+    for result in results[:args.top]:
+        print('%8.3f %8.3f %8.3f %8.3f %8.3f | %8.3f %8s %10.2f %6d %8.2f' % (
+            result.candidate + (result.settle_time, result.settled, result.overshoot, result.oscillations, result.final_error)
+        ))
+
+if __name__ == '__main__':
+    main()
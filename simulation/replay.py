@@ -0,0 +1,276 @@
+"""
+Deterministic replay of match logs.
+
+The real components are created against stub hardware and wired together the
+same way MagicBot does it in robot.py. Every teleop record of a log is fed to
+MyRobot's teleop code, the components are executed in the robot's order, and the
+produced outputs are compared with the outputs that were recorded.
+
+The HAL's simulated clock is stepped with the logged timestamps, so the timed states
+behave the same as in the match, and the outputs are scaled with the logged scales of the
+power manager (which does not run in the replay). Autonomous and disabled records are skipped.
+
+Replay a season of logs on every core:
+    python -m simulation.replay logs/*.swlog
+"""
+
+import argparse
+import os
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import hal
+import wpilib
+
+from robot import MyRobot
+from components import shooter, wof, recorder, odometry, aligner
+from common import color_sensor, vision, telemetry, matchlog
+from simulation.harness import create_module, create_drive, robot_module_configs
+from simulation.hardware import StubMotor, StubJoystick, StubDigitalInput, StubColorSensorV3, StubPDP
+
+# Difference allowed between a replayed output and a logged output (they are logged as 32 bit floats)
+TOLERANCE = 1e-4
+
+# Mismatches of an output field. error is the largest difference.
+Mismatch = namedtuple('Mismatch', ['count', 'first_tick', 'error'])
+
+ReplayReport = namedtuple('ReplayReport', ['path', 'ticks', 'replayed', 'skipped', 'mismatches'])
+
+def _output_indexes():
+    """
+    :returns: (field name, flat index) of every output value
+    """
+    indexes = []
+    for name in matchlog.OUTPUT_FIELDS:
+        index = matchlog.FIELD_INDEX[name]
+        if isinstance(index, slice):
+            indexes.extend((name, i) for i in range(index.start, index.stop))
+        else:
+            indexes.append((name, index))
+    return tuple(indexes)
+
+OUTPUT_INDEXES = _output_indexes()
+
+class ReplayRobot():
+    """
+    Runs the teleop code of MyRobot against the replay's objects.
+    """
+    teleopInit = MyRobot.teleopInit
+    teleopPeriodic = MyRobot.teleopPeriodic
+    move = MyRobot.move
+
+class MatchReplay():
+    """
+    The components of the robot against stub hardware.
+    The components keep their state between ticks, so a MatchReplay replays a single log.
+    """
+
+    def __init__(self, configs=None, tolerance=TOLERANCE):
+        """
+        :param configs: ModuleConfig of each module, defaults to the ones in robot.py
+        :param tolerance: Difference allowed between a replayed and a logged output
+        """
+        if configs is None:
+            configs = robot_module_configs()
+
+        self.tolerance = tolerance
+        self.telemetry = telemetry.Telemetry()
+
+        # Common objects
+        self.colorSensor = color_sensor.ColorSensor(self.telemetry)
+        self.colorSensor.colorSensor = StubColorSensorV3()
+        self._colorSample = self.colorSensor.sample
+        self.colorSensor.readSample = lambda: self._colorSample
+
+        # Components, injected like MagicBot does
+        self.modules = [create_module(cfg, self.telemetry) for cfg in configs]
+        self.drive = create_drive(self.modules, self.telemetry)
+
+        self.odometry = odometry.Odometry()
+        self.odometry.drive = self.drive
+        self.odometry.setup()
+
+        self.vision = vision.Vision()
+        self.vision.odometry = self.odometry
+        self.vision.telemetry = self.telemetry
+        self.vision.setup()
+
+        self.aligner = aligner.Aligner()
+        self.aligner.drive = self.drive
+        self.aligner.vision = self.vision
+        self.aligner.setup()
+
+        self.shooter = shooter.Shooter()
+        self.shooter.drive = self.drive
+        self.shooter.vision = self.vision
+        self.shooter.aligner = self.aligner
+        self.shooter.leftShooterMotor = StubMotor()
+        self.shooter.rightShooterMotor = StubMotor()
+        self.shooter.intakeMotor = StubMotor()
+        self.shooter.beltMotor = StubMotor()
+        self.shooter.pdp = StubPDP()
+        self.shooter.setup()
+
+        self.wof = wof.WheelOfFortune()
+        self.wof.motor = StubMotor()
+        self.wof.colorSensor = self.colorSensor
+        self.wof.telemetry = self.telemetry
+        self.wof.setup()
+        self._game_data = 'N'
+        self.wof.getData = lambda: self._game_data
+
+        # Robot
+        self.robot = ReplayRobot()
+        self.robot.gamempad = StubJoystick()
+        self.robot.gamempad2 = StubJoystick()
+        self.robot.switch = StubDigitalInput()
+        self.robot.climbingMotor = StubMotor()
+        self.robot.hookMotor = StubMotor()
+        self.robot.drive = self.drive
+        self.robot.shooter = self.shooter
+        self.robot.wof = self.wof
+
+        # The recorder collects the outputs the same way as on the robot
+        self.recorder = recorder.MatchRecorder()
+        for name in ('gamempad', 'gamempad2', 'switch', 'climbingMotor', 'hookMotor'):
+            setattr(self.recorder, name, getattr(self.robot, name))
+        self.recorder.drive = self.drive
+        self.recorder.shooter = self.shooter
+        self.recorder.wof = self.wof
+        self.recorder.vision = self.vision
+        self.recorder.colorSensor = self.colorSensor
+
+        # Motors of the power groups, the same as in robot.py
+        self.groups = {
+            'drive': [module.driveMotor for module in self.modules],
+            'shooter': [self.shooter.leftShooterMotor, self.shooter.rightShooterMotor, self.shooter.intakeMotor, self.shooter.beltMotor],
+            'climber': [self.robot.climbingMotor, self.robot.hookMotor],
+            'wof': [self.wof.motor]
+        }
+
+        # Same order as the components in robot.py
+        self.components = [self.aligner, self.drive, self.shooter, self.wof] + self.modules + [self.odometry, self.vision]
+
+        hal.simulation.pauseTiming()
+
+    def _load_inputs(self, values):
+        """
+        Write the logged inputs to the stubs.
+        """
+        index = matchlog.FIELD_INDEX
+
+        self.robot.gamempad.axes[:] = values[index['gamepad_axes']]
+        self.robot.gamempad.buttons = values[index['gamepad_buttons']]
+        self.robot.gamempad.pov = values[index['gamepad_pov']]
+        self.robot.gamempad2.axes[:] = values[index['gamepad2_axes']]
+        self.robot.gamempad2.buttons = values[index['gamepad2_buttons']]
+        self.robot.gamempad2.pov = values[index['gamepad2_pov']]
+        self.robot.switch.value = values[index['switch']]
+
+        for module, voltage in zip(self.modules, values[index['encoder_voltages']]):
+            module.encoder.voltage = voltage
+
+        self.vision.tx, self.vision.ty, self.vision.tv, self.vision.tl = values[index['vision']]
+
+        pdp = self.shooter.pdp
+        pdp.voltage, left, right = values[index['pdp']]
+        pdp.currents[self.shooter.left_channel] = left
+        pdp.currents[self.shooter.right_channel] = right
+
+        # The outputs are scaled the same way as by the power manager in the match
+        for group, scale in zip(matchlog.POWER_GROUPS, values[index['power_scales']]):
+            for motor in self.groups[group]:
+                motor.scale = scale
+
+        # The same sample as in the match, the segment counter ignores a sample it already saw.
+        # Its timestamp is moved to the replay's clock, so its age stays the same.
+        offset = wpilib.Timer.getFPGATimestamp() - values[index['timestamp']]
+        color = wpilib.Color(*values[index['color']])
+        self.colorSensor.colorSensor.color = color
+        self._colorSample = color_sensor.Sample(values[index['color_timestamp']] + offset, color,
+            values[index['color_match']].decode(), values[index['color_confidence']])
+        self._game_data = values[index['game_data']].decode()
+
+    def replay(self, path):
+        """
+        Replay a log and compare the outputs.
+
+        :returns: ReplayReport
+        """
+        mode_index = matchlog.FIELD_INDEX['mode']
+        time_index = matchlog.FIELD_INDEX['timestamp']
+
+        mismatches = {}
+        ticks = replayed = skipped = 0
+        in_teleop = False
+        last_time = None
+
+        with matchlog.MatchLogReader(path) as reader:
+            for tick, values in enumerate(reader.iter_values()):
+                ticks += 1
+
+                if values[mode_index] != matchlog.MODE_TELEOP:
+                    in_teleop = False
+                    skipped += 1
+                    continue
+
+                # Step the simulated clock by the logged time
+                timestamp = values[time_index]
+                if last_time is not None and timestamp > last_time:
+                    hal.simulation.stepTiming(int((timestamp - last_time) * 1e6))
+                last_time = timestamp
+
+                if not in_teleop:
+                    self.robot.teleopInit()
+                    in_teleop = True
+
+                self._load_inputs(values)
+
+                self.robot.teleopPeriodic()
+                for component in self.components:
+                    component.execute()
+
+                outputs = self.recorder.outputs()
+                for (name, index), output in zip(OUTPUT_INDEXES, outputs):
+                    error = abs(output - values[index])
+                    if error > self.tolerance:
+                        count, first_tick, max_error = mismatches.get(name, (0, tick, 0))
+                        mismatches[name] = Mismatch(count + 1, first_tick, max(max_error, error))
+
+                replayed += 1
+
+        return ReplayReport(path, ticks, replayed, skipped, mismatches)
+
+def _replay_log(path):
+    # Every log gets new components, so nothing carries over from the logs replayed before it
+    return MatchReplay().replay(path)
+
+def replay_logs(paths, workers=None):
+    """
+    Replay many logs in a process pool.
+
+    :returns: List of ReplayReports in the order of the paths
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_replay_log, paths))
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay match logs and compare the outputs.')
+    parser.add_argument('logs', nargs='+')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    failed = False
+    for report in replay_logs(args.logs, args.workers):
+        status = 'OK' if not report.mismatches else 'DIFF'
+        print('%s %s: %d ticks, %d replayed, %d skipped' % (status, report.path, report.ticks, report.replayed, report.skipped))
+        for name, mismatch in sorted(report.mismatches.items()):
+            print('    %-16s %6d ticks differ, first at tick %d, max error %.4f' % (name, mismatch.count, mismatch.first_tick, mismatch.error))
+        failed = failed or bool(report.mismatches)
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
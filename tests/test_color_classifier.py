@@ -0,0 +1,33 @@
+from common.color_classifier import ColorClassifier
+
+REFERENCES = {
+    "B": (0.167, 0.446, 0.385),
+    "G": (0.202, 0.535, 0.261),
+    "R": (0.395, 0.409, 0.195),
+    "Y": (0.302, 0.542, 0.155)
+}
+
+def test_reference_colors_match_themselves():
+    classifier = ColorClassifier(REFERENCES)
+    for index, (letter, rgb) in enumerate(REFERENCES.items()):
+        match = classifier.classify(*rgb)
+        assert match.letter == letter
+        assert match.index == index
+        assert match.confidence > 0.99
+
+def test_brightness_does_not_change_the_match():
+    classifier = ColorClassifier(REFERENCES)
+    dim = classifier.classify(0.0395, 0.0409, 0.0195)
+    bright = classifier.classify(3.95, 4.09, 1.95)
+    assert dim.letter == bright.letter == "R"
+
+def test_far_colors_are_none():
+    classifier = ColorClassifier(REFERENCES, confidence=0.9)
+    match = classifier.classify(0.9, 0.05, 0.05)
+    assert match.letter == "N"
+    assert match.index == -1
+    assert match.confidence < 0.9
+
+def test_black_is_none():
+    classifier = ColorClassifier(REFERENCES)
+    assert classifier.classify(0, 0, 0).letter == "N"
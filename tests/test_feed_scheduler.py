@@ -0,0 +1,146 @@
+import pytest
+
+from common.feed_scheduler import FeedScheduler
+
+# Same values as components.shooter.Shooter
+SHOT_CURRENT = 10
+BASELINE_GAIN = 0.1
+RECOVERY_TIMEOUT = 0.5
+EMPTY_TIME = 1.0
+
+PERIOD = 0.02
+BASELINE = 8.0 # Current of the flywheels at speed, without a ball
+
+def spike(peak=30, length=5):
+    """
+    Current of a ball going through the flywheels.
+    """
+    return [peak] * length
+
+def flat(time, current=BASELINE):
+    return [current] * int(round(time / PERIOD))
+
+def run(currents, ballCount=None, ready=lambda now: True):
+    """
+    Feed the scheduler with a current trace, one value every iteration.
+
+    :returns: (scheduler, times of the shots, belt output of every iteration)
+    """
+    feeder = FeedScheduler(SHOT_CURRENT, BASELINE_GAIN, RECOVERY_TIMEOUT, EMPTY_TIME)
+    feeder.reset()
+    feeder.ballCount = ballCount
+    feeder.start(BASELINE, 0.0)
+
+    shotTimes = []
+    feeds = []
+    for i, current in enumerate(currents):
+        now = (i + 1) * PERIOD
+        shots = feeder.shots
+        feeds.append(feeder.update(current, ready(now), now))
+        if feeder.shots > shots:
+            shotTimes.append(now)
+        if feeder.isEmpty:
+            break
+
+    return feeder, shotTimes, feeds
+
+def test_three_spikes_shoot_three_balls():
+    trace = flat(0.2) + spike() + flat(0.2) + spike() + flat(0.2) + spike() + flat(2)
+    feeder, shotTimes, feeds = run(trace, ballCount=3)
+
+    assert feeder.shots == 3
+    assert feeder.isEmpty
+    assert shotTimes == pytest.approx([0.22, 0.52, 0.82])
+
+    # Stopped on the third spike, not after the empty timeout
+    assert len(feeds) == 41
+    assert feeds[-1] is False
+
+def test_belt_holds_during_a_spike():
+    trace = flat(0.1) + spike(length=10) + flat(0.3)
+    feeder, _, feeds = run(trace)
+
+    assert feeds[:5] == [True] * 5
+    assert feeds[5:15] == [False] * 10
+    assert feeds[15] is True
+
+def test_belt_waits_for_the_flywheels():
+    trace = flat(0.1) + spike() + flat(0.8)
+    # The flywheels recover 0.4 s after the spike
+    feeder, _, feeds = run(trace, ready=lambda now: now < 0.1 or now > 0.6)
+
+    first_feed = next(i for i, feed in enumerate(feeds) if i > 5 and feed)
+    assert (first_feed + 1) * PERIOD == pytest.approx(0.62)
+
+def test_belt_feeds_after_the_recovery_timeout():
+    trace = flat(0.1) + spike() + flat(0.8)
+    feeder, shotTimes, feeds = run(trace, ready=lambda now: now < 0.1)
+
+    first_feed = next(i for i, feed in enumerate(feeds) if i > 5 and feed)
+    assert (first_feed + 1) * PERIOD == pytest.approx(shotTimes[0] + RECOVERY_TIMEOUT)
+
+def test_fewer_balls_than_the_count():
+    trace = flat(0.2) + spike() + flat(0.2) + spike() + flat(3)
+    feeder, shotTimes, feeds = run(trace, ballCount=3)
+
+    assert feeder.shots == 2
+    assert feeder.isEmpty
+
+    # Empty a second after the last shot
+    emptyTime = len(feeds) * PERIOD
+    assert emptyTime == pytest.approx(shotTimes[-1] + EMPTY_TIME)
+
+def test_empty_hopper_shoots_nothing():
+    feeder, shotTimes, feeds = run(flat(3), ballCount=3)
+
+    assert feeder.shots == 0
+    assert feeder.isEmpty
+    assert len(feeds) * PERIOD == pytest.approx(EMPTY_TIME)
+
+def test_feeds_without_a_ball_count_until_stopped():
+    # The driver holds the trigger before the balls arrive, or no spike is detected at all
+    trace = flat(3) + spike() + flat(3)
+    feeder, shotTimes, feeds = run(trace)
+
+    assert not feeder.isEmpty
+    assert len(feeds) == len(trace)
+    assert shotTimes == pytest.approx([3.02])
+    assert all(feeds[-100:])
+
+def test_jammed_ball_stops_the_belt_until_empty():
+    # A ball stuck in the flywheels, the current never goes back under the end of the spike
+    trace = flat(0.2) + spike(peak=25, length=200)
+    feeder, shotTimes, feeds = run(trace, ballCount=3)
+
+    assert shotTimes == pytest.approx([0.22])
+    assert feeder.shots == 1
+    assert feeder.isEmpty
+
+    # The belt never pushes another ball into the jam, even after the recovery timeout
+    assert not any(feeds[10:])
+    assert len(feeds) * PERIOD == pytest.approx(shotTimes[0] + EMPTY_TIME)
+
+def test_spike_needs_the_hysteresis_to_end():
+    # The current drops under the threshold but not under its half, it is still the same ball
+    trace = flat(0.2) + spike(length=3) + [BASELINE + 7] * 5 + spike(length=3) + flat(0.5)
+    feeder, shotTimes, _ = run(trace)
+
+    assert feeder.shots == 1
+    assert shotTimes == pytest.approx([0.22])
+
+def test_baseline_follows_the_current():
+    # The flywheels draw more current at a higher speed, it is not a shot
+    trace = flat(0.1) + [BASELINE + i * 0.5 for i in range(30)] + flat(0.2, BASELINE + 15)
+    feeder, shotTimes, _ = run(trace, ballCount=1)
+
+    assert shotTimes == []
+    assert not feeder.isEmpty
+
+def test_reset_starts_a_new_shoot():
+    feeder, _, _ = run(flat(0.2) + spike() + flat(2), ballCount=3)
+    assert feeder.isEmpty and feeder.shots == 1
+
+    feeder.reset()
+    assert not feeder.isEmpty
+    assert feeder.shots == 0
+    assert feeder.ballCount is None
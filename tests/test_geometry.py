@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+import pytest
+
+from common import kinematics
+from common.geometry import ChassisGeometry
+
+# Same chassis as components.swervedrive.SwerveDrive
+LENGTH = (22 / 12) / 2
+WIDTH = (19.5 / 12) / 2
+
+COMMANDS = [
+    (1, 0, 0), (0, 1, 0), (0, 0, 1), (0, 0, -1), (0.5, -0.3, 0.2), (-0.7, 0.2, -0.6), (0.1, 0.1, 0.9),
+]
+
+def wheel_vectors(speeds, angles):
+    """
+    :returns: Stacked wheel vectors (x0, y0, x1, y1, ...) of each command, the same as the odometry
+    """
+    radians = np.radians(angles)
+    vectors = np.empty((speeds.shape[0], 2 * speeds.shape[1]))
+    vectors[:, 0::2] = speeds * np.sin(radians)
+    vectors[:, 1::2] = speeds * np.cos(radians)
+    return vectors
+
+@pytest.mark.parametrize('positions', [
+    ChassisGeometry.rectangle(LENGTH, WIDTH),
+    ChassisGeometry.rectangle(1, 1),
+    ((1, 0), (-0.5, 0.8), (-0.5, -0.8)), # Three modules
+    ((1.2, 0.4), (0.9, -0.7), (-1, 0.6), (-0.8, -0.9), (0, 0.2)),
+])
+def test_forward_kinematics_inverts_the_inverse_kinematics(positions):
+    geometry = ChassisGeometry(positions)
+    commands = np.array(COMMANDS, dtype=float)
+
+    speeds, angles = kinematics.inverse_kinematics(commands, geometry, normalize=False)
+    estimated = wheel_vectors(speeds, angles).dot(np.array(geometry.forward_matrix).T)
+
+    assert estimated == pytest.approx(commands, abs=1e-9)
+
+def test_coefficients_match_the_rotation_vectors():
+    geometry = ChassisGeometry.rectangular(LENGTH, WIDTH)
+    ratio = math.hypot(LENGTH, WIDTH)
+
+    assert geometry.ratio == pytest.approx(ratio)
+    assert geometry.x_coefficients == pytest.approx((-LENGTH / ratio, -LENGTH / ratio, LENGTH / ratio, LENGTH / ratio))
+    assert geometry.y_coefficients == pytest.approx((WIDTH / ratio, -WIDTH / ratio, WIDTH / ratio, -WIDTH / ratio))
+    assert [i for i, _, _ in geometry.coefficients] == [0, 1, 2, 3]
+
+def test_lock_angles_of_the_chassis():
+    geometry = ChassisGeometry.rectangular(LENGTH, WIDTH)
+
+    # Perpendicular to the diagonals: atan(width / length) = 41.55 degrees
+    angle = math.degrees(math.atan(WIDTH / LENGTH))
+    assert angle == pytest.approx(41.55, abs=0.01)
+    # front_left, front_right, rear_left, rear_right form an X
+    assert geometry.lock_angles == pytest.approx((angle, -angle, -angle, angle))
+
+def test_lock_angles_are_perpendicular_to_the_rotation():
+    geometry = ChassisGeometry(((1.2, 0.4), (0.9, -0.7), (-1, 0.6), (-0.8, -0.9)))
+
+    for angle, xc, yc in zip(geometry.lock_angles, geometry.x_coefficients, geometry.y_coefficients):
+        assert -90 < angle <= 90
+        radians = math.radians(angle)
+        assert math.sin(radians) * xc + math.cos(radians) * yc == pytest.approx(0, abs=1e-12)
+
+def test_square_chassis_locks_at_45_degrees():
+    assert ChassisGeometry.rectangular(1, 1).lock_angles == pytest.approx((45, -45, -45, 45))
+
+def test_setting_the_positions_recalculates():
+    geometry = ChassisGeometry.rectangular(LENGTH, WIDTH)
+    geometry.positions = ChassisGeometry.rectangle(1, 1)
+
+    assert geometry.ratio == pytest.approx(math.sqrt(2))
+    assert geometry.lock_angles == pytest.approx((45, -45, -45, 45))
+    assert geometry.forward_matrix == ChassisGeometry.rectangular(1, 1).forward_matrix
+
+def test_one_module_can_not_describe_the_movement():
+    with pytest.raises(ValueError):
+        ChassisGeometry(((1, 0),))
+
+def test_module_positions_in_the_drive_order():
+    positions = kinematics.module_positions(LENGTH, WIDTH)
+    assert positions.tolist() == [list(p) for p in ChassisGeometry.rectangle(LENGTH, WIDTH)]
+    assert len(kinematics.MODULE_NAMES) == len(positions)
+
+def test_zero_command_is_not_special():
+    # Unlike SwerveDrive._calculate_vectors, which keeps the last angles
+    speeds, angles = kinematics.inverse_kinematics([0, 0, 0], kinematics.module_positions(LENGTH, WIDTH))
+    assert speeds.tolist() == [[0, 0, 0, 0]]
+    assert angles.tolist() == [[0, 0, 0, 0]]
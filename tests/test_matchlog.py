@@ -0,0 +1,106 @@
+import pytest
+
+from common import matchlog
+from common.matchlog import FIELDS, HEADER_STRUCT, MAGIC, RECORD_SIZE, VERSION, MatchLogReader, MatchLogWriter
+
+# A value of each struct format that survives the round trip exactly
+VALUES = {'d': 0.25, 'f': 1.5, 'B': 2, 'I': 0x80000001, 'h': -1, '?': True, 'c': b'R'}
+
+def make_record(tick):
+    """
+    :returns: A Record with every value set, the timestamp is the tick
+    """
+    fields = []
+    for name, fmt, count in FIELDS:
+        value = VALUES[fmt]
+        if fmt in 'df':
+            value += tick
+        fields.append(value if count == 1 else (value,) * count)
+    fields[0] = tick * 0.02
+    return matchlog.Record._make(fields)
+
+def write_log(path, records, batch_size=50):
+    writer = MatchLogWriter(str(path), batch_size)
+    for record in records:
+        writer.write_record(record)
+    writer.close()
+    return writer
+
+def test_version():
+    assert VERSION == 6
+    assert matchlog.Record._fields[-1] == 'climber_outputs'
+    assert matchlog.OUTPUTS_START == matchlog.FIELD_INDEX['module_speeds'].start
+
+def test_flatten_and_group():
+    record = make_record(3)
+    values = matchlog.flatten(record)
+    assert len(values) == sum(count for _, _, count in FIELDS)
+    assert matchlog.group(tuple(values)) == record
+
+def test_round_trip(tmp_path):
+    records = [make_record(tick) for tick in range(120)]
+    writer = write_log(tmp_path / 'match.log', records, batch_size=50)
+    assert writer.dropped == 0
+
+    with MatchLogReader(str(tmp_path / 'match.log')) as reader:
+        assert len(reader) == 120
+
+        record = reader[7]
+        assert record.timestamp == pytest.approx(0.14)
+        assert record.encoder_voltages == (8.5,) * 4
+        assert record.color_timestamp == 7.25
+        assert record.color_match == b'R'
+        assert record.color_confidence == 8.5
+        assert record.power_scales == (8.5,) * 4
+        assert record.switch is True
+        assert record.gamepad_pov == -1
+        assert reader[-1].timestamp == pytest.approx(119 * 0.02)
+
+        flat = list(reader.iter_values(10, 20))
+        assert len(flat) == 10
+        assert flat[0] == reader.values(10)
+        assert [matchlog.group(values) for values in reader.iter_values()] == list(reader)
+
+        with pytest.raises(IndexError):
+            reader.values(120)
+
+def test_appends_to_an_existing_log(tmp_path):
+    write_log(tmp_path / 'match.log', [make_record(0)])
+    write_log(tmp_path / 'match.log', [make_record(1)])
+
+    with MatchLogReader(str(tmp_path / 'match.log')) as reader:
+        assert [record.color_timestamp for record in reader] == [0.25, 1.25]
+
+def test_ignores_a_partly_written_record(tmp_path):
+    path = tmp_path / 'match.log'
+    write_log(path, [make_record(tick) for tick in range(3)])
+    data = path.read_bytes()
+    path.write_bytes(data[:-RECORD_SIZE // 2])
+
+    with MatchLogReader(str(path)) as reader:
+        assert len(reader) == 2
+        assert reader[1].color_timestamp == 1.25
+
+@pytest.mark.parametrize('size', [1, HEADER_STRUCT.size - 1])
+def test_rejects_a_truncated_header(tmp_path, size):
+    path = tmp_path / 'match.log'
+    write_log(path, [])
+    path.write_bytes(path.read_bytes()[:size])
+
+    with pytest.raises(ValueError, match='not a match log'):
+        MatchLogReader(str(path))
+
+def test_rejects_another_file(tmp_path):
+    path = tmp_path / 'match.log'
+    path.write_bytes(b'TRAJ' + bytes(RECORD_SIZE))
+
+    with pytest.raises(ValueError, match='not a match log'):
+        MatchLogReader(str(path))
+
+def test_rejects_an_old_version(tmp_path):
+    path = tmp_path / 'match.log'
+    old_size = RECORD_SIZE - 13 # Version 5 had no color timestamp, match and confidence
+    path.write_bytes(HEADER_STRUCT.pack(MAGIC, 5, old_size) + bytes(2 * old_size))
+
+    with pytest.raises(ValueError, match='log version 5 with %d byte records, expected version 6' % old_size):
+        MatchLogReader(str(path))
@@ -0,0 +1,45 @@
+from common.motor_output import CoalescedOutput, OutputRegistry
+
+class Motor():
+    def __init__(self):
+        self.values = []
+
+    def set(self, value):
+        self.values.append(value)
+
+def test_scale_is_applied_to_the_sent_value():
+    motor = Motor()
+    output = CoalescedOutput(motor)
+    output.scale = 0.5
+    output.set(0.8)
+
+    assert motor.values == [0.4]
+    assert output.get() == 0.8
+    assert output.get_applied() == 0.4
+
+def test_applied_scale_is_the_one_of_the_last_set():
+    motor = Motor()
+    registry = OutputRegistry()
+    output = registry.wrap('shooter', motor, group='shooter')
+
+    output.set(0.8)
+    registry.set_scale('shooter', 0.5)
+
+    # The new scale is only used by the next set call
+    assert output.get_applied() == 0.8
+    assert registry.get_scale('shooter') == 0.5
+
+    output.set(0.8)
+    assert output.get_applied() == 0.4
+    assert motor.values == [0.8, 0.4]
+
+def test_small_changes_are_not_sent():
+    motor = Motor()
+    output = CoalescedOutput(motor, deadband=0.01, keepalive=10)
+    output.set(0.5)
+    output.set(0.505)
+    output.set(0.52)
+    output.set(0)
+
+    assert motor.values == [0.5, 0.52, 0]
+    assert (output.calls, output.writes) == (4, 3)
@@ -0,0 +1,14 @@
+import pytest
+
+from common import pdp_channels
+
+def test_channels_are_unique_and_exist():
+    pdp_channels.check()
+
+def test_a_channel_used_twice():
+    with pytest.raises(ValueError, match='channel 4'):
+        pdp_channels.check({'left': 4, 'right': 4})
+
+def test_a_channel_out_of_range():
+    with pytest.raises(ValueError, match='16 channels'):
+        pdp_channels.check({'left': 16})
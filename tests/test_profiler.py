@@ -0,0 +1,118 @@
+import pytest
+
+from common.profiler import Profiler, _Section
+
+class Component():
+    def execute(self):
+        return 'execute'
+
+def test_enabling_installs_and_disabling_restores_a_class_method():
+    component = Component()
+    profiler = Profiler(size=8)
+    profiler.watch('component', component)
+
+    assert 'execute' not in vars(component)
+
+    profiler.enabled = True
+    assert 'execute' in vars(component)
+    assert component.execute() == 'execute'
+    assert profiler.report()['component'].count == 1
+
+    profiler.enabled = False
+    assert 'execute' not in vars(component)
+    assert component.execute.__func__ is Component.execute
+    component.execute()
+    assert profiler.report()['component'].count == 1
+
+def test_disabling_restores_an_instance_attribute():
+    component = Component()
+    replaced = lambda: 'replaced'
+    component.execute = replaced
+
+    profiler = Profiler(size=8, enabled=True)
+    profiler.watch('component', component)
+    assert component.execute is not replaced
+    assert component.execute() == 'replaced'
+
+    profiler.enabled = False
+    assert component.execute is replaced
+
+def test_disabling_keeps_a_later_replacement():
+    component = Component()
+    profiler = Profiler(size=8, enabled=True)
+    profiler.watch('component', component)
+
+    replaced = lambda: 'replaced'
+    component.execute = replaced
+    profiler.enabled = False
+    assert component.execute is replaced
+
+def test_enabling_twice_does_not_wrap_twice():
+    component = Component()
+    profiler = Profiler(size=8)
+    profiler.watch('component', component)
+
+    profiler.enabled = True
+    wrapper = component.execute
+    profiler.enabled = True
+    assert component.execute is wrapper
+
+    profiler.enabled = False
+    profiler.enabled = True
+    component.execute()
+    assert profiler.report()['component'].count == 1
+
+def test_stats_of_a_partly_filled_buffer():
+    section = _Section('section', 8, budget=0.5)
+    for duration in (0.3, 0.1, 0.2):
+        section.record(duration)
+
+    assert section.stats() == (3, 0.2, 0.3, 0.3, 0)
+
+def test_stats_after_wraparound():
+    section = _Section('section', 10, budget=0.5)
+    # 1 to 25, only the last 10 (16 to 25) stay in the buffer
+    for duration in range(1, 26):
+        section.record(duration / 100)
+
+    stats = section.stats()
+    assert stats.count == 25
+    assert stats.p50 == pytest.approx(0.20)
+    assert stats.p99 == pytest.approx(0.25)
+    assert stats.max == pytest.approx(0.25)
+    assert stats.overruns == 0
+    assert section.index == 5
+
+def test_overruns_count_every_record():
+    section = _Section('section', 4, budget=0.02)
+    for duration in (0.01, 0.03, 0.05, 0.01, 0.04, 0.01, 0.01, 0.01):
+        section.record(duration)
+
+    # The overruns were overwritten in the buffer, they are still counted
+    assert max(section.durations) == pytest.approx(0.04)
+    assert section.stats().overruns == 3
+
+def test_reset():
+    section = _Section('section', 4, budget=0.02)
+    for duration in (0.01, 0.03, 0.05, 0.01, 0.04):
+        section.record(duration)
+    section.reset()
+
+    assert section.stats() == (0, 0.0, 0.0, 0.0, 0)
+    section.record(0.01)
+    assert section.stats() == (1, 0.01, 0.01, 0.01, 0)
+
+def test_period_sections_time_between_calls(monkeypatch):
+    times = iter([1.0, 1.01, 1.04])
+    monkeypatch.setattr('common.profiler.time.perf_counter', lambda: next(times))
+
+    component = Component()
+    profiler = Profiler(size=8, enabled=True)
+    profiler.watch('loop', component, period=True)
+    for _ in range(3):
+        component.execute()
+
+    stats = profiler.report()['loop']
+    assert stats.count == 2
+    assert stats.max == pytest.approx(0.03)
+    assert stats.overruns == 1
@@ -0,0 +1,146 @@
+from collections import namedtuple
+
+import pytest
+
+from common.segment_counter import SegmentCounter
+
+# Same fields as common.color_sensor.Sample
+Sample = namedtuple('Sample', ['timestamp', 'color', 'match', 'confidence'])
+
+# Order of the colors while the wheel of fortune spins
+ORDER = ['R', 'Y', 'B', 'G']
+
+class Readings():
+    """
+    Feeds the counter with readings 20 ms apart.
+    """
+
+    def __init__(self, counter, start=0.0):
+        self.counter = counter
+        self.time = start
+        self.steps = []
+
+    def read(self, match, confidence=1.0, count=1):
+        for _ in range(count):
+            self.time += 0.02
+            self.steps.append(self.counter.update(Sample(self.time, None, match, confidence)))
+
+def spin(readings, segments, per_segment=5, start=0):
+    """
+    Read `segments` segments in the spinning order, starting after ORDER[start].
+    """
+    for i in range(1, segments + 1):
+        readings.read(ORDER[(start + i) % len(ORDER)], count=per_segment)
+
+def test_counts_every_segment():
+    counter = SegmentCounter(ORDER)
+    counter.reset('R', 0.0)
+    readings = Readings(counter)
+
+    spin(readings, 28)
+
+    assert counter.transitions == 28
+    assert counter.current == 'R'
+    # 8 sights of the starting color, the first one at the reset
+    assert counter.transitions // len(ORDER) + 1 == 8
+
+def test_a_transition_needs_the_debounce_readings():
+    counter = SegmentCounter(ORDER, debounce=2)
+    counter.reset('R', 0.0)
+    readings = Readings(counter)
+
+    readings.read('Y')
+    assert counter.transitions == 0
+    readings.read('Y')
+    assert counter.transitions == 1
+    assert readings.steps == [0, 1]
+
+def test_single_misreads_are_ignored():
+    counter = SegmentCounter(ORDER)
+    counter.reset('R', 0.0)
+    readings = Readings(counter)
+
+    # A blurred reading between the segments, then back to red
+    readings.read('B')
+    readings.read('R', count=3)
+    readings.read('G')
+    readings.read('R', count=3)
+
+    assert counter.transitions == 0
+    assert counter.current == 'R'
+
+def test_low_confidence_can_not_start_a_new_color():
+    counter = SegmentCounter(ORDER, enter_confidence=0.92, stay_confidence=0.85)
+    counter.reset('R', 0.0)
+    readings = Readings(counter)
+
+    readings.read('Y', confidence=0.9, count=5)
+    assert counter.transitions == 0
+
+    readings.read('Y', confidence=0.95, count=2)
+    assert counter.transitions == 1
+
+def test_current_color_cancels_the_candidate():
+    counter = SegmentCounter(ORDER, debounce=3, stay_confidence=0.85)
+    counter.reset('R', 0.0)
+    readings = Readings(counter)
+
+    readings.read('Y', count=2)
+    readings.read('R', confidence=0.86)
+    readings.read('Y', count=2)
+    assert counter.transitions == 0
+
+    # A current color reading under the stay confidence does not cancel it
+    readings.read('R', confidence=0.5)
+    readings.read('Y')
+    assert counter.transitions == 1
+
+def test_skipped_segment_and_reverse():
+    counter = SegmentCounter(ORDER)
+    counter.reset('R', 0.0)
+    readings = Readings(counter)
+
+    readings.read('B', count=2) # Y was missed
+    assert counter.transitions == 2
+
+    readings.read('Y', count=2) # Turned back
+    assert counter.transitions == 1
+    assert readings.steps[-1] == -1
+
+def test_same_sample_is_used_once():
+    counter = SegmentCounter(ORDER, debounce=2)
+    counter.reset('R', 0.0)
+
+    sample = Sample(0.1, None, 'Y', 1.0)
+    counter.update(sample)
+    counter.update(sample)
+    assert counter.transitions == 0
+
+def test_velocity():
+    counter = SegmentCounter(ORDER)
+    counter.reset('R', 0.0)
+    readings = Readings(counter)
+
+    # The first segment is partial and is not measured
+    readings.read('R', count=2)
+    spin(readings, 1)
+    assert counter.velocity(readings.time) == 0
+
+    # 5 readings of 20 ms per segment
+    spin(readings, 3, start=1)
+    assert counter.velocity(readings.time) == pytest.approx(10)
+
+    # A second after the last transition, the wheel is at most at 1 segment/s
+    assert counter.velocity(counter.last_transition + 1) == pytest.approx(1)
+
+def test_transition_time_is_between_the_readings():
+    counter = SegmentCounter(ORDER, debounce=3)
+    counter.reset('R', 0.0)
+    readings = Readings(counter)
+
+    readings.read('R')
+    readings.read('Y', count=3)
+
+    # The color changed between the readings at 20 and 40 ms, not when it was accepted
+    assert counter.transitions == 1
+    assert counter.last_transition == pytest.approx(0.03)
@@ -0,0 +1,82 @@
+import math
+
+import numpy as np
+import pytest
+
+from common import shot_table
+from common.shot_table import CALIBRATION, Shot
+
+# Same camera as common.vision.Vision
+CAM_HEIGHT = 38.5
+CAM_ANGLE = 70
+TARGET_HEIGHT = 98.25
+
+def limelight_distance(ty):
+    return (TARGET_HEIGHT - CAM_HEIGHT) / math.tan(math.radians(ty + CAM_ANGLE))
+
+def ty_at(distance):
+    return math.degrees(math.atan2(TARGET_HEIGHT - CAM_HEIGHT, distance)) - CAM_ANGLE
+
+@pytest.fixture(scope='module')
+def table():
+    return shot_table.build(CALIBRATION, CAM_HEIGHT, CAM_ANGLE, TARGET_HEIGHT)
+
+def test_grid(table):
+    assert len(table) == 751
+    assert table.ty_min == -60
+    assert table.ty_max == pytest.approx(15)
+
+@pytest.mark.parametrize('ty', [-60, -42.37, -30, -17.05, 0, 9.99, 15])
+def test_distance_follows_the_limelight_estimation(table, ty):
+    assert table.distanceAt(ty) == pytest.approx(limelight_distance(ty), rel=1e-3)
+
+def test_lookup_on_a_cell(table):
+    shot = table.lookup(-60)
+    assert shot.distance == pytest.approx(limelight_distance(-60), rel=1e-6)
+    assert shot == Shot(table.distance[0], table.speed[0], table.spinup[0])
+
+def test_lookup_interpolates_between_the_cells(table):
+    ty = table.ty_min + 100.25 * table.step
+    shot = table.lookup(ty)
+    for column, value in zip((table.distance, table.speed, table.spinup), shot):
+        assert value == pytest.approx(column[100] * 0.75 + column[101] * 0.25)
+
+def test_lookup_is_clamped_outside_of_the_grid(table):
+    assert table.lookup(-90) == table.lookup(table.ty_min)
+    assert table.lookup(table.ty_max + 30) == table.lookup(table.ty_max)
+
+    first = table.lookup(table.ty_min)
+    last = table.lookup(table.ty_max)
+    assert first.distance == pytest.approx(table.distance[0])
+    assert last.distance == pytest.approx(table.distance[-1])
+
+@pytest.mark.parametrize('distance, speed, spinup', CALIBRATION)
+def test_calibration_shots(table, distance, speed, spinup):
+    # Far away a cell is a few inches wide, the corners of the calibration are rounded a bit
+    shot = table.lookup(ty_at(distance))
+    assert shot.distance == pytest.approx(distance, rel=1e-3)
+    assert shot.speed == pytest.approx(speed, abs=2e-3)
+    assert shot.spinup == pytest.approx(spinup, abs=2e-3)
+
+def test_speed_is_clamped_beyond_the_calibration(table):
+    # Closer than the first calibration shot and further than the last one
+    close = table.lookup(ty_at(30))
+    far = table.lookup(ty_at(400))
+    assert close.speed == pytest.approx(CALIBRATION[0][1])
+    assert close.spinup == pytest.approx(CALIBRATION[0][2])
+    assert far.speed == pytest.approx(CALIBRATION[-1][1])
+    assert far.spinup == pytest.approx(CALIBRATION[-1][2])
+
+def test_halfway_between_calibration_shots(table):
+    shot = table.lookup(ty_at(150))
+    assert shot.speed == pytest.approx(0.75, abs=1e-3)
+    assert shot.spinup == pytest.approx(0.55, abs=1e-3)
+
+def test_evaluate_matches_lookup(table):
+    ty = np.array([-90, -60, -45.55, -20.01, 0, 14.96, 15, 40])
+    distance, speed, spinup = table.evaluate(ty)
+    for i, value in enumerate(ty):
+        shot = table.lookup(value)
+        assert distance[i] == pytest.approx(shot.distance, rel=1e-5)
+        assert speed[i] == pytest.approx(shot.speed, rel=1e-5)
+        assert spinup[i] == pytest.approx(shot.spinup, rel=1e-5)
@@ -0,0 +1,28 @@
+import pytest
+
+from common.steering import wrap_degrees, reverse
+
+@pytest.mark.parametrize('deg, wrapped', [
+    (0, 0), (90, 90), (-90, -90), (179, 179), (180, -180), (-180, -180),
+    (270, -90), (-270, 90), (340, -20), (-340, 20), (720, 0), (725, 5),
+])
+def test_wrap_degrees(deg, wrapped):
+    assert wrap_degrees(deg) == pytest.approx(wrapped)
+
+def test_wraps_across_zero():
+    # 350 and 10 degrees are 20 degrees apart
+    assert wrap_degrees(10 - 350) == 20
+    assert wrap_degrees(350 - 10) == -20
+
+@pytest.mark.parametrize('deg, current', [(90, 0), (0, 90), (270, 0), (10, 280), (100, 10)])
+def test_no_reverse_at_90_degrees(deg, current):
+    assert reverse(0.5, deg, current) == (0.5, deg)
+
+@pytest.mark.parametrize('deg, current', [(180, 0), (0, 180), (225, 45), (95, 275), (10, 190)])
+def test_reverse_at_180_degrees(deg, current):
+    # The opposite of the requested angle is the current one, the wheel does not turn
+    assert reverse(0.5, deg, current) == (-0.5, current)
+
+@pytest.mark.parametrize('deg, current, opposite', [(91, 0, 271), (0, 269, 180), (100, 350, 280), (350, 100, 170), (270, 95, 90)])
+def test_reverse_past_90_degrees(deg, current, opposite):
+    assert reverse(0.5, deg, current) == (-0.5, opposite)
@@ -0,0 +1,90 @@
+import math
+
+import pytest
+
+from common.target_filter import TargetFilter
+
+# Same values as common.vision.Vision, the camera looks to the back of the robot
+WINDOW = 5
+OUTLIER_THRESHOLD = 4
+OUTLIER_COUNT = 3
+CAM_FACING = -1
+
+def create():
+    return TargetFilter(WINDOW, OUTLIER_THRESHOLD, OUTLIER_COUNT, CAM_FACING)
+
+@pytest.mark.parametrize('rotation', [0.1, 0.2, 0.35, math.pi])
+def test_rotating_in_place_away_from_the_origin(rotation):
+    target = create()
+    x, y = 20, 10
+    target.add(0, 120, x, y)
+
+    # The odometry is never reset, so the robot is far from its origin while it turns.
+    # tx changes with the heading, the bearing on the field and the distance stay the same.
+    for i in range(1, 5):
+        heading = math.degrees(rotation * i / 4)
+        tx = heading
+        assert target.add(heading - tx, 120, x, y)
+        assert target.distanceAt(x, y) == pytest.approx(120)
+
+def test_driving_toward_the_target():
+    # Bearing 0: the target is in front of the camera, so behind the robot (-x) on the field
+    target = create()
+    target.add(0, 120, 20, 10)
+
+    assert target.distanceAt(19, 10) == pytest.approx(108)
+    assert target.distanceAt(21, 10) == pytest.approx(132)
+
+    # Moving across the line of sight does not change the distance
+    assert target.distanceAt(20, 13) == pytest.approx(120)
+
+def test_movement_is_projected_on_the_bearing_of_the_frame():
+    target = create()
+    target.add(90, 120, 0, 0) # The target is at -y on the field
+
+    assert target.distanceAt(0, -2) == pytest.approx(96)
+    assert target.distanceAt(2, 0) == pytest.approx(120)
+
+def test_frames_from_different_positions_agree():
+    # The robot drives 1 ft toward the target between each frame
+    target = create()
+    for i in range(5):
+        assert target.add(0, 120 - 12 * i, 20 - i, 10)
+
+    assert target.distanceAt(15, 10) == pytest.approx(60)
+    assert target.distanceAt(20, 10) == pytest.approx(120)
+
+def test_outliers_are_dropped():
+    target = create()
+    for _ in range(3):
+        target.add(0, 120, 0, 0)
+
+    assert not target.add(0, 200, 0, 0)
+    assert not target.add(20, 120, 0, 0)
+    assert len(target) == 3
+    assert target.distanceAt(0, 0) == pytest.approx(120)
+    assert target.bearing() == 0
+
+def test_moved_target_is_accepted_after_the_outlier_count():
+    target = create()
+    for _ in range(3):
+        target.add(0, 120, 0, 0)
+
+    assert not target.add(10, 180, 0, 0)
+    assert not target.add(10, 180, 0, 0)
+    assert target.add(10, 180, 0, 0)
+
+    assert len(target) == 2
+    assert target.bearing() == 10
+    assert target.distanceAt(0, 0) == pytest.approx(180)
+
+def test_window_and_clear():
+    target = create()
+    for distance in (100, 101, 102, 103, 104, 105, 106):
+        target.add(0, distance, 0, 0)
+
+    assert len(target) == WINDOW
+    assert target.distanceAt(0, 0) == pytest.approx(104)
+
+    target.clear()
+    assert not target
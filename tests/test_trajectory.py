@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from common import trajectory
+from common.steering import MAX_SPEED
+
+# Same path as autonomous.paths.ESCAPE
+WAYPOINTS = [(0, 0), (15, 0)]
+MAX_VELOCITY = 6
+MAX_ACCELERATION = 8
+PERIOD = 0.02
+
+@pytest.fixture(scope='module')
+def path():
+    return trajectory.generate(WAYPOINTS, MAX_VELOCITY, MAX_ACCELERATION, PERIOD)
+
+def test_profile(path):
+    assert path.fwd[0] == 0
+    assert path.fwd[-1] == 0
+    assert max(path.fwd) == pytest.approx(MAX_VELOCITY / MAX_SPEED)
+    assert set(path.strafe) == {0}
+    assert set(path.rcw) == {0}
+
+    # 15 ft at 6 ft/s, plus the time lost accelerating and decelerating
+    assert path.duration == pytest.approx(15 / 6 + 6 / 8, abs=PERIOD)
+    distance = sum(fwd * MAX_SPEED * PERIOD for fwd in path.fwd)
+    assert distance == pytest.approx(15, abs=0.1)
+
+def test_sample_stays_in_the_path(path):
+    assert path.sample(-1) == path.sample(0)
+    assert path.sample(path.duration + 5) == (0, 0, 0)
+    assert path.sample(1.5) == (path.fwd[75], path.strafe[75], path.rcw[75])
+
+def test_bytes_round_trip(path):
+    copy = trajectory.Trajectory.frombytes(path.tobytes())
+    assert copy.period == pytest.approx(PERIOD)
+    assert copy.fwd == path.fwd
+    assert copy.strafe == path.strafe
+    assert copy.rcw == path.rcw
+
+def test_rejects_truncated_bytes(path):
+    with pytest.raises(ValueError, match='should have'):
+        trajectory.Trajectory.frombytes(path.tobytes()[:-4])
+
+def test_rejects_another_version(path):
+    data = bytearray(path.tobytes())
+    data[4] = trajectory.VERSION + 1
+    with pytest.raises(ValueError, match='Not a version'):
+        trajectory.Trajectory.frombytes(bytes(data))
+
+def test_cache_key_follows_the_parameters():
+    key = trajectory.cache_key(WAYPOINTS, MAX_VELOCITY, MAX_ACCELERATION, PERIOD)
+    assert key == trajectory.cache_key([(0, 0), (15, 0)], 6, 8, 0.02)
+    assert key != trajectory.cache_key(WAYPOINTS, 4.2, MAX_ACCELERATION, PERIOD)
+    assert key.endswith('.traj')
+
+def test_load_or_generate_reads_the_cache(tmp_path, monkeypatch, path):
+    generated = trajectory.load_or_generate(WAYPOINTS, MAX_VELOCITY, MAX_ACCELERATION, PERIOD, cache_dir=str(tmp_path))
+    assert generated.fwd == path.fwd
+    assert os.listdir(str(tmp_path)) == [trajectory.cache_key(WAYPOINTS, MAX_VELOCITY, MAX_ACCELERATION, PERIOD)]
+
+    def fail(*args):
+        raise AssertionError('The path should be read from the cache')
+    monkeypatch.setattr(trajectory, 'generate', fail)
+
+    cached = trajectory.load_or_generate(WAYPOINTS, MAX_VELOCITY, MAX_ACCELERATION, PERIOD, cache_dir=str(tmp_path))
+    assert cached.fwd == path.fwd
+    assert cached.period == pytest.approx(PERIOD)
+
+@pytest.mark.parametrize('data', [b'', b'TRA', b'TRAJ' + bytes(20)])
+def test_load_or_generate_replaces_a_broken_cache(tmp_path, path, data):
+    file = tmp_path / trajectory.cache_key(WAYPOINTS, MAX_VELOCITY, MAX_ACCELERATION, PERIOD)
+    file.write_bytes(data)
+
+    generated = trajectory.load_or_generate(WAYPOINTS, MAX_VELOCITY, MAX_ACCELERATION, PERIOD, cache_dir=str(tmp_path))
+    assert generated.fwd == path.fwd
+    assert file.read_bytes() == path.tobytes()
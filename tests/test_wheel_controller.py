@@ -0,0 +1,122 @@
+import math
+
+from collections import namedtuple
+
+import pytest
+
+from common.segment_counter import SegmentCounter
+from common.wheel_controller import WheelController
+
+# Same fields as common.color_sensor.Sample
+Sample = namedtuple('Sample', ['timestamp', 'color', 'match', 'confidence'])
+
+ORDER = ['R', 'Y', 'B', 'G']
+
+# Same values as components.wof.WheelOfFortune
+MAX_SEGMENT_RATE = 16
+WHEEL_TAU = 0.15
+WHEEL_DECEL = 20
+VELOCITY_KP = 0.05
+MIN_OUTPUT = 0.15
+SETTLE_TIME = 0.3
+
+FIRST_STAGE_TARGET = (8 - 1) * len(ORDER)
+
+PERIOD = 0.02
+
+class Wheel():
+    """
+    First order model of the wheel of fortune turned by the motor, in segments.
+    """
+
+    def __init__(self, position=0.5, max_segment_rate=MAX_SEGMENT_RATE, tau=WHEEL_TAU, decel=WHEEL_DECEL):
+        self.position = position
+        self.velocity = 0.0
+        self.max_segment_rate = max_segment_rate
+        self.tau = tau
+        self.decel = decel
+
+    @property
+    def color(self):
+        return ORDER[math.floor(self.position) % len(ORDER)]
+
+    def step(self, output, dt):
+        if output > 0:
+            self.velocity += (output * self.max_segment_rate - self.velocity) * (1 - math.exp(-dt / self.tau))
+        else:
+            self.velocity = max(self.velocity - self.decel * dt, 0)
+        self.position += self.velocity * dt
+
+def spin(wheel, target, max_output, timeout=10):
+    """
+    Run the controller against the wheel until it is done.
+
+    :returns: (time to finish, counter, outputs), the time is None on a timeout
+    """
+    counter = SegmentCounter(ORDER)
+    counter.reset(wheel.color, 0.0)
+    controller = WheelController(counter, MAX_SEGMENT_RATE, WHEEL_TAU, WHEEL_DECEL, VELOCITY_KP, MIN_OUTPUT, SETTLE_TIME)
+
+    output = 0
+    outputs = []
+    now = 0.0
+    while now < timeout:
+        now += PERIOD
+        wheel.step(output, PERIOD)
+        counter.update(Sample(now, None, wheel.color, 1.0))
+
+        output, done = controller.update(target, max_output, output, now)
+        outputs.append(output)
+        if done:
+            return now, counter, outputs
+
+    return None, counter, outputs
+
+def test_first_stage_stops_on_the_last_transition():
+    wheel = Wheel()
+    time, counter, outputs = spin(wheel, FIRST_STAGE_TARGET, 1)
+
+    assert time is not None
+    assert counter.transitions == FIRST_STAGE_TARGET
+    assert math.floor(wheel.position) == FIRST_STAGE_TARGET
+    assert wheel.velocity == 0
+    assert max(outputs) == 1
+
+    # 28 segments at 16 segments/s, then the deceleration and the settle time
+    assert time < 3.5
+
+def test_second_stage_stops_in_the_target_segment():
+    for target in range(1, 4):
+        wheel = Wheel()
+        time, counter, outputs = spin(wheel, target, 0.5)
+
+        assert time is not None
+        assert counter.transitions == target
+        assert math.floor(wheel.position) == target
+        assert max(outputs) <= 0.5
+
+def test_output_never_goes_under_the_minimum():
+    wheel = Wheel()
+    _, _, outputs = spin(wheel, 2, 0.5)
+
+    assert all(output == 0 or output >= MIN_OUTPUT for output in outputs)
+
+@pytest.mark.parametrize('max_segment_rate, decel', [(12, 20), (14, 20), (16, 25), (16, 30)])
+def test_first_stage_with_a_slower_wheel(max_segment_rate, decel):
+    # A weaker motor or more friction than the model still stops on the target
+    wheel = Wheel(max_segment_rate=max_segment_rate, decel=decel)
+    time, counter, _ = spin(wheel, FIRST_STAGE_TARGET, 1)
+
+    assert time is not None
+    assert counter.transitions == FIRST_STAGE_TARGET
+    assert math.floor(wheel.position) == FIRST_STAGE_TARGET
+
+def test_past_the_target_is_not_done():
+    counter = SegmentCounter(ORDER)
+    counter.reset('R', 0.0)
+    counter.update(Sample(0.02, None, 'Y', 1.0))
+    counter.update(Sample(0.04, None, 'Y', 1.0))
+    controller = WheelController(counter, MAX_SEGMENT_RATE, WHEEL_TAU, WHEEL_DECEL, VELOCITY_KP, MIN_OUTPUT, SETTLE_TIME)
+
+    assert controller.update(0, 1, 0, 1.0) == (0, False)
+    assert controller.update(1, 1, 0, 1.0) == (0, True)